@@ -0,0 +1,99 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Select planners for many tasks at once and write the scores of all
+solvers as JSON or CSV table (see batch_selection.py).
+
+Inputs are PDDL problem files (the domain file is found with the naming
+rules of fast-downward.py), graph files, images or directories, which are
+searched recursively for such files.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+
+import batch_selection
+from dl_model import selector
+import selection_pipeline
+
+
+def get_base_dir():
+    """Assume that this script always lives in the base dir of the infrastructure."""
+    return os.path.dirname(os.path.abspath(sys.argv[0]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "inputs", nargs="+",
+        help="Problem files, graph files (.txt or .bin), images (.png) or "
+        "directories containing such files.")
+    parser.add_argument(
+        "--model", choices=["lifted", "grounded"], default="lifted",
+        help="Model used for the selection (default: %(default)s). Graphs of "
+        "the grounded task cannot be computed from problem files, so only "
+        "graph files and images can be scored with the grounded model.")
+    parser.add_argument(
+        "--output",
+        help="Output file (default: stdout).")
+    parser.add_argument(
+        "--format", choices=["json", "csv"],
+        help="Output format (default: derived from the output file name, "
+        "json for stdout).")
+    parser.add_argument(
+        "--jobs", type=int, default=None,
+        help="Number of processes computing graphs and images (default: "
+        "number of CPUs).")
+    parser.add_argument(
+        "--batch-size", type=int, default=batch_selection.DEFAULT_BATCH_SIZE,
+        help="Number of images scored by one call of the model (default: "
+        "%(default)s).")
+    parser.add_argument(
+        "--time-limit", type=int, default=batch_selection.DEFAULT_TIME_LIMIT,
+        help="Time limit in seconds for computing graph and image of one "
+        "input (default: %(default)s).")
+    args = parser.parse_args()
+
+    output_format = args.format
+    if output_format is None:
+        if args.output is not None and args.output.endswith(".csv"):
+            output_format = "csv"
+        else:
+            output_format = "json"
+
+    result_out = sys.stdout
+    # Keep log output (e.g. from keras) out of the result table.
+    sys.stdout = sys.stderr
+
+    inputs = batch_selection.collect_inputs(args.inputs)
+    if args.model == "grounded" and any(batch_input.is_task() for batch_input in inputs):
+        sys.exit("Problem files can only be scored with the lifted model.")
+    print("Selecting planners for {} inputs".format(len(inputs)))
+
+    base_dir = get_base_dir()
+    # Create the worker processes before loading the model.
+    pool = multiprocessing.Pool(args.jobs, batch_selection.init_worker)
+    try:
+        json_model, h5_model = selection_pipeline.get_model_files(
+            base_dir, args.model == "lifted")
+        model = selector.load_model(json_model, h5_model)
+        results = batch_selection.select_planners(
+            base_dir, inputs, model, batch_size=args.batch_size,
+            time_limit=args.time_limit, pool=pool)
+    finally:
+        pool.close()
+        pool.join()
+
+    if output_format == "csv":
+        write = batch_selection.write_csv
+    else:
+        write = batch_selection.write_json
+    if args.output is None:
+        write(results, result_out)
+    else:
+        with open(args.output, "w") as outfile:
+            write(results, outfile)
+    num_failed = sum(1 for result in results if result["error"] is not None)
+    print("Done selecting planners, {} inputs failed.".format(num_failed))
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+"""Planner selection for many tasks at once (see batch-select.py).
+
+Graphs and images are computed in parallel by a pool of worker processes,
+and the learned model scores the images in large batches. For every input,
+the result contains the scores of all solvers and not only the selected one.
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+from dl_model import selector
+from driver import util
+import graph_image
+import selection_pipeline
+
+GRAPH_FILE_EXTENSIONS = ['.txt', '.bin']
+IMAGE_FILE_EXTENSIONS = ['.png']
+TASK_FILE_EXTENSIONS = ['.pddl']
+## Time limit for computing the graph and image of a single input.
+DEFAULT_TIME_LIMIT = 240 # seconds
+DEFAULT_BATCH_SIZE = 256
+IMAGE_SHAPE = (128, 128)
+
+
+class BatchInput(object):
+    """A task given by its PDDL files, a graph file or an image file."""
+    def __init__(self, name, domain=None, problem=None, graph_file=None, image_file=None):
+        self.name = name
+        self.domain = domain
+        self.problem = problem
+        self.graph_file = graph_file
+        self.image_file = image_file
+
+    def is_task(self):
+        return self.problem is not None
+
+
+def _is_domain_file(filename):
+    return 'domain' in os.path.basename(filename)
+
+
+def get_input_for_file(filename):
+    """Return the BatchInput for the given file, depending on its extension,
+    or None if the file is no input (e.g., a domain file)."""
+    extension = os.path.splitext(filename)[1]
+    if extension in IMAGE_FILE_EXTENSIONS:
+        return BatchInput(filename, image_file=filename)
+    elif extension in GRAPH_FILE_EXTENSIONS:
+        return BatchInput(filename, graph_file=filename)
+    elif extension in TASK_FILE_EXTENSIONS and not _is_domain_file(filename):
+        try:
+            domain = util.find_domain_filename(filename)
+        except SystemExit:
+            # Reported as error of this input.
+            domain = None
+        return BatchInput(filename, domain=domain, problem=filename)
+    return None
+
+
+def collect_inputs(paths):
+    """Return the inputs for the given files and (recursively) for all files
+    in the given directories, in a deterministic order."""
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    batch_input = get_input_for_file(os.path.join(dirpath, filename))
+                    if batch_input is not None:
+                        inputs.append(batch_input)
+        else:
+            batch_input = get_input_for_file(path)
+            if batch_input is None:
+                raise ValueError("%s is neither a problem, graph nor image file" % path)
+            inputs.append(batch_input)
+    return inputs
+
+
+def _create_image(base_dir, batch_input):
+    if batch_input.image_file is not None:
+        return Image.open(batch_input.image_file)
+    if batch_input.is_task():
+        if batch_input.domain is None:
+            raise ValueError("could not find domain file")
+        graph = selection_pipeline.compute_abstract_structure_graph(
+            base_dir, batch_input.domain, batch_input.problem)
+    else:
+        graph = graph_image.read_graph(batch_input.graph_file)
+    return selection_pipeline.create_image(graph)
+
+
+def init_worker():
+    # Keep the output of the translator out of the result table.
+    sys.stdout = sys.stderr
+
+
+def _compute_image(args):
+    """Return the pixels of the image for the input, or the error message if
+    the image cannot be computed."""
+    base_dir, batch_input, time_limit = args
+    try:
+        with selection_pipeline.time_limit(time_limit):
+            pixels = np.array(_create_image(base_dir, batch_input))
+        if pixels.shape != IMAGE_SHAPE:
+            return None, "image has shape %s instead of %s" % (pixels.shape, IMAGE_SHAPE)
+        return pixels, None
+    except selection_pipeline.StageTimeout:
+        return None, "time limit reached"
+    except BaseException as err:
+        # This includes SystemExit raised by the translator on errors.
+        return None, "%s: %s" % (type(err).__name__, err)
+
+
+def compute_images(base_dir, inputs, pool, time_limit=DEFAULT_TIME_LIMIT):
+    """Yield the pair (pixels, error) for every input, in the order of the
+    inputs."""
+    return pool.imap(_compute_image,
+                     [(base_dir, batch_input, time_limit) for batch_input in inputs])
+
+
+def _get_result(batch_input, scores=None, error=None):
+    result = {
+        'name': batch_input.name,
+        'domain': batch_input.domain,
+        'problem': batch_input.problem,
+        'graph': batch_input.graph_file,
+        'image': batch_input.image_file,
+        'selected': None,
+        'scores': None,
+        'error': error,
+    }
+    if scores is not None:
+        result['selected'] = selector.SOLVER_NAMES[int(np.argmax(scores))]
+        result['scores'] = dict(
+            (solver, float(score)) for solver, score in zip(selector.SOLVER_NAMES, scores))
+    return result
+
+
+def select_planners(base_dir, inputs, model, processes=None,
+                    batch_size=DEFAULT_BATCH_SIZE, time_limit=DEFAULT_TIME_LIMIT,
+                    pool=None):
+    """Return the list of results (dictionaries, see _get_result) for the
+    inputs, in the same order.
+
+    The pool of worker processes should be created before loading the model,
+    since forking a process that uses tensorflow is not safe. If no pool is
+    given, a new one with the given number of processes is used."""
+    own_pool = pool is None
+    if own_pool:
+        pool = multiprocessing.Pool(processes, init_worker)
+    results = []
+    pending = []
+
+    def score_pending():
+        if pending:
+            scores = selector.predict_scores(
+                model, [pixels for _, pixels in pending], batch_size)
+            for (index, _), input_scores in zip(pending, scores):
+                results[index] = _get_result(inputs[index], scores=input_scores)
+            del pending[:]
+
+    try:
+        for index, (pixels, error) in enumerate(compute_images(base_dir, inputs, pool, time_limit)):
+            results.append(None)
+            if pixels is None:
+                results[index] = _get_result(inputs[index], error=error)
+            else:
+                pending.append((index, pixels))
+                if len(pending) == batch_size:
+                    score_pending()
+        score_pending()
+    finally:
+        if own_pool:
+            pool.close()
+            pool.join()
+    return results
+
+
+def write_json(results, outfile):
+    json.dump(results, outfile, indent=2, sort_keys=True)
+    outfile.write('\n')
+
+
+def write_csv(results, outfile):
+    """Write one row per result, with one column per solver score."""
+    fields = ['name', 'domain', 'problem', 'graph', 'image', 'selected', 'error']
+    writer = csv.writer(outfile)
+    writer.writerow(fields + selector.SOLVER_NAMES)
+    for result in results:
+        scores = result['scores'] or {}
+        writer.writerow(
+            [result[field] if result[field] is not None else '' for field in fields] +
+            [scores.get(solver, '') for solver in selector.SOLVER_NAMES])
@@ -0,0 +1,82 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Create the images of the abstract structure graphs of all tasks in the
+given benchmark directories in parallel (see dataset_builder.py).
+
+Running the script again with the same output directory only builds the
+tasks that are missing from the manifest (and, with --retry-failed, the
+tasks that failed before).
+"""
+
+import argparse
+import os
+import sys
+
+from driver import limits
+import dataset_builder
+
+
+def get_base_dir():
+    """Assume that this script always lives in the base dir of the infrastructure."""
+    return os.path.dirname(os.path.abspath(sys.argv[0]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "output_directory",
+        help="Directory for the images and the manifest.")
+    parser.add_argument(
+        "benchmark_directories", nargs="+",
+        help="Directories that are searched recursively for problem files.")
+    parser.add_argument(
+        "--image-types", nargs="+", choices=sorted(dataset_builder.IMAGE_TYPE_SHRINK_RATIOS),
+        default=["reg"],
+        help="Images to create, as --write-abstract-structure-image-XXX of "
+        "create-image-from-graph.py (default: %(default)s).")
+    parser.add_argument(
+        "--no-bolding", action="store_true",
+        help="If true, no bolding is performed on the images.")
+    parser.add_argument(
+        "--target-size", default=128, type=int,
+        help="Target size for the constant size images (default: %(default)s).")
+    parser.add_argument(
+        "--write-original-size", action="store_true",
+        help="If true, the original size images are also written.")
+    parser.add_argument(
+        "--time-limit", default="240s",
+        help="CPU time limit for each task, e.g. 240s or 5m (default: %(default)s).")
+    parser.add_argument(
+        "--memory-limit", default="4G",
+        help="Memory limit for each task, e.g. 3900M or 4G (default: %(default)s).")
+    parser.add_argument(
+        "--jobs", type=int, default=None,
+        help="Number of tasks built in parallel (default: number of CPUs).")
+    parser.add_argument(
+        "--retry-failed", action="store_true",
+        help="If true, also build the tasks that failed in a previous run.")
+    args = parser.parse_args()
+
+    if not limits.can_set_limits():
+        sys.exit(limits.RESOURCE_MODULE_MISSING_MSG)
+    # Parse the limits like the options --translate-time-limit etc. of the driver.
+    args.task_time_limit = args.time_limit
+    args.task_memory_limit = args.memory_limit
+    limits.set_time_limit_in_seconds(parser, args, "task")
+    limits.set_memory_limit_in_bytes(parser, args, "task")
+
+    config = dataset_builder.DatasetConfig(
+        image_types=args.image_types, bolded=not args.no_bolding,
+        target_size=args.target_size,
+        write_original_size=args.write_original_size,
+        time_limit=args.task_time_limit, memory_limit=args.task_memory_limit)
+    tasks = dataset_builder.collect_tasks(args.benchmark_directories)
+    try:
+        entries = dataset_builder.build_dataset(
+            get_base_dir(), tasks, args.output_directory, config,
+            jobs=args.jobs, retry_failed=args.retry_failed)
+    except dataset_builder.DatasetConfigError as err:
+        sys.exit(str(err))
+    num_failed = sum(1 for entry in entries if entry["status"] == dataset_builder.STATUS_FAILED)
+    print("Done building images, {} of {} tasks failed.".format(num_failed, len(entries)))
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+
+"""Parallel creation of the images of the abstract structure graphs of many
+tasks, e.g., for training the selection model (see build-image-dataset.py).
+
+Tasks are distributed over a concurrent.futures.ProcessPoolExecutor (part of
+Python 3, and of the "futures" backport for Python 2). Every task is run in
+a forked child of the worker with the time and memory limits of
+driver/limits.py, so that a task exceeding its limits cannot affect other
+tasks.
+
+The output directory contains one directory with the images per task and
+the manifest manifest.jsonl, to which one JSON object per finished task is
+appended: its name, PDDL files, status ("ok" or "failed"), the created
+images, graph statistics or the reason of the failure. Tasks that are
+already listed as successful in the manifest are skipped when building the
+dataset again, so an interrupted run can simply be restarted.
+"""
+
+from __future__ import print_function
+
+import concurrent.futures
+import errno
+import json
+import os
+import shutil
+import signal
+import sys
+import time
+
+from driver import limits
+import batch_selection
+import graph_image
+import selection_pipeline
+
+MANIFEST_FILE = 'manifest.jsonl'
+CONFIG_FILE = 'config.json'
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+
+## Image types as in create-image-from-graph.py: the shrink ratio for the
+## raw ('1'), the 8 bit grayscale ('L') and the 32 bit grayscale ('I') image.
+IMAGE_TYPE_SHRINK_RATIOS = {'raw': 1, 'reg': 3, 'int': 6}
+
+
+class DatasetConfigError(Exception):
+    pass
+
+
+class DatasetConfig(object):
+    def __init__(self, image_types=('reg',), bolded=True, target_size=128,
+                 write_original_size=False, time_limit=None, memory_limit=None):
+        self.image_types = sorted(image_types)
+        self.bolded = bolded
+        self.target_size = target_size
+        self.write_original_size = write_original_size
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+
+    def get_image_options(self):
+        """Return the options that determine the images (but not the
+        limits), as dictionary."""
+        return {
+            'image_types': self.image_types,
+            'bolded': self.bolded,
+            'target_size': self.target_size,
+            'write_original_size': self.write_original_size,
+        }
+
+
+def collect_tasks(benchmark_dirs):
+    """Return the list of (name, domain, problem) of all problem files in the
+    given directories. The name is the path of the problem file (without
+    extension) relative to the benchmark directory."""
+    tasks = []
+    for benchmark_dir in benchmark_dirs:
+        for batch_input in batch_selection.collect_inputs([benchmark_dir]):
+            if not batch_input.is_task():
+                continue
+            relative_path = os.path.relpath(batch_input.problem, benchmark_dir)
+            name = os.path.join(os.path.basename(os.path.normpath(benchmark_dir)),
+                                os.path.splitext(relative_path)[0])
+            tasks.append((name, batch_input.domain, batch_input.problem))
+    return tasks
+
+
+def _create_images(base_dir, domain, problem, output_dir, config):
+    if domain is None:
+        raise ValueError("could not find domain file")
+    graph = selection_pipeline.compute_abstract_structure_graph(
+        base_dir, domain, problem)
+    for image_type in config.image_types:
+        graph_image.write_matrix_image_grayscale(
+            graph, output_dir, bolded=config.bolded,
+            shrink_ratio=IMAGE_TYPE_SHRINK_RATIOS[image_type],
+            target_size=config.target_size,
+            write_original_size=config.write_original_size,
+            streaming=not config.write_original_size)
+    sources, _ = graph_image.get_edge_arrays(graph)
+    return {'num_vertices': len(graph), 'num_edges': len(sources)}
+
+
+def _run_child(write_fd, base_dir, domain, problem, output_dir, config):
+    """Body of the forked child: create the images and write the graph
+    statistics (or the error) as JSON to write_fd."""
+    # Keep the output of the translator out of the output of the builder.
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    sys.stdout = os.fdopen(devnull, 'w')
+    try:
+        limits.set_time_limit(config.time_limit)
+        limits.set_memory_limit(config.memory_limit)
+        result = {'graph': _create_images(base_dir, domain, problem, output_dir, config)}
+    except MemoryError:
+        result = {'error': 'memory limit reached'}
+    except BaseException as err:
+        # This includes SystemExit raised by the translator on errors.
+        result = {'error': '%s: %s' % (type(err).__name__, err)}
+    os.write(write_fd, json.dumps(result).encode('utf-8'))
+    os.close(write_fd)
+
+
+def _get_termination_error(status, cpu_time, time_limit):
+    """Return the error of a child that ended with the given status after
+    using cpu_time seconds of CPU time.
+
+    The soft CPU limit ends the child with SIGXCPU, the hard CPU limit with
+    SIGKILL. The kernel's OOM killer and other processes also use SIGKILL,
+    so we only attribute it to the time limit if the child used up its CPU
+    time."""
+    if os.WIFSIGNALED(status):
+        signum = os.WTERMSIG(status)
+        if signum == signal.SIGXCPU or (
+                signum == signal.SIGKILL and time_limit is not None and
+                cpu_time >= time_limit):
+            return 'time limit reached'
+        if signum == signal.SIGKILL:
+            return 'killed (memory limit or external kill)'
+        return 'terminated by signal %d' % signum
+    return 'exit code %d' % os.WEXITSTATUS(status)
+
+
+def build_task(base_dir, task, dataset_dir, config):
+    """Create the images of the task in a forked child process with the
+    configured limits and return its manifest entry."""
+    name, domain, problem = task
+    output_dir = os.path.join(dataset_dir, name)
+    tmp_output_dir = '%s.tmp-%d' % (output_dir, os.getpid())
+    if os.path.exists(tmp_output_dir):
+        shutil.rmtree(tmp_output_dir)
+    os.makedirs(tmp_output_dir)
+
+    start_time = time.time()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            _run_child(write_fd, base_dir, domain, problem, tmp_output_dir, config)
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    chunks = []
+    while True:
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+    _, status, usage = os.wait4(pid, 0)
+    try:
+        result = json.loads(b''.join(chunks).decode('utf-8'))
+    except ValueError:
+        # The child was killed before writing its result.
+        result = {'error': _get_termination_error(
+            status, usage.ru_utime + usage.ru_stime, config.time_limit)}
+
+    entry = {
+        'name': name,
+        'domain': domain,
+        'problem': problem,
+        'time': round(time.time() - start_time, 3),
+    }
+    if 'error' in result:
+        shutil.rmtree(tmp_output_dir)
+        entry['status'] = STATUS_FAILED
+        entry['error'] = result['error']
+    else:
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        os.rename(tmp_output_dir, output_dir)
+        entry['status'] = STATUS_OK
+        entry['graph'] = result['graph']
+        entry['images'] = sorted(
+            os.path.join(name, filename) for filename in os.listdir(output_dir))
+    return entry
+
+
+def read_manifest(dataset_dir):
+    """Return the dictionary mapping task names to their latest manifest
+    entry."""
+    entries = {}
+    manifest = os.path.join(dataset_dir, MANIFEST_FILE)
+    if os.path.exists(manifest):
+        with open(manifest) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Incomplete last line of an interrupted run.
+                    continue
+                entries[entry['name']] = entry
+    return entries
+
+
+def _check_config(dataset_dir, config):
+    """Make sure that a resumed dataset uses the same image options."""
+    config_file = os.path.join(dataset_dir, CONFIG_FILE)
+    options = config.get_image_options()
+    if os.path.exists(config_file):
+        with open(config_file) as f:
+            previous_options = json.load(f)
+        if previous_options != options:
+            raise DatasetConfigError(
+                "%s was created with different options: %s" %
+                (dataset_dir, previous_options))
+    else:
+        with open(config_file, 'w') as f:
+            json.dump(options, f, indent=2, sort_keys=True)
+
+
+def build_dataset(base_dir, tasks, dataset_dir, config, jobs=None, retry_failed=False):
+    """Create the images of all tasks that are not yet (successfully)
+    listed in the manifest of dataset_dir and return the manifest entries
+    of the newly built tasks."""
+    try:
+        os.makedirs(dataset_dir)
+    except OSError as err:
+        if err.errno != errno.EEXIST:
+            raise
+    _check_config(dataset_dir, config)
+    done = read_manifest(dataset_dir)
+
+    def is_done(name):
+        entry = done.get(name)
+        if entry is None:
+            return False
+        if entry['status'] == STATUS_FAILED:
+            return not retry_failed
+        return all(os.path.exists(os.path.join(dataset_dir, image))
+                   for image in entry['images'])
+
+    todo = [task for task in tasks if not is_done(task[0])]
+    print("Building images for {} of {} tasks".format(len(todo), len(tasks)))
+    sys.stdout.flush()
+
+    new_entries = []
+    with open(os.path.join(dataset_dir, MANIFEST_FILE), 'a+') as manifest:
+        manifest.seek(0, os.SEEK_END)
+        if manifest.tell() > 0:
+            manifest.seek(manifest.tell() - 1)
+            if manifest.read(1) != '\n':
+                # Terminate the incomplete last line of an interrupted run.
+                manifest.write('\n')
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            futures = [executor.submit(build_task, base_dir, task, dataset_dir, config)
+                       for task in todo]
+            for future in concurrent.futures.as_completed(futures):
+                entry = future.result()
+                manifest.write(json.dumps(entry, sort_keys=True) + '\n')
+                manifest.flush()
+                new_entries.append(entry)
+                print("{} {} ({}/{})".format(
+                    entry['status'], entry['name'], len(new_entries), len(todo)))
+                sys.stdout.flush()
+    return new_entries
@@ -1,8 +1,6 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from keras.models import model_from_json
-
 import numpy as np
 from PIL import Image
 import os
@@ -36,7 +34,16 @@ ALGORITHMS_WITHOUT_H2_PREPROCESSOR = [
     '{}-simpless-oss-masb50kmiasmdfp'.format(TRAINING_REVISION_V1),
 ]
 
-def select_algorithm_from_model(json_model, h5_model, image):
+SOLVER_NAMES = ['{}-h2-simpless-dks-celmcut'.format(TRAINING_REVISION_V2), '{}-h2-simpless-dks-cpdbshc900'.format(TRAINING_REVISION_V2), '{}-h2-simpless-dks-900masb50ksccdfp'.format(TRAINING_REVISION_V2), '{}-h2-simpless-oss-900masb50ksbmiasm'.format(TRAINING_REVISION_V2), '{}-h2-simpless-dks-blind'.format(TRAINING_REVISION_V2), '{}-h2-simpless-oss-zopdbsgenetic'.format(TRAINING_REVISION_V2), '{}-h2-simpless-oss-blind'.format(TRAINING_REVISION_V2), '{}-h2-simpless-dks-900masb50ksbmiasm'.format(TRAINING_REVISION_V2), 'seq-opt-symba-1', '{}-h2-simpless-oss-masginfsccdfp'.format(TRAINING_REVISION_V2), '{}-h2-simpless-dks-900masginfsccdfp'.format(TRAINING_REVISION_V2), '{}-h2-simpless-oss-cpdbshc900'.format(TRAINING_REVISION_V2), '{}-h2-simpless-dks-zopdbsgenetic'.format(TRAINING_REVISION_V2), '{}-simpless-oss-masb50kmiasmdfp'.format(TRAINING_REVISION_V1), '{}-h2-simpless-oss-900masb50ksccdfp'.format(TRAINING_REVISION_V2), '{}-simpless-dks-masb50kmiasmdfp'.format(TRAINING_REVISION_V1), '{}-h2-simpless-oss-celmcut'.format(TRAINING_REVISION_V2)]
+
+PREDICTION_BATCH_SIZE = 32
+
+
+def load_model(json_model, h5_model):
+    # Importing keras (and tensorflow) is expensive, so we only do it when we
+    # actually need a model, and not when only looking up configurations.
+    from keras.models import model_from_json
+
     print("Using json model file {}".format(json_model))
     print("Using h5 model file {}".format(h5_model))
 
@@ -51,27 +58,35 @@ def select_algorithm_from_model(json_model, h5_model, image):
     # load weights into new model
     model.load_weights(h5_model)
     print("Loaded model from disk")
+    return model
 
-    list_solver_names = ['{}-h2-simpless-dks-celmcut'.format(TRAINING_REVISION_V2), '{}-h2-simpless-dks-cpdbshc900'.format(TRAINING_REVISION_V2), '{}-h2-simpless-dks-900masb50ksccdfp'.format(TRAINING_REVISION_V2), '{}-h2-simpless-oss-900masb50ksbmiasm'.format(TRAINING_REVISION_V2), '{}-h2-simpless-dks-blind'.format(TRAINING_REVISION_V2), '{}-h2-simpless-oss-zopdbsgenetic'.format(TRAINING_REVISION_V2), '{}-h2-simpless-oss-blind'.format(TRAINING_REVISION_V2), '{}-h2-simpless-dks-900masb50ksbmiasm'.format(TRAINING_REVISION_V2), 'seq-opt-symba-1', '{}-h2-simpless-oss-masginfsccdfp'.format(TRAINING_REVISION_V2), '{}-h2-simpless-dks-900masginfsccdfp'.format(TRAINING_REVISION_V2), '{}-h2-simpless-oss-cpdbshc900'.format(TRAINING_REVISION_V2), '{}-h2-simpless-dks-zopdbsgenetic'.format(TRAINING_REVISION_V2), '{}-simpless-oss-masb50kmiasmdfp'.format(TRAINING_REVISION_V1), '{}-h2-simpless-oss-900masb50ksccdfp'.format(TRAINING_REVISION_V2), '{}-simpless-dks-masb50kmiasmdfp'.format(TRAINING_REVISION_V1), '{}-h2-simpless-oss-celmcut'.format(TRAINING_REVISION_V2)]
 
-    #print(str(len(list_solver_names)) + " Solvers: ")
-    #print(list_solver_names)
+def get_model_input(images):
+    """Return the input of the model for a list of 128x128 grayscale images
+    (PIL images or arrays)."""
+    # Normalize feature image values to 0..1 range (assumes gray scale)
+    data = np.array([np.array(img) for img in images], dtype="float") / 255.0
+    return data.reshape(data.shape[0], 128, 128, 1)
 
-    list_x = []
 
-    img = Image.open(image)
-    list_x.append(np.array(img))
+def predict_scores(model, images, batch_size=PREDICTION_BATCH_SIZE):
+    """Return the array of scores of all solvers (in the order of
+    SOLVER_NAMES) for every image."""
+    return model.predict(get_model_input(images), batch_size=batch_size)
 
-    #print("\nNumber of total data points: " + str(len(list_x)))
-    # Normalize feature image values to 0..1 range (assumes gray scale)
-    data = np.array(list_x, dtype="float") / 255.0
-    data  = data.reshape( data.shape[0], 128, 128, 1 )
 
+def select_algorithm(model, img):
+    """Select an algorithm for the given 128x128 grayscale PIL image."""
     # For each test data point compute predictions for each of the solvers
-    preds = model.predict(data)
-    #print(preds)
-    selected_algorithm = list_solver_names[np.argmax(preds[0])]
+    preds = predict_scores(model, [img])
+    selected_algorithm = SOLVER_NAMES[np.argmax(preds[0])]
     print("Chose %s" % selected_algorithm)
 
     assert selected_algorithm in ALGORITHM_TO_COMMAND_LINE_STRING
     return selected_algorithm
+
+
+def select_algorithm_from_model(json_model, h5_model, image):
+    model = load_model(json_model, h5_model)
+    img = Image.open(image)
+    return select_algorithm(model, img)
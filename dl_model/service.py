@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""Line protocol of the planner selection service (see selector-daemon.py).
+
+A client sends one request per line, consisting of the name of the model
+("lifted" or "grounded") and the absolute path of a 128x128 grayscale
+image, separated by a single space. Requests and answers are encoded in
+UTF-8. The service answers with one line
+containing the name of the selected algorithm, or with a line starting
+with "error" if it could not select an algorithm.
+"""
+
+import os
+import socket
+
+try:
+    import socketserver
+except ImportError:
+    # Python 2
+    import SocketServer as socketserver
+
+from PIL import Image
+
+from . import selector
+
+ERROR_PREFIX = 'error'
+ENCODING = 'utf-8'
+
+
+class SelectorServiceError(Exception):
+    pass
+
+
+def answer_request(models, line):
+    try:
+        model_name, image_path = line.split(' ', 1)
+    except ValueError:
+        return '%s: malformed request "%s"' % (ERROR_PREFIX, line)
+    model = models.get(model_name)
+    if model is None:
+        return '%s: no model %s loaded' % (ERROR_PREFIX, model_name)
+    try:
+        return selector.select_algorithm(model, Image.open(image_path))
+    except Exception as err:
+        return '%s: %s' % (ERROR_PREFIX, err)
+
+
+def serve(models, infile, outfile):
+    """Answer requests read from infile until it is exhausted or an empty
+    line is read."""
+    while True:
+        line = infile.readline()
+        binary = isinstance(line, bytes)
+        if binary:
+            try:
+                line = line.decode(ENCODING)
+            except UnicodeDecodeError as err:
+                line = None
+                response = '%s: request is not %s: %s' % (ERROR_PREFIX, ENCODING, err)
+        if line is not None:
+            line = line.strip()
+            if not line:
+                return
+            response = answer_request(models, line)
+        response += '\n'
+        if binary:
+            response = response.encode(ENCODING)
+        outfile.write(response)
+        outfile.flush()
+
+
+def serve_on_socket(models, socket_path):
+    """Serve requests on a Unix domain socket, one connection at a time."""
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            serve(models, self.rfile, self.wfile)
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = socketserver.UnixStreamServer(socket_path, RequestHandler)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+
+
+def request_selection(socket_path, model_name, image_path, timeout=None):
+    """Ask the service listening on socket_path to select an algorithm for
+    the given image. Raise SelectorServiceError if there is no such service
+    or if it cannot answer the request."""
+    request = '%s %s\n' % (model_name, image_path)
+    try:
+        if not isinstance(request, bytes):
+            # Under Python 2, paths are usually already encoded.
+            request = request.encode(ENCODING)
+    except UnicodeError as err:
+        raise SelectorServiceError(
+            'cannot send request to the selector service: %s' % err)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+        sock.sendall(request)
+        response = sock.makefile('rb').readline().decode(ENCODING).strip()
+    except (socket.error, socket.timeout, UnicodeError) as err:
+        raise SelectorServiceError(
+            'selector service at %s not available: %s' % (socket_path, err))
+    finally:
+        sock.close()
+    if not response or response.startswith(ERROR_PREFIX):
+        raise SelectorServiceError(
+            'selector service could not answer request: %s' % response)
+    return response
@@ -327,6 +327,23 @@ def parse_args():
     driver_other.add_argument(
         "--portfolio", metavar="FILE",
         help="run a portfolio specified in FILE")
+    driver_other.add_argument(
+        "--portfolio-jobs", metavar="N", type=int, default=1,
+        help="run up to N configs of a portfolio in parallel; the time "
+            "limit of the portfolio is then a wall-clock limit and the "
+            "memory limit is split between the configs (default: %(default)s)")
+
+    driver_other.add_argument(
+        "--resource-control", choices=["rlimit", "cgroup"], default="rlimit",
+        help="limit the memory of the components with rlimits (RLIMIT_AS) "
+            "or with cgroup v2 if possible, which needs write access to the "
+            "cgroup of the driver; time limits always use rlimits "
+            "(default: %(default)s)")
+    driver_other.add_argument(
+        "--run-summary", metavar="FILE",
+        help="write the limits, exit codes and resource usage (wall-clock "
+            "time, CPU time, peak memory) of all component runs to FILE "
+            "in JSON format")
 
     driver_other.add_argument(
         "--cleanup", action="store_true",
@@ -362,6 +379,9 @@ def parse_args():
             ("--portfolio", args.portfolio is not None),
             ("options for search component", bool(args.search_options))])
 
+    if args.portfolio_jobs < 1:
+        parser.error("--portfolio-jobs must be at least 1")
+
     _convert_limits_to_ints(parser, args)
 
     if args.alias:
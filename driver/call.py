@@ -2,29 +2,193 @@
 
 from __future__ import print_function
 
-"""Make subprocess calls with time and memory limits."""
+"""Make subprocess calls with time and memory limits.
 
+Memory limits are set with RLIMIT_AS unless use_cgroups() has been
+called successfully (see the cgroups module). The resource usage of
+every call is added to the run summary (see the run_summary module).
+"""
+
+from . import cgroups
 from . import limits
+from . import returncodes
+from . import run_summary
 
+import errno
+import os
+import signal
 import subprocess
 import sys
+import time
+
+_cgroup_manager = None
+
 
+def use_cgroups():
+    """Limit the memory of the following calls with cgroups if possible.
+    Return whether cgroups are used."""
+    global _cgroup_manager
+    _cgroup_manager = cgroups.create_manager()
+    if _cgroup_manager is not None:
+        run_summary.set_resource_control("cgroup")
+    return _cgroup_manager is not None
 
-def check_call(cmd, stdin=None, time_limit=None, memory_limit=None):
+
+def _get_limit_kwargs(time_limit, memory_limit, cgroup=None):
     def set_limits():
+        if cgroup is not None:
+            cgroup.add_current_process()
         limits.set_time_limit(time_limit)
-        limits.set_memory_limit(memory_limit)
+        if cgroup is None:
+            limits.set_memory_limit(memory_limit)
 
     kwargs = {}
-    if time_limit is not None or memory_limit is not None:
+    if cgroup is not None:
+        kwargs["preexec_fn"] = set_limits
+    elif time_limit is not None or memory_limit is not None:
         if limits.can_set_limits():
             kwargs["preexec_fn"] = set_limits
         else:
             sys.exit(limits.RESOURCE_MODULE_MISSING_MSG)
+    return kwargs
+
+
+def _get_returncode(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _wait4(pid, options):
+    while True:
+        try:
+            return os.wait4(pid, options)
+        except OSError as err:
+            # Python 2 does not retry system calls interrupted by signals.
+            if err.errno != errno.EINTR:
+                raise
+
+
+class Process(object):
+    """A component process started with start_process.
+
+    The process is reaped with wait4 to get its resource usage, so it
+    must only be waited for with the methods of this class."""
+    def __init__(self, cmd, name, time_limit, memory_limit, cgroup, popen,
+                 start_time):
+        self.cmd = cmd
+        self.name = name
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.cgroup = cgroup
+        self.popen = popen
+        self.pid = popen.pid
+        self.start_time = start_time
+        self.returncode = None
+
+    def poll(self):
+        """Return the exit code or None if the process is still running."""
+        return self._wait(os.WNOHANG)
+
+    def wait(self):
+        return self._wait(0)
+
+    def kill(self):
+        if self.returncode is None:
+            self.popen.kill()
+
+    def _wait(self, options):
+        if self.returncode is not None:
+            return self.returncode
+        if not hasattr(os, "wait4"):
+            if options == os.WNOHANG:
+                returncode = self.popen.poll()
+            else:
+                returncode = self.popen.wait()
+            if returncode is not None:
+                self._finish(returncode, None)
+            return returncode
+        pid, status, rusage = _wait4(self.pid, options)
+        if pid == 0:
+            return None
+        returncode = _get_returncode(status)
+        # Keep subprocess from waiting for the reaped process.
+        self.popen.returncode = returncode
+        self._finish(returncode, rusage)
+        return self.returncode
+
+    def _finish(self, returncode, rusage):
+        wall_time = time.time() - self.start_time
+        cgroup_stats = None
+        if self.cgroup is not None:
+            cgroup_stats = self.cgroup.get_stats()
+            self.cgroup.remove()
+            if (returncode == -signal.SIGKILL and
+                    cgroup_stats["oom_kills"]):
+                print("%s was killed because it reached the memory limit "
+                      "of its cgroup." % self.name)
+                returncode = returncodes.EXIT_OUT_OF_MEMORY
+        self.returncode = returncode
+        component = {
+            "name": self.name,
+            "command": self.cmd,
+            "time_limit": self.time_limit,
+            "memory_limit": self.memory_limit,
+            "limit_method": "cgroup" if self.cgroup else "rlimit",
+            "exitcode": returncode,
+            "wall_time": wall_time,
+            "cpu_time": None,
+            "user_time": None,
+            "system_time": None,
+            "peak_rss_kb": None,
+            "cgroup": cgroup_stats,
+        }
+        if rusage is not None:
+            component["user_time"] = rusage.ru_utime
+            component["system_time"] = rusage.ru_stime
+            component["cpu_time"] = rusage.ru_utime + rusage.ru_stime
+            # ru_maxrss is given in KB on Linux.
+            component["peak_rss_kb"] = rusage.ru_maxrss
+        run_summary.add_component(component)
+
+
+def start_process(cmd, stdin=None, time_limit=None, memory_limit=None,
+                  name=None):
+    """Start the command with the given limits like check_call, but
+    return a Process object without waiting for the command."""
+    if name is None:
+        name = os.path.basename(cmd[0])
+    cgroup = None
+    if _cgroup_manager is not None:
+        cgroup = _cgroup_manager.create_cgroup(memory_limit)
+    kwargs = _get_limit_kwargs(time_limit, memory_limit, cgroup)
 
     sys.stdout.flush()
-    if stdin:
-        with open(stdin) as stdin_file:
-            return subprocess.check_call(cmd, stdin=stdin_file, **kwargs)
-    else:
-        return subprocess.check_call(cmd, **kwargs)
+    start_time = time.time()
+    try:
+        if stdin:
+            with open(stdin) as stdin_file:
+                popen = subprocess.Popen(cmd, stdin=stdin_file, **kwargs)
+        else:
+            popen = subprocess.Popen(cmd, **kwargs)
+    except:
+        if cgroup is not None:
+            cgroup.remove()
+        raise
+    return Process(cmd, name, time_limit, memory_limit, cgroup, popen,
+                   start_time)
+
+
+def check_call(cmd, stdin=None, time_limit=None, memory_limit=None,
+               name=None):
+    process = start_process(cmd, stdin=stdin, time_limit=time_limit,
+                            memory_limit=memory_limit, name=name)
+    try:
+        returncode = process.wait()
+    except:
+        process.kill()
+        process.wait()
+        raise
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return 0
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+"""Memory limits and resource accounting with cgroup v2.
+
+RLIMIT_AS limits the virtual memory of a process, which includes address
+space that allocators reserve but never use. The memory controller of
+cgroup v2 limits (and measures) the memory that the processes of a
+cgroup actually use, including all processes that they start.
+
+To use it, the driver needs write access to its own cgroup (e.g. a
+cgroup delegated by systemd-run --user --scope -p Delegate=yes). The
+driver moves itself into the leaf cgroup DRIVER_CGROUP, enables the
+memory controller for the children of its cgroup and runs every
+component in a new child cgroup. Cgroups cannot limit the CPU time of a
+process (cpu.max only limits its CPU bandwidth), so time limits are
+still set with RLIMIT_CPU.
+"""
+
+import errno
+import os
+import sys
+
+DRIVER_CGROUP = "driver"
+
+
+def _read_file(filename):
+    with open(filename) as input_file:
+        return input_file.read()
+
+
+def _write_file(filename, content):
+    with open(filename, "w") as output_file:
+        output_file.write(content)
+
+
+def _find_cgroup2_mount():
+    with open("/proc/mounts") as mounts:
+        for line in mounts:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "cgroup2":
+                return parts[1]
+    return None
+
+
+def _find_own_cgroup():
+    """Return the path of the cgroup v2 of this process relative to the
+    cgroup2 mount point, or None."""
+    with open("/proc/self/cgroup") as cgroup_file:
+        for line in cgroup_file:
+            hierarchy, controllers, path = line.rstrip("\n").split(":", 2)
+            if hierarchy == "0" and not controllers:
+                return path
+    return None
+
+
+def _read_key_values(filename):
+    values = {}
+    for line in _read_file(filename).splitlines():
+        key, value = line.split()
+        values[key] = int(value)
+    return values
+
+
+class Cgroup(object):
+    """The cgroup of a single component run."""
+    def __init__(self, path):
+        self.path = path
+
+    def add_current_process(self):
+        # Writing 0 moves the writing process. This is called in the
+        # child process before it executes the component.
+        _write_file(os.path.join(self.path, "cgroup.procs"), "0")
+
+    def get_stats(self):
+        """Return the peak memory usage (in KB), the number of processes
+        killed because the memory limit was reached and the CPU time (in
+        seconds) of all processes that ran in the cgroup. Values that
+        the kernel does not provide are None."""
+        stats = {"peak_memory_kb": None, "oom_kills": None, "cpu_time": None}
+        try:
+            stats["peak_memory_kb"] = int(_read_file(
+                os.path.join(self.path, "memory.peak"))) // 1024
+        except (IOError, OSError, ValueError):
+            # memory.peak needs Linux >= 5.19.
+            pass
+        try:
+            stats["oom_kills"] = _read_key_values(
+                os.path.join(self.path, "memory.events")).get("oom_kill")
+            stats["cpu_time"] = _read_key_values(
+                os.path.join(self.path, "cpu.stat"))["usage_usec"] / 1e6
+        except (IOError, OSError, KeyError, ValueError):
+            pass
+        return stats
+
+    def remove(self):
+        try:
+            os.rmdir(self.path)
+        except OSError:
+            # Processes that the component left behind still use the
+            # cgroup. The kernel keeps it until we can remove it.
+            pass
+
+
+class CgroupManager(object):
+    def __init__(self, path):
+        self.path = path
+        self.num_cgroups = 0
+
+    def create_cgroup(self, memory_limit):
+        """Create the cgroup for a component with the given memory limit
+        in bytes (or None)."""
+        self.num_cgroups += 1
+        path = os.path.join(
+            self.path, "component-%d-%d" % (os.getpid(), self.num_cgroups))
+        os.mkdir(path)
+        cgroup = Cgroup(path)
+        try:
+            if memory_limit is not None:
+                _write_file(os.path.join(path, "memory.max"), str(memory_limit))
+                swap_max = os.path.join(path, "memory.swap.max")
+                if os.path.exists(swap_max):
+                    # Otherwise the limit only applies to physical memory.
+                    _write_file(swap_max, "0")
+        except (IOError, OSError):
+            cgroup.remove()
+            raise
+        return cgroup
+
+
+def create_manager():
+    """Prepare the cgroup of the driver for running components in child
+    cgroups. Return a CgroupManager, or None (after printing the reason)
+    if the memory controller of cgroup v2 cannot be used."""
+    def unavailable(reason):
+        print("Cannot use cgroups (%s). Falling back to rlimits." % reason,
+              file=sys.stderr)
+        return None
+
+    if not sys.platform.startswith("linux"):
+        return unavailable("not on Linux")
+    try:
+        mount = _find_cgroup2_mount()
+        own_cgroup = _find_own_cgroup()
+    except (IOError, OSError) as err:
+        return unavailable(err)
+    if mount is None or own_cgroup is None:
+        return unavailable("cgroup v2 is not mounted")
+    path = os.path.join(mount, own_cgroup.lstrip("/"))
+    try:
+        controllers = _read_file(
+            os.path.join(path, "cgroup.controllers")).split()
+        if "memory" not in controllers:
+            return unavailable("the memory controller is not available")
+        driver_path = os.path.join(path, DRIVER_CGROUP)
+        try:
+            os.mkdir(driver_path)
+        except OSError as err:
+            if err.errno != errno.EEXIST:
+                raise
+        # A cgroup that enables controllers for its children cannot
+        # contain processes itself.
+        _write_file(os.path.join(driver_path, "cgroup.procs"), str(os.getpid()))
+        try:
+            _write_file(os.path.join(path, "cgroup.subtree_control"), "+memory")
+        except (IOError, OSError):
+            _write_file(os.path.join(path, "cgroup.procs"), str(os.getpid()))
+            raise
+    except (IOError, OSError) as err:
+        return unavailable(err)
+    return CgroupManager(path)
@@ -152,6 +152,16 @@ def get_memory_limit(component_limit, overall_limit):
     limits = [limit for limit in limits if limit is not None]
     return min(limits) if limits else None
 
+def get_parallel_memory_limit(memory_limit, num_processes):
+    """
+    Return the memory limit of each of *num_processes* processes that
+    run in parallel and must not use more than *memory_limit* bytes (or
+    None) together.
+    """
+    if memory_limit is None:
+        return None
+    return memory_limit // num_processes
+
 def get_time_limit(component_limit, overall_limit):
     """
     Return the minimum time limit imposed by any internal and external limit.
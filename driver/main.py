@@ -7,8 +7,10 @@ import sys
 
 from . import aliases
 from . import arguments
+from . import call
 from . import cleanup
 from . import run_components
+from . import run_summary
 from . import timers
 
 
@@ -27,6 +29,9 @@ def main():
         cleanup.cleanup_temporary_files(args)
         sys.exit()
 
+    if args.resource_control == "cgroup":
+        call.use_cgroups()
+
     # If validation succeeds, exit with the search component's exitcode.
     exitcode = None
     timer = timers.Timer()
@@ -47,6 +52,8 @@ def main():
             exitcode = err.returncode
             break
     print("Overall time: {}".format(timer))
+    if args.run_summary:
+        run_summary.write(args.run_summary, exitcode)
     sys.exit(exitcode)
 
 
@@ -91,6 +91,25 @@ class PlanManager(object):
                         bogus_plan("plan quality has not improved")
                 self._plan_costs.append(cost)
 
+    def add_plan(self, plan_filename):
+        """Add a plan that a planner run wrote to its own plan file.
+
+        If the plan is better than the best plan so far, it is moved to
+        the next plan file. Otherwise it is deleted. Return False (and
+        keep the file) if the plan is incomplete, i.e., still being
+        written."""
+        cost, _ = _parse_plan(plan_filename)
+        if cost is None:
+            return False
+        if self._plan_costs and cost >= self._plan_costs[-1]:
+            print("plan manager: ignored plan with cost %d" % cost)
+            os.remove(plan_filename)
+        else:
+            os.rename(plan_filename,
+                      self._get_plan_file(self.get_plan_counter() + 1))
+            self.process_new_plans()
+        return True
+
     def get_existing_plans(self):
         """Yield all plans that match the given plan prefix."""
         if os.path.exists(self._plan_prefix):
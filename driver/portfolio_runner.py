@@ -14,7 +14,20 @@ we will have to reduce the memory limit of the planner calls by the
 amount of memory that the Python process needs. On maia for example
 this amounts to 128MB of reserved virtual memory. We can make Python
 reserve less space by lowering the soft limit for virtual memory before
-the process is started.
+the process is started. With --resource-control=cgroup, the memory
+limits are cgroup limits, which do not include reserved virtual memory
+(see the cgroups module).
+
+Parallel portfolios: With more than one job, up to that many configs run
+at the same time on the same task. The time limit of the portfolio is
+then a wall-clock limit and the memory limit is split evenly between the
+jobs. Every config gets a CPU time limit that corresponds to its share of
+the remaining time when it is started. For optimal portfolios, all other
+configs are killed when the first config finds a plan or proves the task
+unsolvable. For satisficing portfolios, every config writes its plans to
+its own plan files. Plans that improve on the best plan so far are
+collected in the plan manager while the configs run, and configs that
+are started later use the cost of the best plan as bound.
 """
 
 __all__ = ["run"]
@@ -22,6 +35,7 @@ __all__ = ["run"]
 import os
 import subprocess
 import sys
+import time
 import traceback
 
 from . import call
@@ -32,6 +46,10 @@ from . import util
 
 DEFAULT_TIMEOUT = 1800
 
+# Seconds between checks for finished configs and new plans of parallel
+# portfolios.
+POLL_INTERVAL = 0.1
+
 
 def adapt_heuristic_cost_type(arg, cost_type):
     if cost_type == "normal":
@@ -68,7 +86,8 @@ def adapt_args(args, search_cost_type, heuristic_cost_type, plan_manager):
             break
 
 
-def run_search(executable, args, sas_file, plan_manager, time, memory):
+def run_search(executable, args, sas_file, plan_manager, time, memory,
+               name=None):
     complete_args = [executable] + args + [
         "--internal-plan-file", plan_manager.get_plan_prefix()]
     print("args: %s" % complete_args)
@@ -76,7 +95,7 @@ def run_search(executable, args, sas_file, plan_manager, time, memory):
     try:
         exitcode = call.check_call(
             complete_args, stdin=sas_file,
-            time_limit=time, memory_limit=memory)
+            time_limit=time, memory_limit=memory, name=name)
     except subprocess.CalledProcessError as err:
         exitcode = err.returncode
     print("exitcode: %d" % exitcode)
@@ -106,7 +125,8 @@ def run_sat_config(configs, pos, search_cost_type, heuristic_cost_type,
     adapt_args(args, search_cost_type, heuristic_cost_type, plan_manager)
     args.extend([
         "--internal-previous-portfolio-plans", str(plan_manager.get_plan_counter())])
-    result = run_search(executable, args, sas_file, plan_manager, run_time, memory)
+    result = run_search(executable, args, sas_file, plan_manager, run_time,
+                        memory, name="search (config %d)" % pos)
     plan_manager.process_new_plans()
     return result
 
@@ -174,13 +194,249 @@ def run_opt(configs, executable, sas_file, plan_manager, timeout, memory):
     for pos, (relative_time, args) in enumerate(configs):
         run_time = compute_run_time(timeout, configs, pos)
         exitcode = run_search(executable, args, sas_file, plan_manager,
-                              run_time, memory)
+                              run_time, memory, name="search (config %d)" % pos)
         yield exitcode
 
         if exitcode in [returncodes.EXIT_PLAN_FOUND, returncodes.EXIT_UNSOLVABLE]:
             break
 
 
+def compute_parallel_run_time(deadline, configs, pos, jobs):
+    remaining_time = deadline - time.time()
+    print("remaining time: {}".format(remaining_time))
+    relative_time = configs[pos][0]
+    remaining_relative_time = sum(config[0] for config in configs[pos:])
+    print("config {}: relative time {}, remaining {}".format(
+          pos, relative_time, remaining_relative_time))
+    # The configs that remain share the jobs, so a config gets up to *jobs*
+    # times its share of the remaining time.
+    return min(remaining_time,
+               remaining_time * jobs * relative_time / remaining_relative_time)
+
+
+class _Job(object):
+    def __init__(self, pos, process, plan_prefix, anytime, is_rerun):
+        self.pos = pos
+        self.process = process
+        self.plan_prefix = plan_prefix
+        self.anytime = anytime
+        self.is_rerun = is_rerun
+        self.next_plan_number = 1
+
+
+class ParallelRunner(object):
+    """
+    Run configs in parallel processes that write their plans to their own
+    plan files.
+
+    The plans of anytime configs (satisficing portfolios) are added to the
+    plan manager as soon as they are complete. The plan of any other config
+    is moved to the plan file of the plan manager when the config finishes
+    with EXIT_PLAN_FOUND.
+    """
+    def __init__(self, executable, sas_file, plan_manager, deadline):
+        self.executable = executable
+        self.sas_file = sas_file
+        self.plan_manager = plan_manager
+        self.deadline = deadline
+        self.running = []
+        self.num_started = 0
+
+    def start(self, pos, args, time_limit, memory, anytime, is_rerun=False):
+        plan_prefix = "%s.job%d" % (
+            self.plan_manager.get_plan_prefix(), self.num_started)
+        self.num_started += 1
+        complete_args = [self.executable] + args + [
+            "--internal-plan-file", plan_prefix]
+        if anytime:
+            complete_args.extend(["--internal-previous-portfolio-plans", "0"])
+        print("config %d args: %s" % (pos, complete_args))
+        process = call.start_process(
+            complete_args, stdin=self.sas_file,
+            time_limit=time_limit, memory_limit=memory,
+            name="search (config %d)" % pos)
+        self.running.append(_Job(pos, process, plan_prefix, anytime, is_rerun))
+
+    def _add_plans(self, job):
+        if not job.anytime:
+            return
+        while True:
+            plan_file = "%s.%d" % (job.plan_prefix, job.next_plan_number)
+            if (not os.path.exists(plan_file) or
+                    not self.plan_manager.add_plan(plan_file)):
+                break
+            job.next_plan_number += 1
+
+    def _remove_plan_files(self, job):
+        if os.path.exists(job.plan_prefix):
+            os.remove(job.plan_prefix)
+        number = job.next_plan_number
+        while os.path.exists("%s.%d" % (job.plan_prefix, number)):
+            os.remove("%s.%d" % (job.plan_prefix, number))
+            number += 1
+
+    def _finish(self, job, exitcode):
+        self.running.remove(job)
+        self._add_plans(job)
+        if not job.anytime and exitcode == returncodes.EXIT_PLAN_FOUND:
+            os.rename(job.plan_prefix, self.plan_manager.get_plan_prefix())
+        self._remove_plan_files(job)
+
+    def wait(self):
+        """Wait until a config finishes and return its job and exit code.
+        Return (None, None) if the deadline is reached first."""
+        assert self.running
+        while True:
+            for job in self.running:
+                self._add_plans(job)
+                exitcode = job.process.poll()
+                if exitcode is not None:
+                    self._finish(job, exitcode)
+                    print("config %d exitcode: %d" % (job.pos, exitcode))
+                    print()
+                    return job, exitcode
+            if time.time() >= self.deadline:
+                return None, None
+            time.sleep(POLL_INTERVAL)
+
+    def kill_all(self):
+        """Kill all running configs and return their number. Complete plans
+        of anytime configs are still added to the plan manager."""
+        num_killed = len(self.running)
+        for job in list(self.running):
+            if job.process.poll() is None:
+                job.process.kill()
+                job.process.wait()
+            print("config %d killed" % job.pos)
+            self.running.remove(job)
+            self._add_plans(job)
+            self._remove_plan_files(job)
+        return num_killed
+
+
+def run_parallel_sat(configs, executable, sas_file, plan_manager,
+                     final_config, final_config_builder, time_limit, memory,
+                     jobs):
+    # See run_sat for the cost types, the final config and the rounds.
+    deadline = time.time() + time_limit
+    heuristic_cost_type = "one"
+    search_cost_type = "one"
+    changed_cost_types = False
+    waiting_for_rerun = False
+    runner = ParallelRunner(executable, sas_file, plan_manager, deadline)
+    try:
+        while configs:
+            configs_next_round = []
+            # Pairs of the position of a config and whether it is rerun
+            # with real costs.
+            pending = [(pos, False) for pos in range(len(configs))]
+            while pending or runner.running:
+                while pending and len(runner.running) < jobs:
+                    pos, is_rerun = pending.pop(0)
+                    run_time = compute_parallel_run_time(
+                        deadline, configs, pos, jobs)
+                    if run_time <= 0:
+                        return
+                    args = list(configs[pos][1])
+                    adapt_args(args, search_cost_type, heuristic_cost_type,
+                               plan_manager)
+                    runner.start(pos, args, run_time, memory, anytime=True,
+                                 is_rerun=is_rerun)
+
+                job, exitcode = runner.wait()
+                if job is None:
+                    for _ in range(runner.kill_all()):
+                        yield returncodes.EXIT_TIMEOUT
+                    return
+
+                yield exitcode
+                if exitcode == returncodes.EXIT_UNSOLVABLE:
+                    return
+
+                relative_time, args = configs[job.pos]
+                if exitcode == returncodes.EXIT_PLAN_FOUND and not job.is_rerun:
+                    configs_next_round.append((relative_time, args))
+                    if (not changed_cost_types and can_change_cost_type(args) and
+                        plan_manager.get_problem_type() == "general cost"):
+                        print("Switch to real costs and repeat last run.")
+                        changed_cost_types = True
+                        search_cost_type = "normal"
+                        heuristic_cost_type = "plusone"
+                        pending.insert(0, (job.pos, True))
+                        # Like run_sat, we build the final config after
+                        # the repeated run.
+                        waiting_for_rerun = True
+                        continue
+                if job.is_rerun:
+                    waiting_for_rerun = False
+                elif exitcode != returncodes.EXIT_PLAN_FOUND or waiting_for_rerun:
+                    continue
+                if final_config_builder:
+                    print("Build final config.")
+                    final_config = final_config_builder(args)
+                    break
+
+            if final_config:
+                break
+
+            # Only run the successful configs in the next round.
+            configs = configs_next_round
+
+        if final_config:
+            print("Abort portfolio and run final config.")
+            runner.kill_all()
+            run_time = compute_parallel_run_time(
+                deadline, [(1, final_config)], 0, 1)
+            if run_time <= 0:
+                return
+            args = list(final_config)
+            adapt_args(args, search_cost_type, heuristic_cost_type,
+                       plan_manager)
+            # The final config runs alone and can use all of the memory.
+            runner.start(0, args, run_time, memory * jobs if memory else None,
+                         anytime=True)
+            job, exitcode = runner.wait()
+            if job is None:
+                runner.kill_all()
+                exitcode = returncodes.EXIT_TIMEOUT
+            yield exitcode
+    finally:
+        runner.kill_all()
+
+
+def run_parallel_opt(configs, executable, sas_file, plan_manager, time_limit,
+                     memory, jobs):
+    deadline = time.time() + time_limit
+    runner = ParallelRunner(executable, sas_file, plan_manager, deadline)
+    try:
+        pos = 0
+        while pos < len(configs) or runner.running:
+            while pos < len(configs) and len(runner.running) < jobs:
+                run_time = compute_parallel_run_time(deadline, configs, pos, jobs)
+                if run_time <= 0:
+                    pos = len(configs)
+                    break
+                runner.start(pos, list(configs[pos][1]), run_time, memory,
+                             anytime=False)
+                pos += 1
+            if not runner.running:
+                break
+
+            job, exitcode = runner.wait()
+            if job is None:
+                for _ in range(runner.kill_all()):
+                    yield returncodes.EXIT_TIMEOUT
+                return
+
+            yield exitcode
+            if exitcode in [returncodes.EXIT_PLAN_FOUND,
+                            returncodes.EXIT_UNSOLVABLE]:
+                # The other configs cannot find a better plan.
+                break
+    finally:
+        runner.kill_all()
+
+
 def can_change_cost_type(args):
     return any("S_COST_TYPE" in part or "H_COST_TRANSFORM" in part for part in args)
 
@@ -204,12 +460,13 @@ def get_portfolio_attributes(portfolio):
     return attributes
 
 
-def run(portfolio, executable, sas_file, plan_manager, time, memory):
+def run(portfolio, executable, sas_file, plan_manager, time, memory, jobs=1):
     """
     Run the configs in the given portfolio file.
 
     The portfolio is allowed to run for at most *time* seconds and may
-    use a maximum of *memory* bytes.
+    use a maximum of *memory* bytes. With *jobs* > 1, up to *jobs*
+    configs run in parallel (see the module documentation).
     """
     attributes = get_portfolio_attributes(portfolio)
     configs = attributes["CONFIGS"]
@@ -229,6 +486,24 @@ def run(portfolio, executable, sas_file, plan_manager, time, memory):
                 "Portfolios need a time limit. Please pass --search-time-limit "
                 "or --overall-time-limit to fast-downward.py.")
 
+    if jobs > 1:
+        jobs = min(jobs, len(configs))
+        print("parallel portfolio with {} jobs".format(jobs))
+        memory = limits.get_parallel_memory_limit(memory, jobs)
+        if optimal:
+            exitcodes = run_parallel_opt(
+                configs, executable, sas_file, plan_manager, time, memory,
+                jobs)
+        else:
+            exitcodes = run_parallel_sat(
+                configs, executable, sas_file, plan_manager, final_config,
+                final_config_builder, time, memory, jobs)
+        exitcode = returncodes.generate_portfolio_exitcode(exitcodes)
+        if exitcode != 0:
+            raise subprocess.CalledProcessError(
+                exitcode, ["run-portfolio", portfolio])
+        return
+
     timeout = util.get_elapsed_time() + time
 
     if optimal:
@@ -70,7 +70,7 @@ def print_callstring(executable, options, stdin):
 
 
 def call_component(executable, options, stdin=None,
-                   time_limit=None, memory_limit=None):
+                   time_limit=None, memory_limit=None, name=None):
     if executable.endswith(".py"):
         options.insert(0, executable)
         executable = sys.executable
@@ -78,7 +78,8 @@ def call_component(executable, options, stdin=None,
     print_callstring(executable, options, stdin)
     call.check_call(
         [executable] + options,
-        stdin=stdin, time_limit=time_limit, memory_limit=memory_limit)
+        stdin=stdin, time_limit=time_limit, memory_limit=memory_limit,
+        name=name)
 
 
 def run_translate(args):
@@ -93,7 +94,7 @@ def run_translate(args):
     translate = get_executable(args.build, REL_TRANSLATE_PATH)
     call_component(
         translate, args.translate_inputs + args.translate_options,
-        time_limit=time_limit, memory_limit=memory_limit)
+        time_limit=time_limit, memory_limit=memory_limit, name="translate")
 
 
 def transform_task(args):
@@ -101,7 +102,8 @@ def transform_task(args):
     try:
         transform = get_executable(args.build, args.transform_task)
         logging.info("Absolute path: %s" % transform)
-        call_component(transform, [], stdin="output.sas")
+        call_component(transform, [], stdin="output.sas",
+                       name="transform-task")
 
     except OSError as err:
         if err.errno == errno.ENOENT:
@@ -130,7 +132,7 @@ def run_search(args):
         logging.info("search portfolio: %s" % args.portfolio)
         portfolio_runner.run(
             args.portfolio, search, args.search_input, plan_manager,
-            time_limit, memory_limit)
+            time_limit, memory_limit, args.portfolio_jobs)
     else:
         if not args.search_options:
             raise ValueError(
@@ -141,7 +143,8 @@ def run_search(args):
             call_component(
                 search, args.search_options,
                 stdin=args.search_input,
-                time_limit=time_limit, memory_limit=memory_limit)
+                time_limit=time_limit, memory_limit=memory_limit,
+                name="search")
         except subprocess.CalledProcessError as err:
             if err.returncode in returncodes.EXPECTED_EXITCODES:
                 return err.returncode
@@ -171,7 +174,7 @@ def run_validate(args):
         time_limit=None, memory_limit=VALIDATE_MEMORY_LIMIT_IN_MB)
 
     try:
-        call_component(VALIDATE, validate_inputs)
+        call_component(VALIDATE, validate_inputs, name="validate")
     except OSError as err:
         if err.errno == errno.ENOENT:
             sys.exit("Error: %s not found. Is it on the PATH?" % VALIDATE)
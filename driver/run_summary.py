@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""Structured summary of a driver run (option --run-summary).
+
+Every component process that the driver starts through the call module
+is recorded with its limits, its exit code and the resources that it
+used: the wall-clock time, the CPU time and peak resident set size
+reported by wait4 (which include the child processes of the component
+that it waited for) and, if the component ran in a cgroup, the peak
+memory usage, CPU time and OOM kills of the whole cgroup.
+"""
+
+import json
+import sys
+import time
+
+SUMMARY_VERSION = 1
+
+_start_time = time.time()
+_components = []
+_resource_control = "rlimit"
+
+
+def set_resource_control(method):
+    global _resource_control
+    _resource_control = method
+
+
+def add_component(component):
+    _components.append(component)
+
+
+def get_components():
+    return list(_components)
+
+
+def write(filename, exitcode):
+    summary = {
+        "version": SUMMARY_VERSION,
+        "command": sys.argv,
+        "resource_control": _resource_control,
+        "exitcode": exitcode,
+        "wall_time": time.time() - _start_time,
+        "components": _components,
+    }
+    with open(filename, "w") as summary_file:
+        json.dump(summary, summary_file, indent=2, sort_keys=True)
+        summary_file.write("\n")
@@ -6,12 +6,18 @@ Test module for Fast Downward driver script. Run with
     py.test driver/tests.py
 """
 
+import json
 import os
 import subprocess
+import sys
 
 from .aliases import ALIASES, PORTFOLIOS
 from .arguments import EXAMPLES
+from . import call
 from . import limits
+from . import portfolio_runner
+from . import run_summary
+from .plan_manager import PlanManager
 from .returncodes import EXIT_PLAN_FOUND, EXIT_UNSOLVED_INCOMPLETE
 from .util import REPO_ROOT_DIR, find_domain_filename
 
@@ -67,6 +73,96 @@ def test_time_limits():
             (expected_soft, expected_hard))
 
 
+# A fake search component for the parallel portfolio tests. The search
+# option is "sleep(SECONDS)" or "plan(COST)", possibly followed by ",bound=B". The
+# search writes its arguments to FILE.log for every "--log FILE" option.
+FAKE_SEARCH = """#! %s
+import sys, time
+args = sys.argv[1:]
+search = args[args.index("--search") + 1]
+plan_file = args[args.index("--internal-plan-file") + 1]
+if "--log" in args:
+    with open(args[args.index("--log") + 1], "a") as log:
+        log.write(search + "\\n")
+if search.startswith("sleep"):
+    time.sleep(int(search[len("sleep("):search.index(")")]))
+    sys.exit(5)
+cost = int(search[len("plan("):search.index(")")])
+if "bound=" in search:
+    bound = search.split("bound=")[1]
+    if bound != "infinity" and cost >= int(bound):
+        sys.exit(5)
+if "--internal-previous-portfolio-plans" in args:
+    plan_file += ".1"
+with open(plan_file, "w") as plan:
+    plan.write("(a)\\n; cost = %%d (unit cost)\\n" %% cost)
+sys.exit(0)
+""" % sys.executable
+
+
+def run_fake_portfolio(tmpdir, configs, optimal, jobs):
+    search = tmpdir.join("search")
+    search.write(FAKE_SEARCH)
+    search.chmod(0o755)
+    sas_file = tmpdir.join("output.sas")
+    sas_file.write("")
+    portfolio = tmpdir.join("portfolio.py")
+    portfolio.write("OPTIMAL = %r\nCONFIGS = %r\n" % (optimal, configs))
+    plan_manager = PlanManager(str(tmpdir.join("sas_plan")))
+    portfolio_runner.run(str(portfolio), str(search), str(sas_file),
+                         plan_manager, 100, None, jobs)
+    return plan_manager
+
+
+def test_parallel_opt_portfolio(tmpdir):
+    configs = [(1, ["--search", "sleep(60)"]), (1, ["--search", "plan(3)"])]
+    run_fake_portfolio(tmpdir, configs, True, 2)
+    assert tmpdir.join("sas_plan").check()
+    assert not tmpdir.listdir(lambda path: ".job" in path.basename)
+
+
+def test_parallel_sat_portfolio(tmpdir):
+    log = str(tmpdir.join("log"))
+    configs = [
+        (1, ["--search", "plan(7),bound=BOUND", "--log", log]),
+        (1, ["--search", "sleep(1),bound=BOUND"]),
+        (1, ["--search", "plan(4),bound=BOUND", "--log", log])]
+    plan_manager = run_fake_portfolio(tmpdir, configs, False, 2)
+    # The last config is started with the cost of the first plan as bound.
+    # In the second round, the first config cannot find a better plan.
+    searches = tmpdir.join("log").readlines()
+    assert searches[:2] == ["plan(7),bound=infinity\n", "plan(4),bound=7\n"]
+    assert sorted(searches[2:]) == ["plan(4),bound=4\n", "plan(7),bound=4\n"]
+    assert plan_manager.get_plan_counter() == 2
+    assert plan_manager.get_best_plan_cost() == 4
+    assert not tmpdir.listdir(lambda path: ".job" in path.basename)
+
+
+def test_component_resource_usage(tmpdir):
+    cmd = [sys.executable, "-c",
+           "import sys; data = bytearray(50 * 1024 * 1024); sys.exit(5)"]
+    try:
+        call.check_call(cmd, time_limit=10, name="allocate")
+    except subprocess.CalledProcessError as err:
+        assert err.returncode == 5
+    else:
+        assert False
+    component = run_summary.get_components()[-1]
+    assert component["name"] == "allocate"
+    assert component["exitcode"] == 5
+    assert component["time_limit"] == 10
+    assert component["peak_rss_kb"] >= 50 * 1024
+    assert component["cpu_time"] >= 0
+    assert component["wall_time"] >= 0
+
+    summary_file = str(tmpdir.join("summary.json"))
+    run_summary.write(summary_file, 5)
+    with open(summary_file) as summary:
+        summary = json.load(summary)
+    assert summary["exitcode"] == 5
+    assert summary["components"][-1]["name"] == "allocate"
+
+
 def test_automatic_domain_file_name_computation():
     benchmarks_dir = os.path.join(REPO_ROOT_DIR, "benchmarks")
     for dirpath, dirnames, filenames in os.walk(benchmarks_dir):
@@ -0,0 +1,263 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compare the translation of conditions of the translator
+(translate.translate_strips_conditions_aux, which represents the possible
+values of a variable as a bitmask) with the set-based implementation it
+replaced.
+
+Without arguments, the benchmark uses the regression tests of the
+translator, the ADL benchmark miconic-simpleadl and a generated task
+with --cells cells, in which every move has a negative precondition on a
+variable with one value per cell. For each task, the "Translating task"
+step (translate.translate_task) is timed with both implementations, and
+the resulting SAS tasks must be identical.
+"""
+
+from __future__ import print_function
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+from copy import deepcopy
+try:
+    # Python 2
+    from StringIO import StringIO
+except ImportError:
+    # Python 3
+    from io import StringIO
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+TRANSLATE_DIR = os.path.join(REPO, "src", "translate")
+BENCHMARKS_DIR = os.path.join(REPO, "misc", "tests", "benchmarks")
+# The options of the translator are parsed when importing it, so we
+# provide a command line with (unused) task files.
+ARGV = sys.argv
+sys.argv = [os.path.join(TRANSLATE_DIR, "translate.py"), "domain", "task"]
+sys.path.insert(0, TRANSLATE_DIR)
+import fact_groups
+import instantiate
+import invariant_finder
+import normalize
+import pddl
+import pddl_parser
+import translate
+sys.argv = ARGV
+
+
+# The implementation before the bitmasks.
+def old_translate_strips_conditions_aux(conditions, dictionary, ranges):
+    condition = {}
+    for fact in conditions:
+        if fact.negated:
+            continue
+        for var, val in dictionary.get(fact, ()):
+            if (condition.get(var) is not None and
+                    val not in condition.get(var)):
+                return None
+            condition[var] = set([val])
+
+    def number_of_values(var_vals_pair):
+        var, vals = var_vals_pair
+        return len(vals)
+
+    for fact in conditions:
+        if fact.negated:
+            done = False
+            new_condition = {}
+            atom = pddl.Atom(fact.predicate, fact.args)  # force positive
+            for var, val in dictionary.get(atom, ()):
+                poss_vals = set(range(ranges[var]))
+                poss_vals.remove(val)
+
+                if condition.get(var) is None:
+                    assert new_condition.get(var) is None
+                    new_condition[var] = poss_vals
+                else:
+                    prev_possible_vals = condition.get(var)
+                    done = True
+                    prev_possible_vals.intersection_update(poss_vals)
+                    if len(prev_possible_vals) == 0:
+                        return None
+
+            if not done and len(new_condition) != 0:
+                candidates = sorted(new_condition.items(), key=number_of_values)
+                var, vals = candidates[0]
+                condition[var] = vals
+
+        def multiply_out(condition):  # destroys the input
+            sorted_conds = sorted(condition.items(), key=number_of_values)
+            flat_conds = [{}]
+            for var, vals in sorted_conds:
+                if len(vals) == 1:
+                    for cond in flat_conds:
+                        cond[var] = vals.pop()  # destroys the input here
+                else:
+                    new_conds = []
+                    for cond in flat_conds:
+                        for val in vals:
+                            new_cond = deepcopy(cond)
+                            new_cond[var] = val
+                            new_conds.append(new_cond)
+                    flat_conds = new_conds
+            return flat_conds
+
+    return multiply_out(condition)
+
+NEW_TRANSLATE_STRIPS_CONDITIONS_AUX = translate.translate_strips_conditions_aux
+
+
+GENERATED_DOMAIN = """\
+(define (domain corridor)
+  (:requirements :strips :negative-preconditions)
+  (:predicates (robot-at ?c) (box-at ?c) (adjacent ?c1 ?c2))
+  (:action move
+    :parameters (?from ?to)
+    :precondition (and (robot-at ?from) (adjacent ?from ?to)
+                       (not (box-at ?to)))
+    :effect (and (robot-at ?to) (not (robot-at ?from))))
+  (:action push
+    :parameters (?from ?to ?next)
+    :precondition (and (robot-at ?from) (box-at ?to)
+                       (adjacent ?from ?to) (adjacent ?to ?next))
+    :effect (and (robot-at ?to) (not (robot-at ?from))
+                 (box-at ?next) (not (box-at ?to)))))
+"""
+
+def generate_task(directory, num_cells):
+    domain_filename = os.path.join(directory, "generated-domain.pddl")
+    task_filename = os.path.join(directory, "generated-problem.pddl")
+    with open(domain_filename, "w") as domain_file:
+        domain_file.write(GENERATED_DOMAIN)
+    cells = ["c%d" % cell for cell in range(num_cells)]
+    with open(task_filename, "w") as task_file:
+        task_file.write("(define (problem generated) (:domain corridor)\n")
+        task_file.write("(:objects %s)\n" % " ".join(cells))
+        task_file.write("(:init (robot-at c0) (box-at c1)\n")
+        for cell, next_cell in zip(cells, cells[1:]):
+            task_file.write("  (adjacent %s %s) (adjacent %s %s)\n" %
+                            (cell, next_cell, next_cell, cell))
+        task_file.write(")\n(:goal (box-at %s)))\n" % cells[-1])
+    return domain_filename, task_filename
+
+
+def parse_args():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        "tasks", nargs="*", help="pairs of domain and problem files")
+    argparser.add_argument(
+        "--cells", type=int, default=150,
+        help="number of cells of the generated task "
+        "(default: %(default)d, 0 for no generated task)")
+    argparser.add_argument(
+        "--full-encoding", action="store_true",
+        help="use the full encoding (see translate.py --full-encoding)")
+    argparser.add_argument(
+        "--repetitions", type=int, default=5,
+        help="the best time of this many runs is reported "
+        "(default: %(default)d)")
+    args = argparser.parse_args()
+    if len(args.tasks) % 2:
+        argparser.error("expected pairs of domain and problem files")
+    return args
+
+def get_default_tasks():
+    tasks = []
+    regression_dir = os.path.join(TRANSLATE_DIR, "regression-tests")
+    for domain in sorted(glob.glob(os.path.join(regression_dir, "*-domain.pddl"))):
+        tasks.append((domain, domain.replace("-domain.pddl", "-problem.pddl")))
+    adl_dir = os.path.join(BENCHMARKS_DIR, "miconic-simpleadl")
+    tasks.append((os.path.join(adl_dir, "domain.pddl"),
+                  os.path.join(adl_dir, "s1-0.pddl")))
+    return tasks
+
+class Quiet(object):
+    """Suppress the output of the translator."""
+    def __enter__(self):
+        self.stdout = sys.stdout
+        sys.stdout = StringIO()
+    def __exit__(self, *args):
+        sys.stdout = self.stdout
+
+def prepare(domain, problem):
+    """Return the arguments of translate.translate_task for the task, like
+    translate.pddl_to_sas, or None if the task is not relaxed solvable."""
+    task = pddl_parser.open(domain_filename=domain, task_filename=problem)
+    normalize.normalize(task)
+    (relaxed_reachable, atoms, actions, axioms,
+     reachable_action_params) = instantiate.explore(task)
+    if not relaxed_reachable:
+        return None
+    if isinstance(task.goal, pddl.Conjunction):
+        goal_list = task.goal.parts
+    else:
+        goal_list = [task.goal]
+    invariants = invariant_finder.get_invariants(task, reachable_action_params)
+    groups, mutex_groups, translation_key = fact_groups.compute_groups(
+        task, atoms, reachable_action_params, invariants)
+    ranges, strips_to_sas = translate.strips_to_sas_dictionary(
+        groups, assert_partial=translate.options.use_partial_encoding)
+    mutex_ranges, mutex_dict = translate.strips_to_sas_dictionary(
+        mutex_groups, assert_partial=False)
+    mutex_key = translate.build_mutex_key(strips_to_sas, mutex_groups)
+    return (strips_to_sas, ranges, translation_key, mutex_dict, mutex_ranges,
+            mutex_key, task.init, goal_list, actions, axioms,
+            task.use_min_cost_metric, {})
+
+def measure(translate_aux, arguments, repetitions):
+    translate.translate_strips_conditions_aux = translate_aux
+    best_time = None
+    for _ in range(repetitions):
+        start_time = time.time()
+        with Quiet():
+            sas_task = translate.translate_task(*arguments)
+        elapsed_time = time.time() - start_time
+        if best_time is None or elapsed_time < best_time:
+            best_time = elapsed_time
+    output = StringIO()
+    sas_task.output(output)
+    return best_time, len(sas_task.operators), output.getvalue()
+
+def main():
+    args = parse_args()
+    translate.options.use_partial_encoding = not args.full_encoding
+    tasks = list(zip(args.tasks[::2], args.tasks[1::2])) or get_default_tasks()
+    temp_dir = tempfile.mkdtemp()
+    try:
+        if args.cells and not args.tasks:
+            tasks.append(generate_task(temp_dir, args.cells))
+        run(tasks, args.repetitions)
+    finally:
+        shutil.rmtree(temp_dir)
+
+def run(tasks, repetitions):
+    print("%-40s %10s %10s %10s %8s" % (
+        "task", "operators", "old (s)", "new (s)", "speedup"))
+    for domain, problem in tasks:
+        name = os.path.basename(problem)
+        try:
+            with Quiet():
+                arguments = prepare(domain, problem)
+        except SystemExit:
+            print("%-40s translator failed" % name)
+            continue
+        if arguments is None:
+            print("%-40s not relaxed solvable" % name)
+            continue
+        old_time, num_operators, old_output = measure(
+            old_translate_strips_conditions_aux, arguments, repetitions)
+        new_time, _, new_output = measure(
+            NEW_TRANSLATE_STRIPS_CONDITIONS_AUX, arguments, repetitions)
+        if new_output != old_output:
+            raise SystemExit("Different results for %s" % name)
+        print("%-40s %10d %10.4f %10.4f %8.1f" % (
+            name, num_operators, old_time, new_time,
+            old_time / max(new_time, 1e-6)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compare the relaxed exploration of the translator with and without
+--cost-based-join-order.
+
+For each task, the translator is run twice and the number of auxiliary
+atoms, the number of queue pushes and the time for computing the model
+are reported. Without arguments, the regression tests and the first
+task of each domain in misc/tests/benchmarks are compared. The output
+files of both runs must be identical.
+"""
+
+from __future__ import print_function
+
+import argparse
+import filecmp
+import glob
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+TRANSLATE = os.path.join(REPO, "src", "translate", "translate.py")
+
+STATISTICS = [
+    ("aux", re.compile(r"^(\d+) auxiliary atoms$", re.M)),
+    ("pushes", re.compile(r"^(\d+) total queue pushes$", re.M)),
+    ("time", re.compile(r"^Computing model\.\.\. \[([\d.]+)s CPU", re.M)),
+]
+
+
+def parse_args():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        "tasks", nargs="*",
+        help="pairs of domain and problem files")
+    argparser.add_argument(
+        "--python", default=sys.executable,
+        help="Python interpreter for the translator (default: %(default)s)")
+    args = argparser.parse_args()
+    if len(args.tasks) % 2:
+        argparser.error("expected pairs of domain and problem files")
+    return args
+
+def get_default_tasks():
+    tasks = []
+    regression_dir = os.path.join(REPO, "src", "translate", "regression-tests")
+    for domain in sorted(glob.glob(os.path.join(regression_dir, "*-domain.pddl"))):
+        problem = domain.replace("-domain.pddl", "-problem.pddl")
+        if os.path.exists(problem):
+            tasks.append((domain, problem))
+    benchmarks_dir = os.path.join(REPO, "misc", "tests", "benchmarks")
+    for domain in sorted(glob.glob(os.path.join(benchmarks_dir, "*", "domain.pddl"))):
+        problems = sorted(
+            filename for filename in glob.glob(
+                os.path.join(os.path.dirname(domain), "*.pddl"))
+            if filename != domain)
+        if problems:
+            tasks.append((domain, problems[0]))
+    return tasks
+
+def translate(python, domain, problem, run_dir, extra_options):
+    os.mkdir(run_dir)
+    process = subprocess.Popen(
+        [python, TRANSLATE, domain, problem] + extra_options,
+        cwd=run_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        universal_newlines=True)
+    output = process.communicate()[0]
+    if process.returncode != 0:
+        return None
+    statistics = {}
+    for name, regex in STATISTICS:
+        match = regex.search(output)
+        statistics[name] = match.group(1) if match else "-"
+    return statistics
+
+def main():
+    args = parse_args()
+    tasks = list(zip(args.tasks[::2], args.tasks[1::2])) or get_default_tasks()
+    temp_dir = tempfile.mkdtemp()
+    try:
+        run(args.python, tasks, temp_dir)
+    finally:
+        shutil.rmtree(temp_dir)
+
+def run(python, tasks, temp_dir):
+    print("%-40s %10s %10s %10s %10s %8s %8s" % (
+        "task", "aux", "aux (cost)", "pushes", "push (cost)",
+        "time", "t (cost)"))
+    for task_no, (domain, problem) in enumerate(tasks):
+        runs = []
+        for suffix, extra_options in [("default", []),
+                                      ("cost", ["--cost-based-join-order"])]:
+            run_dir = os.path.join(temp_dir, "%d-%s" % (task_no, suffix))
+            runs.append((run_dir, translate(
+                python, domain, problem, run_dir, extra_options)))
+        name = os.path.relpath(problem, REPO)[-40:]
+        (default_dir, default), (cost_dir, cost) = runs
+        if default is None or cost is None:
+            print("%-40s translator failed" % name)
+            continue
+        if not filecmp.cmp(os.path.join(default_dir, "output.sas"),
+                           os.path.join(cost_dir, "output.sas"), shallow=False):
+            raise SystemExit("Different output files for %s" % name)
+        print("%-40s %10s %10s %10s %10s %8s %8s" % (
+            name, default["aux"], cost["aux"], default["pushes"],
+            cost["pushes"], default["time"], cost["time"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compare the PDDL parser of the translator (pddl_parser/lisp_parser.py)
+with the line-based parser it replaced.
+
+Without arguments, the benchmark parses the largest PDDL files of the
+regression tests and of misc/tests/benchmarks and a generated task with
+--facts initial facts. Both parsers must return the same nested lists or
+raise the same errors.
+"""
+
+from __future__ import print_function
+
+import argparse
+import codecs
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+TRANSLATE_DIR = os.path.join(REPO, "src", "translate")
+# We import the module without the package, because importing pddl_parser
+# parses the command line of the translator.
+sys.path.insert(0, os.path.join(TRANSLATE_DIR, "pddl_parser"))
+import lisp_parser
+from lisp_parser import ParseError
+
+
+# The parser before the single-pass tokenizer.
+def old_parse_nested_list(input_file):
+    tokens = old_tokenize(input_file)
+    next_token = next(tokens)
+    if next_token != "(":
+        raise ParseError("Expected '(', got %s." % next_token)
+    result = list(old_parse_list_aux(tokens))
+    for tok in tokens:  # Check that generator is exhausted.
+        raise ParseError("Unexpected token: %s." % tok)
+    return result
+
+def old_tokenize(input):
+    for line in input:
+        line = line.split(";", 1)[0]  # Strip comments.
+        try:
+            line.encode("ascii")
+        except UnicodeEncodeError:
+            raise ParseError("Non-ASCII character outside comment: %s" %
+                             line[0:-1])
+        line = line.replace("(", " ( ").replace(")", " ) ").replace("?", " ?")
+        for token in line.split():
+            yield token.lower()
+
+def old_parse_list_aux(tokenstream):
+    # Leading "(" has already been swallowed.
+    while True:
+        try:
+            token = next(tokenstream)
+        except StopIteration:
+            raise ParseError("Missing ')'")
+        if token == ")":
+            return
+        elif token == "(":
+            yield list(old_parse_list_aux(tokenstream))
+        else:
+            yield token
+
+
+def parse_args():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("files", nargs="*", help="PDDL files")
+    argparser.add_argument(
+        "--facts", type=int, default=200000,
+        help="number of initial facts of the generated task "
+        "(default: %(default)d, 0 for no generated task)")
+    argparser.add_argument(
+        "--largest", type=int, default=3,
+        help="number of the largest files of each directory "
+        "(default: %(default)d)")
+    argparser.add_argument(
+        "--repetitions", type=int, default=3,
+        help="the best time of this many runs is reported "
+        "(default: %(default)d)")
+    return argparser.parse_args()
+
+def get_largest_files(pattern, number):
+    return sorted(glob.glob(pattern), key=os.path.getsize, reverse=True)[:number]
+
+def generate_task(filename, num_facts):
+    num_balls = num_facts // 2
+    with open(filename, "w") as task_file:
+        task_file.write("; Generated by %s\n" % os.path.basename(__file__))
+        task_file.write("(define (problem generated) (:domain gripper)\n")
+        task_file.write("(:objects rooma roomb left right\n")
+        for ball in range(num_balls):
+            task_file.write("  ball%d\n" % ball)
+        task_file.write(")\n(:init (room rooma) (room roomb) (at-robby rooma)\n")
+        for ball in range(num_balls):
+            task_file.write("  (ball ball%d) (at ball%d rooma) ; ball %d\n" %
+                            (ball, ball, ball))
+        task_file.write(")\n(:goal (and\n")
+        for ball in range(num_balls):
+            task_file.write("  (at ball%d roomb)\n" % ball)
+        task_file.write(")))\n")
+
+def parse(parse_function, filename):
+    # Like pddl_parser.pddl_file.parse_pddl_file.
+    with codecs.open(filename, encoding="ISO-8859-1") as input_file:
+        try:
+            return parse_function(input_file)
+        except ParseError as error:
+            return "ParseError: %s" % error.value
+
+def measure(parse_function, filename, repetitions):
+    best_time = None
+    for _ in range(repetitions):
+        start_time = time.time()
+        result = parse(parse_function, filename)
+        elapsed_time = time.time() - start_time
+        if best_time is None or elapsed_time < best_time:
+            best_time = elapsed_time
+    return best_time, result
+
+def main():
+    args = parse_args()
+    files = args.files
+    temp_dir = tempfile.mkdtemp()
+    try:
+        run(args, files, temp_dir)
+    finally:
+        shutil.rmtree(temp_dir)
+
+def run(args, files, temp_dir):
+    if not files:
+        files = (
+            get_largest_files(os.path.join(
+                TRANSLATE_DIR, "regression-tests", "*.pddl"), args.largest) +
+            get_largest_files(os.path.join(
+                REPO, "misc", "tests", "benchmarks", "*", "*.pddl"),
+                args.largest))
+        if args.facts:
+            generated_task = os.path.join(temp_dir, "generated-task.pddl")
+            generate_task(generated_task, args.facts)
+            files.append(generated_task)
+    print("%-50s %10s %10s %10s %8s" % (
+        "file", "size (KB)", "old (s)", "new (s)", "speedup"))
+    for filename in files:
+        old_time, old_result = measure(
+            old_parse_nested_list, filename, args.repetitions)
+        new_time, new_result = measure(
+            lisp_parser.parse_nested_list, filename, args.repetitions)
+        if new_result != old_result:
+            raise SystemExit("Different results for %s" % filename)
+        print("%-50s %10d %10.3f %10.3f %8.1f" % (
+            os.path.relpath(filename, REPO)[-50:],
+            os.path.getsize(filename) // 1024, old_time, new_time,
+            old_time / max(new_time, 1e-6)))
+
+if __name__ == "__main__":
+    main()
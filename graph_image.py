@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+
+from PIL import Image
+import itertools
+import numpy as np
+import os
+from scipy.sparse import csr_matrix
+
+
+## Binary graph files consist of a header (the magic string, the format
+## version, the number of vertices n and the number of edges m, the latter
+## three as little-endian int32), followed by the graph in compressed sparse
+## row format: n + 1 offsets and m targets, all little-endian int32. The
+## successors of vertex i are targets[offsets[i]:offsets[i + 1]].
+BINARY_GRAPH_MAGIC = b'CSRG'
+BINARY_GRAPH_VERSION = 1
+BINARY_GRAPH_HEADER = np.dtype([('magic', 'S4'), ('version', '<i4'),
+                                ('num_vertices', '<i4'), ('num_edges', '<i4')])
+
+
+class CSRGraph(object):
+    """Graph in compressed sparse row format, as read from a binary graph
+    file. Like the adjacency list representation, it has one entry (the
+    array of successors) per vertex."""
+    def __init__(self, offsets, targets):
+        self.offsets = offsets
+        self.targets = targets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, vertex):
+        return self.targets[self.offsets[vertex]:self.offsets[vertex + 1]]
+
+
+def get_edge_arrays(graph):
+    """Return the arrays of sources and targets of all edges of the graph,
+    given as adjacency list or CSRGraph."""
+    if isinstance(graph, CSRGraph):
+        sources = np.repeat(np.arange(len(graph), dtype=np.int64),
+                            np.diff(graph.offsets))
+        return sources, graph.targets.astype(np.int64)
+    num_successors = np.fromiter((len(successors) for successors in graph),
+                                 dtype=np.int64, count=len(graph))
+    sources = np.repeat(np.arange(len(graph), dtype=np.int64), num_successors)
+    targets = np.fromiter(itertools.chain.from_iterable(graph),
+                          dtype=np.int64, count=int(num_successors.sum()))
+    return sources, targets
+
+
+def create_raw_matrix_for_image(graph, bolded=False, shrink_ratio=6):
+    """Create raw 0/1 matrix, bolding by adding 1s around existing ones.
+
+    The matrix is returned in coordinate format, i.e., as arrays of the rows
+    and columns of its 1-entries (without duplicates), together with its
+    size."""
+    sz = len(graph)
+
+    ## Creating a matrix
+    print("Creating matrix for a graph with %s nodes.." % sz)
+    ## The size of the graph can be quite big when either the task is (parially) grounded or there are many static predicates.
+    ## The problem of static predicates can be overcome by using the option --only-functions-from-initial-state
+    ## We therefore never create the dense matrix, but only the coordinates of its 1-entries.
+
+    if shrink_ratio > 1:
+        sz += (shrink_ratio - (sz % shrink_ratio))
+
+    rows, cols = get_edge_arrays(graph)
+    if bolded:
+        print("Performing bolding.")
+        ## Try to make wider
+        rows = np.concatenate((rows, rows + 1, rows - 1, rows, rows))
+        cols = np.concatenate((cols, cols, cols, cols + 1, cols - 1))
+        in_bounds = (rows >= 0) & (rows < sz) & (cols >= 0) & (cols < sz)
+        rows = rows[in_bounds]
+        cols = cols[in_bounds]
+
+    entries = np.unique(rows * sz + cols)
+    rows, cols = np.divmod(entries, sz)
+    print("Matrix size when 1s added: %s" % (rows.nbytes + cols.nbytes))
+
+    return rows, cols, sz
+
+
+def print_graph_statistics(graph):
+    rows, cols, sz = create_raw_matrix_for_image(graph, bolded=False, shrink_ratio=1)
+    print("Number of graph vertices: %s" % sz)
+    print("Number of graph edges: %s" % len(rows))
+
+
+def shrink_matrix_raw_to_grayscale(graph, bolded=False, shrink_ratio=6):
+    """ Assuming no self loops!!!
+    Partitioned into squares of size 6, to shrink the graph into target image size:
+    Turning binaries into numbers up to 32bit signed - [0, 2147483647 = 2^31 - 1]
+    Therefore the maximal square possible is 6x6 (without the diagonal, 30 entries)
+    [[0,a1,a2, ...],[b1,0,b2, ...],[c1,c2,0, c3, ...], ...] is turned into 2^0 * a1 + 2^1 * a2 + ...
+
+    Like the raw matrix, the shrinked matrix is returned in coordinate format,
+    i.e., as arrays of rows, columns and values of its nonzero entries,
+    together with its size.
+    """
+    assert(shrink_ratio > 0)
+    assert(shrink_ratio <= 6)
+
+    rows, cols, sz = create_raw_matrix_for_image(graph, bolded, shrink_ratio)
+
+    print("Number of graph nodes: %s" % sz)
+    print("Shrink ratio: %s" % shrink_ratio)
+    if shrink_ratio == 1:
+        return rows, cols, np.ones(len(rows), dtype=np.int64), sz
+
+    shrinked_sz = sz // shrink_ratio
+    print("Shrinking matrix to size %sx%s.." % (shrinked_sz,shrinked_sz))
+
+    # Entry (j, i) of a square contributes the bit 2^n, where n enumerates the
+    # positions of the square column by column, skipping the diagonal.
+    square_rows, j = np.divmod(rows, shrink_ratio)
+    square_cols, i = np.divmod(cols, shrink_ratio)
+    off_diagonal = i != j
+    n = i * (shrink_ratio - 1) + j - (j > i)
+    bits = np.left_shift(1, n[off_diagonal])
+    squares, square_indices = np.unique(
+        square_rows[off_diagonal] * shrinked_sz + square_cols[off_diagonal],
+        return_inverse=True)
+    # The bits of a square are distinct, so summing them up is exact.
+    values = np.bincount(square_indices, weights=bits).astype(np.int64)
+    square_rows, square_cols = np.divmod(squares, shrinked_sz)
+    return square_rows, square_cols, values, shrinked_sz
+
+GRAYSCALE_TYPE_OPTS = { 1 : '1', 2 : 'L', 3 : 'L', 4 : 'I', 5 : 'I', 6 : 'I'}
+GRAYSCALE_COLOR_OPTS = { '1' : 1, 'L' : 255, 'I' : 2147483647}
+LANCZOS_SUPPORT = 3.0
+## Fixed point precision PIL uses when resampling 8 bit images.
+PRECISION_BITS = 32 - 8 - 2
+## Number of image rows that are resampled at once in streaming mode.
+RESAMPLING_BLOCK_SIZE = 4096
+
+
+def drop_last_vertex_without_successors(graph):
+    """Return the graph without its last vertex if that vertex has no
+    successors, i.e., the graph as read back from a text graph file.
+
+    In text graph files, a last vertex without successors is an empty last
+    line, which read_adjacency_graph() does not read. The learned models were
+    trained with images of graphs read from text files, so graphs from other
+    sources must have the same number of vertices to give the same image."""
+    if len(graph) == 0 or len(graph[len(graph) - 1]) > 0:
+        return graph
+    if isinstance(graph, CSRGraph):
+        return CSRGraph(graph.offsets[:-1], graph.targets)
+    return graph[:-1]
+
+
+def read_adjacency_graph(input_file):
+    """Read a graph given as one line of comma-separated successors per vertex."""
+    adjacency_graph = []
+    with open(input_file) as f:
+        for line in f:
+            line = line.rstrip('\n')
+            line = line.rstrip(',')
+            if line == '':
+                successors = []
+            else:
+                successors = [int(succ) for succ in line.split(',')]
+            adjacency_graph.append(successors)
+    return adjacency_graph
+
+
+def read_binary_adjacency_graph(input_file):
+    """Read a graph from a binary graph file (see BINARY_GRAPH_HEADER). The
+    arrays of the returned CSRGraph are mapped into memory, not copied.
+
+    As with text graph files, a last vertex without successors is dropped
+    (see drop_last_vertex_without_successors)."""
+    header = np.fromfile(input_file, dtype=BINARY_GRAPH_HEADER, count=1)
+    if len(header) != 1 or header['magic'][0] != BINARY_GRAPH_MAGIC:
+        raise ValueError("%s is not a binary graph file" % input_file)
+    if header['version'][0] != BINARY_GRAPH_VERSION:
+        raise ValueError("%s has unsupported binary graph format version %s" %
+                         (input_file, header['version'][0]))
+    num_vertices = int(header['num_vertices'][0])
+    num_edges = int(header['num_edges'][0])
+    data = np.memmap(input_file, dtype='<i4', mode='r',
+                     offset=BINARY_GRAPH_HEADER.itemsize,
+                     shape=(num_vertices + 1 + num_edges,))
+    offsets = data[:num_vertices + 1]
+    targets = data[num_vertices + 1:]
+    if offsets[0] != 0 or offsets[-1] != num_edges:
+        raise ValueError("%s has inconsistent offsets" % input_file)
+    return drop_last_vertex_without_successors(CSRGraph(offsets, targets))
+
+
+def is_binary_graph_file(input_file):
+    with open(input_file, 'rb') as f:
+        return f.read(len(BINARY_GRAPH_MAGIC)) == BINARY_GRAPH_MAGIC
+
+
+def read_graph(input_file):
+    """Read a graph from a binary graph file or a text file with one line of
+    comma-separated successors per vertex."""
+    if is_binary_graph_file(input_file):
+        return read_binary_adjacency_graph(input_file)
+    return read_adjacency_graph(input_file)
+
+
+def create_matrix_image_grayscale(graph, bolded=False, shrink_ratio=6):
+    """Create the grayscale image of the graph in its original size.
+
+    If shrink_ratio of 1 is used, using raw [0, 1] values for each pixel.
+    If shrink_ratio of up to 3 is used, using [0, 255] values for each pixel.
+    Otherwise, a 32bit signed int is used.
+
+    This allocates a dense array for the sz x sz pixels of the image.
+    Only create_constant_size_image_streaming avoids that."""
+    grayscale_type = GRAYSCALE_TYPE_OPTS[shrink_ratio]
+    grayscale_color = GRAYSCALE_COLOR_OPTS[grayscale_type]
+    print("Grayscale color: %s" % grayscale_color)
+
+    rows, cols, values, sz = shrink_matrix_raw_to_grayscale(graph, bolded, shrink_ratio)
+    ## For grayscale_type "L", sharpen the image by 4 (there are only 6 entries used, so the maximal number is 63)
+    if grayscale_type == 'L':
+        values = 4 * values
+
+    ## Pixel (x, y) of the image shows entry (x, y) of the matrix, i.e.,
+    ## rows of the matrix are columns of the image.
+    if grayscale_type == 'I':
+        pixels = np.full((sz, sz), grayscale_color, dtype=np.int32)
+        pixels[cols, rows] = grayscale_color - values
+        im = Image.fromarray(pixels, 'I')
+    elif grayscale_type == 'L':
+        pixels = np.full((sz, sz), grayscale_color, dtype=np.uint8)
+        pixels[cols, rows] = grayscale_color - values
+        im = Image.fromarray(pixels, 'L')
+    else:
+        ## Mode '1' images are created from 'L' images with values 0 and 255.
+        pixels = np.full((sz, sz), 255, dtype=np.uint8)
+        pixels[cols, rows] = 0
+        im = Image.fromarray(pixels, 'L').convert('1', dither=Image.NONE)
+    return im
+
+
+def lanczos_filter(x):
+    """The filter PIL uses for Image.ANTIALIAS (a sinc truncated at 3)."""
+    return np.where((x >= -LANCZOS_SUPPORT) & (x < LANCZOS_SUPPORT),
+                    np.sinc(x) * np.sinc(x / LANCZOS_SUPPORT), 0.0)
+
+
+def get_resampling_coefficients(in_size, out_size):
+    """Return the out_size x in_size sparse matrix with the weights that
+    PIL's antialiasing filter gives to every input pixel of a row (or
+    column) when computing an output pixel of the resized row (column).
+
+    This follows precompute_coeffs() in PIL's Resample.c. When downsampling,
+    every input pixel has a nonzero weight for at most
+    2 * LANCZOS_SUPPORT + 1 output pixels, so the matrix has O(in_size)
+    entries."""
+    scale = float(in_size) / out_size
+    filterscale = max(scale, 1.0)
+    support = LANCZOS_SUPPORT * filterscale
+    centers = (np.arange(out_size) + 0.5) * scale
+    # Casting to int truncates towards zero, as in C.
+    first = np.maximum((centers - support + 0.5).astype(np.int64), 0)
+    last = np.minimum((centers + support + 0.5).astype(np.int64), in_size)
+    counts = np.maximum(last - first, 0)
+    out_indices = np.repeat(np.arange(out_size), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    in_indices = first[out_indices] + offsets
+    coefficients = lanczos_filter(
+        (in_indices - centers[out_indices] + 0.5) * (1.0 / filterscale))
+    totals = np.bincount(out_indices, weights=coefficients, minlength=out_size)
+    totals[totals == 0] = 1.0
+    coefficients /= totals[out_indices]
+    return csr_matrix((coefficients, (out_indices, in_indices)),
+                      shape=(out_size, in_size))
+
+
+def _to_fixed_point(coefficients):
+    """Convert coefficients as PIL does for 8 bit images."""
+    data = coefficients.data * (1 << PRECISION_BITS)
+    data = np.where(data < 0, data - 0.5, data + 0.5).astype(np.int64)
+    return csr_matrix((data, coefficients.indices, coefficients.indptr),
+                      shape=coefficients.shape)
+
+
+def _clip8(values):
+    """Round a fixed point sum to an 8 bit pixel value as PIL does."""
+    values = values + (1 << (PRECISION_BITS - 1))
+    return np.where(values >= (1 << PRECISION_BITS << 8), 255,
+                    np.where(values <= 0, 0, values >> PRECISION_BITS))
+
+
+def _round_up_to_int32(values):
+    """Round a sum to a 32 bit pixel value as PIL does. Sums outside of the
+    range of int32 (Lanczos filters overshoot) become -2^31, as with the
+    float-to-int conversion of x86 processors."""
+    values = np.trunc(np.where(values >= 0, values + 0.5, values - 0.5))
+    out_of_range = (values < -2**31) | (values > 2**31 - 1)
+    values[out_of_range] = -2**31
+    return values.astype(np.int64)
+
+
+def get_nearest_neighbours(in_size, out_size):
+    """Return the input pixel that PIL's nearest neighbour resampling picks
+    for every output pixel of a row (or column). This follows
+    ImagingScaleAffine() in PIL's Geometry.c, including its accumulation of
+    the coordinates."""
+    scale = float(in_size) / out_size
+    coordinates = np.cumsum(
+        np.concatenate(([0.5 * scale], np.full(out_size - 1, scale))))
+    return np.minimum(coordinates.astype(np.int64), in_size - 1)
+
+
+def create_constant_size_image_nearest(graph, bolded=False, target_size=128):
+    """Create the raw (mode '1') image of the graph, resized to target_size
+    x target_size, without creating the image in its original size. PIL
+    resizes images of mode '1' with nearest neighbour sampling, so every
+    pixel of the result is one entry of the raw matrix."""
+    rows, cols, sz = create_raw_matrix_for_image(graph, bolded, shrink_ratio=1)
+    neighbours = get_nearest_neighbours(sz, target_size)
+    ## Pixel (x, y) shows entry (neighbours[x], neighbours[y]), so image row
+    ## y contains the entries with col == neighbours[y].
+    sampled = neighbours[np.newaxis, :] + sz * neighbours[:, np.newaxis]
+    is_edge = np.isin(sampled, rows + sz * cols)
+    pixels = np.where(is_edge, 0, 255).astype(np.uint8)
+    return Image.fromarray(pixels, 'L').convert('1', dither=Image.NONE)
+
+
+def create_constant_size_image_streaming(graph, bolded=False, shrink_ratio=6, target_size=128):
+    """Create the grayscale image of the graph, resized to target_size x
+    target_size, without creating the image in its original size.
+
+    PIL resizes in two passes, first every row and then every column of the
+    result, rounding to the pixel type after each pass. The image of the
+    graph is constant except for the (few) pixels of edges, so all rows
+    without edges are equal after the first pass. We hence only resize rows
+    with edges, block by block, and directly add their contribution to the
+    second pass. This needs O(edges + target_size^2) memory and gives the
+    same pixel values as resizing the image of create_matrix_image_grayscale()
+    (except for floating point rounding in 32 bit images)."""
+    grayscale_type = GRAYSCALE_TYPE_OPTS[shrink_ratio]
+    if grayscale_type == '1':
+        return create_constant_size_image_nearest(graph, bolded, target_size)
+    grayscale_color = GRAYSCALE_COLOR_OPTS[grayscale_type]
+
+    rows, cols, values, sz = shrink_matrix_raw_to_grayscale(graph, bolded, shrink_ratio)
+    if sz == target_size:
+        # PIL does not resample images that already have the target size,
+        # and the image in original size is small in that case.
+        return create_matrix_image_grayscale(graph, bolded, shrink_ratio)
+    if grayscale_type == 'L':
+        values = 4 * values
+
+    print("Resampling matrix of size %sx%s to %sx%s.." % (sz, sz, target_size, target_size))
+    coefficients = get_resampling_coefficients(sz, target_size)
+    if grayscale_type == 'L':
+        coefficients = _to_fixed_point(coefficients)
+        round_pixels = _clip8
+    else:
+        values = values.astype(np.float64)
+        round_pixels = _round_up_to_int32
+    totals = np.asarray(coefficients.sum(axis=1)).ravel()
+
+    ## As in create_matrix_image_grayscale, rows of the matrix are columns of
+    ## the image, so image row y contains the entries with col == y.
+    edge_rows, row_indices = np.unique(cols, return_inverse=True)
+    darkness = csr_matrix((values, (row_indices, rows)), shape=(len(edge_rows), sz))
+    horizontal_coefficients = coefficients.T.tocsr()
+    vertical_coefficients = coefficients.tocsc()
+
+    background_row = round_pixels(grayscale_color * totals)
+    pixels = np.outer(totals, background_row)
+    for start in range(0, len(edge_rows), RESAMPLING_BLOCK_SIZE):
+        end = start + RESAMPLING_BLOCK_SIZE
+        resampled_rows = round_pixels(
+            grayscale_color * totals -
+            (darkness[start:end] * horizontal_coefficients).toarray())
+        pixels += vertical_coefficients[:, edge_rows[start:end]] * (
+            resampled_rows - background_row)
+    pixels = round_pixels(pixels)
+
+    if grayscale_type == 'L':
+        return Image.fromarray(pixels.astype(np.uint8), 'L')
+    return Image.fromarray(pixels.astype(np.int32), 'I')
+
+
+def create_constant_size_image(graph, bolded=False, shrink_ratio=6, target_size=128, streaming=True):
+    """Create the grayscale image of the graph, resized to target_size x target_size.
+
+    Unless streaming is false, the image in original size is not created
+    (see create_constant_size_image_streaming)."""
+    if streaming:
+        return create_constant_size_image_streaming(graph, bolded, shrink_ratio, target_size)
+    im = create_matrix_image_grayscale(graph, bolded, shrink_ratio)
+    return im.resize((target_size, target_size), Image.ANTIALIAS)
+
+
+def write_matrix_image_grayscale(graph, output_directory, bolded=False, shrink_ratio=6, target_size=128, write_original_size=False, streaming=True):
+    """Write the graph into a grayscale image.
+
+    If streaming is true (and the image in original size is not written),
+    the image of constant size is computed without creating the image in
+    original size (see create_constant_size_image_streaming)."""
+    assert os.path.exists(output_directory)
+    fname_base = 'graph-gs'
+    grayscale_type = GRAYSCALE_TYPE_OPTS[shrink_ratio]
+    nm = '%s-%s-%s.png' % (fname_base, grayscale_type, ("bolded" if bolded else "reg"))
+    nm_constant_size = '%s-%s-%s-cs.png' % (fname_base, grayscale_type, ("bolded" if bolded else "reg"))
+
+    size = target_size, target_size
+
+    if streaming and not write_original_size:
+        newimg = create_constant_size_image_streaming(graph, bolded, shrink_ratio, target_size)
+    else:
+        im = create_matrix_image_grayscale(graph, bolded, shrink_ratio)
+
+        if write_original_size:
+            print("Writing grayscale image of size %sx%s .." % im.size)
+            im.save(os.path.join(output_directory, nm),'png')
+
+        newimg = im.resize(size, Image.ANTIALIAS)
+
+    print("Writing grayscale image of size %sx%s .." % size)
+    newimg.save(os.path.join(output_directory, nm_constant_size), "png")
+
+    #im.thumbnail(size, Image.ANTIALIAS)
+    #im.save(nm_thumbnail, "png")
@@ -51,7 +51,7 @@ def compute_graph_for_task(domain, problem, image_from_lifted_task):
     pwd = os.getcwd()
     if image_from_lifted_task:
         command = [sys.executable, os.path.join(repo_dir, 'src/translate/abstract_structure_module.py'), '--only-functions-from-initial-state', domain, problem]
-        graph_file = os.path.join(pwd, 'abstract-structure-graph.txt')
+        graph_file = os.path.join(pwd, 'abstract-structure-graph.bin')
     else:
         command = [sys.executable, os.path.join(repo_dir, 'fast-downward.py'), '--build', 'release64', domain, problem, '--symmetries','sym=structural_symmetries(time_bound=0,search_symmetries=oss,dump_symmetry_graph=true,stop_after_symmetry_graph_creation=true)', '--search', 'astar(blind(),symmetries=sym)']
         graph_file = os.path.join(pwd, 'symmetry-graph.txt')
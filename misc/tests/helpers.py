@@ -0,0 +1,18 @@
+"""Functions shared by the tests of the scripts in the repository root."""
+
+import importlib.util
+import os.path
+import sys
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+def load_plan_ipc():
+    """Import plan-ipc.py, whose name is not a valid module name."""
+    spec = importlib.util.spec_from_file_location(
+        'plan_ipc', os.path.join(REPO, 'plan-ipc.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
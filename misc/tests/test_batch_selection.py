@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the batch planner selection. Run with
+
+    py.test misc/tests/test_batch_selection.py
+"""
+
+import io
+import json
+import os
+import sys
+
+import numpy as np
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+BENCHMARKS = os.path.join(DIR, 'benchmarks')
+sys.path.insert(0, REPO)
+
+import batch_selection
+from dl_model import selector
+
+
+class ConstantWeightsModel(object):
+    """Stand-in for the learned model with the same interface: the score of
+    every solver is a fixed linear function of the pixels."""
+    def __init__(self):
+        rng = np.random.RandomState(0)
+        self.weights = rng.rand(128 * 128, len(selector.SOLVER_NAMES))
+        self.batch_sizes = []
+
+    def predict(self, data, batch_size):
+        self.batch_sizes.append(len(data))
+        return data.reshape(len(data), -1).dot(self.weights)
+
+
+def write_inputs(tmpdir):
+    graph_file = tmpdir.join('graph.txt')
+    graph_file.write('1,2\n2\n0\n\n1')
+    image_file = tmpdir.join('image.png')
+    pixels = np.random.RandomState(1).randint(0, 256, (128, 128)).astype(np.uint8)
+    batch_selection.Image.fromarray(pixels, 'L').save(str(image_file))
+    small_image_file = tmpdir.join('small.png')
+    batch_selection.Image.fromarray(pixels[:64, :64], 'L').save(str(small_image_file))
+    return str(graph_file), str(image_file), str(small_image_file)
+
+
+def test_collect_inputs():
+    inputs = batch_selection.collect_inputs([os.path.join(BENCHMARKS, 'miconic')])
+    assert [os.path.basename(batch_input.problem) for batch_input in inputs] == [
+        's1-0.pddl']
+    assert all(batch_input.domain == os.path.join(BENCHMARKS, 'miconic', 'domain.pddl')
+               for batch_input in inputs)
+
+
+def test_select_planners(tmpdir):
+    graph_file, image_file, small_image_file = write_inputs(tmpdir)
+    problem = os.path.join(BENCHMARKS, 'gripper', 'prob01.pddl')
+    inputs = batch_selection.collect_inputs(
+        [graph_file, image_file, small_image_file, problem, image_file])
+    model = ConstantWeightsModel()
+    results = batch_selection.select_planners(
+        REPO, inputs, model, processes=2, batch_size=2)
+    assert [result['name'] for result in results] == [
+        graph_file, image_file, small_image_file, problem, image_file]
+    assert model.batch_sizes == [2, 2]
+
+    assert results[2]['error'].startswith('image has shape')
+    assert results[2]['scores'] is None
+    for result in results[:2] + results[3:]:
+        assert result['error'] is None
+        assert sorted(result['scores']) == sorted(selector.SOLVER_NAMES)
+        assert result['selected'] == max(result['scores'], key=result['scores'].get)
+
+    # Scoring in one batch gives the same results.
+    single_batch_results = batch_selection.select_planners(
+        REPO, inputs, ConstantWeightsModel(), processes=2, batch_size=100)
+    for result, single_batch_result in zip(results, single_batch_results):
+        assert single_batch_result['selected'] == result['selected']
+        if result['scores'] is not None:
+            for solver, score in result['scores'].items():
+                assert np.isclose(single_batch_result['scores'][solver], score)
+    assert results[1]['selected'] == results[4]['selected']
+
+
+def test_output_formats(tmpdir):
+    graph_file, image_file, small_image_file = write_inputs(tmpdir)
+    inputs = batch_selection.collect_inputs([graph_file, small_image_file])
+    results = batch_selection.select_planners(
+        REPO, inputs, ConstantWeightsModel(), processes=1)
+
+    outfile = io.BytesIO() if sys.version_info < (3, 0) else io.StringIO()
+    batch_selection.write_json(results, outfile)
+    assert json.loads(outfile.getvalue()) == results
+
+    outfile = io.BytesIO() if sys.version_info < (3, 0) else io.StringIO()
+    batch_selection.write_csv(results, outfile)
+    lines = outfile.getvalue().splitlines()
+    assert len(lines) == 3
+    assert lines[0].split(',')[-len(selector.SOLVER_NAMES):] == selector.SOLVER_NAMES
+    assert lines[1].split(',')[5] == results[0]['selected']
+    assert lines[2].split(',')[-1] == ''
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test module for building image datasets. Run with
+
+    py.test misc/tests/test_dataset_builder.py
+"""
+
+import json
+import os
+import signal
+import sys
+
+import pytest
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+BENCHMARKS = os.path.join(DIR, 'benchmarks')
+sys.path.insert(0, REPO)
+
+dataset_builder = pytest.importorskip('dataset_builder')
+
+BENCHMARK_DIRS = [os.path.join(BENCHMARKS, domain)
+                  for domain in ['gripper', 'miconic']]
+
+
+def read_manifest_lines(dataset_dir):
+    with open(os.path.join(dataset_dir, dataset_builder.MANIFEST_FILE)) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_collect_tasks():
+    tasks = dataset_builder.collect_tasks(BENCHMARK_DIRS)
+    assert [name for name, _, _ in tasks] == ['gripper/prob01', 'miconic/s1-0']
+
+
+def test_build_dataset(tmpdir):
+    dataset_dir = str(tmpdir.join('dataset'))
+    tasks = dataset_builder.collect_tasks(BENCHMARK_DIRS)
+    config = dataset_builder.DatasetConfig(image_types=['reg', 'int'],
+                                           time_limit=60)
+    entries = dataset_builder.build_dataset(REPO, tasks, dataset_dir, config, jobs=2)
+    assert sorted(entry['name'] for entry in entries) == ['gripper/prob01', 'miconic/s1-0']
+    for entry in entries:
+        assert entry['status'] == dataset_builder.STATUS_OK
+        assert entry['graph']['num_vertices'] > 0
+        assert [os.path.basename(image) for image in entry['images']] == [
+            'graph-gs-I-bolded-cs.png', 'graph-gs-L-bolded-cs.png']
+        for image in entry['images']:
+            assert os.path.exists(os.path.join(dataset_dir, image))
+    assert len(read_manifest_lines(dataset_dir)) == 2
+
+    # Resuming only builds missing tasks.
+    os.remove(os.path.join(dataset_dir, entries[0]['images'][0]))
+    new_entries = dataset_builder.build_dataset(REPO, tasks, dataset_dir, config)
+    assert [entry['name'] for entry in new_entries] == [entries[0]['name']]
+    assert len(read_manifest_lines(dataset_dir)) == 3
+    assert dataset_builder.build_dataset(REPO, tasks, dataset_dir, config) == []
+
+    # Resuming with different image options is an error.
+    with pytest.raises(dataset_builder.DatasetConfigError):
+        dataset_builder.build_dataset(
+            REPO, tasks, dataset_dir, dataset_builder.DatasetConfig())
+
+
+def test_failures(tmpdir):
+    dataset_dir = str(tmpdir.join('dataset'))
+    tasks = dataset_builder.collect_tasks(BENCHMARK_DIRS)
+    tasks.append(('missing', tasks[0][1], os.path.join(BENCHMARKS, 'missing.pddl')))
+    config = dataset_builder.DatasetConfig(time_limit=0)
+    entries = dataset_builder.build_dataset(REPO, tasks, dataset_dir, config)
+    assert len(entries) == 3
+    for entry in entries:
+        assert entry['status'] == dataset_builder.STATUS_FAILED
+    assert sorted(entry['error'] for entry in entries)[1:] == [
+        'time limit reached', 'time limit reached']
+    assert sorted(os.listdir(dataset_dir)) == [
+        dataset_builder.CONFIG_FILE, 'gripper', dataset_builder.MANIFEST_FILE, 'miconic']
+
+    # Failed tasks are only built again when asked for.
+    config.time_limit = None
+    assert dataset_builder.build_dataset(REPO, tasks, dataset_dir, config) == []
+    entries = dataset_builder.build_dataset(
+        REPO, tasks, dataset_dir, config, retry_failed=True)
+    assert sorted(entry['status'] for entry in entries) == [
+        dataset_builder.STATUS_FAILED, dataset_builder.STATUS_OK, dataset_builder.STATUS_OK]
+
+
+def test_termination_errors():
+    get_error = dataset_builder._get_termination_error
+    assert get_error(signal.SIGXCPU, 1.0, 10) == 'time limit reached'
+    assert get_error(signal.SIGKILL, 11.0, 10) == 'time limit reached'
+    # Killed before using up the CPU time, e.g., by the OOM killer.
+    assert get_error(signal.SIGKILL, 1.0, 10) == (
+        'killed (memory limit or external kill)')
+    assert get_error(signal.SIGKILL, 1.0, None) == (
+        'killed (memory limit or external kill)')
+    assert get_error(signal.SIGSEGV, 1.0, 10) == (
+        'terminated by signal %d' % signal.SIGSEGV)
+    assert get_error(3 << 8, 1.0, 10) == 'exit code 3'
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the graph rasterization in graph_image.py. Run with
+
+    py.test misc/tests/test_graph_image.py
+"""
+
+import io
+import os
+import random
+import struct
+import sys
+
+import numpy as np
+from PIL import Image
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+sys.path.insert(0, REPO)
+
+import graph_image
+
+# Maximal difference of a pixel value between streaming and regular
+# resizing. We expect the same values, but allow for floating point rounding.
+TOLERANCE = 1
+
+
+def random_graph(num_vertices, max_degree, seed):
+    rng = random.Random(seed)
+    return [[rng.randrange(num_vertices)
+             for _ in range(rng.randrange(max_degree + 1))]
+            for _ in range(num_vertices)]
+
+
+def get_pixels(image):
+    return np.array(image).astype(np.int64)
+
+
+def test_streaming_image_creation():
+    # Includes graphs smaller than, equal to and larger than the target
+    # size (after shrinking).
+    for num_vertices in [30, 128, 383, 1000, 5000]:
+        graph = random_graph(num_vertices, 5, seed=num_vertices)
+        for shrink_ratio in [1, 3, 6]:
+            for bolded in [False, True]:
+                for target_size in [64, 128]:
+                    expected = graph_image.create_constant_size_image(
+                        graph, bolded, shrink_ratio, target_size,
+                        streaming=False)
+                    streamed = graph_image.create_constant_size_image(
+                        graph, bolded, shrink_ratio, target_size)
+                    assert streamed.mode == expected.mode
+                    assert streamed.size == expected.size
+                    difference = np.abs(
+                        get_pixels(streamed) - get_pixels(expected))
+                    assert difference.max() <= TOLERANCE, (
+                        num_vertices, shrink_ratio, bolded, target_size)
+
+
+def create_matrix_image_grayscale_reference(graph, bolded, shrink_ratio):
+    """The original loop-based rasterization, which filled a dense matrix
+    entry by entry and set the pixels one by one."""
+    sz = len(graph)
+    if shrink_ratio > 1:
+        sz += (shrink_ratio - (sz % shrink_ratio))
+    matrix = np.zeros((sz, sz), dtype=int)
+    for i, successors in enumerate(graph):
+        for j in successors:
+            matrix[i, j] = 1
+            if bolded:
+                for bold_i, bold_j in [(i + 1, j), (i - 1, j),
+                                       (i, j + 1), (i, j - 1)]:
+                    if 0 <= bold_i < sz and 0 <= bold_j < sz:
+                        matrix[bold_i, bold_j] = 1
+    shrinked_sz = sz // shrink_ratio
+    shrinked = np.zeros((shrinked_sz, shrinked_sz), dtype=int)
+    n = 0
+    for i in range(shrink_ratio):
+        for j in range(shrink_ratio):
+            if i == j:
+                continue
+            shrinked += (2**n) * matrix[j::shrink_ratio, i::shrink_ratio]
+            n += 1
+    grayscale_type = graph_image.GRAYSCALE_TYPE_OPTS[shrink_ratio]
+    grayscale_color = graph_image.GRAYSCALE_COLOR_OPTS[grayscale_type]
+    if grayscale_type == 'L':
+        shrinked = 4 * shrinked
+    image = Image.new(grayscale_type, (shrinked_sz, shrinked_sz),
+                      grayscale_color)
+    for x, y in zip(*np.nonzero(shrinked)):
+        image.putpixel((int(x), int(y)),
+                       int(grayscale_color - shrinked[x, y]))
+    return image
+
+
+def get_png(image):
+    output = io.BytesIO()
+    image.save(output, 'png')
+    return output.getvalue()
+
+
+def test_vectorized_image_creation():
+    graph = random_graph(200, 5, seed=2)
+    for shrink_ratio in [2, 3, 4, 6]:
+        for bolded in [False, True]:
+            expected = create_matrix_image_grayscale_reference(
+                graph, bolded, shrink_ratio)
+            image = graph_image.create_matrix_image_grayscale(
+                graph, bolded, shrink_ratio)
+            assert get_png(image) == get_png(expected), (shrink_ratio, bolded)
+
+
+def test_resampling_coefficients():
+    for in_size, out_size in [(30, 128), (128, 128), (1000, 128)]:
+        coefficients = graph_image.get_resampling_coefficients(
+            in_size, out_size)
+        assert coefficients.shape == (out_size, in_size)
+        assert np.allclose(coefficients.sum(axis=1), 1)
+
+
+def write_binary_graph(graph, filename):
+    offsets = np.cumsum([0] + [len(successors) for successors in graph])
+    with open(filename, 'wb') as f:
+        f.write(struct.pack('<4siii', graph_image.BINARY_GRAPH_MAGIC,
+                            graph_image.BINARY_GRAPH_VERSION, len(graph),
+                            offsets[-1]))
+        f.write(offsets.astype('<i4').tobytes())
+        f.write(np.array([succ for successors in graph for succ in successors],
+                         dtype='<i4').tobytes())
+
+
+def test_binary_graph_file(tmpdir):
+    graph = random_graph(500, 5, seed=1)
+    # Vertices without successors at the start and end of the graph.
+    graph[0] = []
+    graph[-1] = []
+    filename = str(tmpdir.join('graph.bin'))
+    write_binary_graph(graph, filename)
+    binary_graph = graph_image.read_graph(filename)
+    assert isinstance(binary_graph, graph_image.CSRGraph)
+    # As in text graph files, the last vertex without successors is dropped.
+    assert len(binary_graph) == len(graph) - 1
+    assert ([list(binary_graph[vertex]) for vertex in range(len(graph) - 1)] ==
+            graph[:-1])
+    for shrink_ratio in [3, 6]:
+        expected = graph_image.create_constant_size_image(
+            graph[:-1], True, shrink_ratio)
+        image = graph_image.create_constant_size_image(
+            binary_graph, True, shrink_ratio)
+        assert np.array_equal(get_pixels(image), get_pixels(expected))
+
+
+def test_text_graph_file(tmpdir):
+    filename = str(tmpdir.join('graph.txt'))
+    with open(filename, 'w') as f:
+        f.write('1,2\n\n0')
+    assert graph_image.read_graph(filename) == [[1, 2], [], [0]]
+
+
+def write_text_graph(graph, filename):
+    # As AbstractStructureGraph.write_adjacency_graph().
+    with open(filename, 'w') as f:
+        f.write('\n'.join(','.join(str(succ) for succ in successors)
+                          for successors in graph))
+
+
+def test_last_vertex_without_successors(tmpdir):
+    # With 501 vertices, the shrinked matrix is one square larger than with
+    # the 500 vertices read from the text file.
+    graph = random_graph(501, 5, seed=3)
+    graph[-1] = []
+    text_filename = str(tmpdir.join('graph.txt'))
+    binary_filename = str(tmpdir.join('graph.bin'))
+    write_text_graph(graph, text_filename)
+    write_binary_graph(graph, binary_filename)
+    text_graph = graph_image.read_graph(text_filename)
+    binary_graph = graph_image.read_graph(binary_filename)
+    assert len(text_graph) == len(binary_graph) == len(graph) - 1
+    assert len(graph_image.drop_last_vertex_without_successors(graph)) == len(text_graph)
+    for shrink_ratio in [1, 3, 6]:
+        for streaming in [False, True]:
+            expected = graph_image.create_constant_size_image(
+                text_graph, True, shrink_ratio, streaming=streaming)
+            image = graph_image.create_constant_size_image(
+                binary_graph, True, shrink_ratio, streaming=streaming)
+            assert get_png(image) == get_png(expected), (shrink_ratio, streaming)
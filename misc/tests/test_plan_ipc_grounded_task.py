@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the reuse of the task translated for the grounded graph in
+plan-ipc.py. Run with
+
+    py.test misc/tests/test_plan_ipc_grounded_task.py
+"""
+
+import os
+import sys
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+sys.path.insert(0, REPO)
+
+from dl_model import selector
+import helpers
+import speculative_translation
+
+H2_PLANNER = '{}-h2-simpless-dks-blind'.format(selector.TRAINING_REVISION_V2)
+NO_H2_PLANNER = selector.ALGORITHMS_WITHOUT_H2_PREPROCESSOR[0]
+PREPROCESSOR = '/fake/bin/preprocess'
+
+
+class FakeSubprocess(object):
+    """Stand-in for the subprocess calls of plan-ipc.py: the graph
+    computation with fast-downward.py writes the translated task to
+    output.sas, the h2 preprocessor writes its input with a marker to
+    output.sas and the planner is only recorded."""
+    def __init__(self):
+        self.planners = []
+        self.preprocessor_calls = 0
+
+    def check_call(self, command, stdin=None, cwd=None, timeout=None):
+        if command == [PREPROCESSOR]:
+            self.preprocessor_calls += 1
+            with open(os.path.join(cwd, 'output.sas'), 'w') as f:
+                f.write(stdin.read() + 'preprocessed\n')
+        else:
+            assert os.path.basename(command[1]) == 'fast-downward.py'
+            with open('output.sas', 'w') as f:
+                f.write('translated\n')
+            with open('symmetry-graph.txt', 'w') as f:
+                f.write('1\n0')
+
+    def call(self, command):
+        self.planners.append(command)
+        return 0
+
+
+def setup_plan_ipc(tmpdir, monkeypatch, selected_planner):
+    plan_ipc = helpers.load_plan_ipc()
+    monkeypatch.chdir(tmpdir)
+    fake_subprocess = FakeSubprocess()
+    monkeypatch.setattr(plan_ipc.subprocess, 'check_call',
+                        fake_subprocess.check_call)
+    monkeypatch.setattr(plan_ipc.subprocess, 'call', fake_subprocess.call)
+    monkeypatch.setattr(plan_ipc.run_components, 'get_executable',
+                        lambda build, rel_path: PREPROCESSOR)
+    monkeypatch.setattr(plan_ipc, 'select_planner_from_model',
+                        lambda *args: selected_planner)
+    # run_planner() uses the command line arguments of plan-ipc.py.
+    monkeypatch.setattr(plan_ipc, 'domain', 'domain.pddl', raising=False)
+    monkeypatch.setattr(plan_ipc, 'problem', 'problem.pddl', raising=False)
+    monkeypatch.setattr(plan_ipc, 'plan', 'sas_plan', raising=False)
+    return plan_ipc, fake_subprocess
+
+
+def write_stale_task(tmpdir):
+    tmpdir.join(speculative_translation.TRANSLATED_TASK).write('stale\n')
+
+
+def get_sas_file(planner):
+    """Return the translated task the planner starts from, or None if it
+    translates the task itself."""
+    # The options of all planners used here start with --symmetries.
+    planner_options = planner[:planner.index('--symmetries')]
+    last_argument = planner_options[-1]
+    if last_argument.endswith('.sas'):
+        return last_argument
+    assert planner_options[-2:] == ['domain.pddl', 'problem.pddl']
+    return None
+
+
+def test_translated_task_without_h2(tmpdir, monkeypatch):
+    plan_ipc, fake_subprocess = setup_plan_ipc(tmpdir, monkeypatch, NO_H2_PLANNER)
+    write_stale_task(tmpdir)
+    assert plan_ipc.determine_and_run_planner(
+        'domain.pddl', 'problem.pddl', 'sas_plan', False)
+    translated_task = str(tmpdir.join(speculative_translation.TRANSLATED_TASK))
+    assert not tmpdir.join(speculative_translation.PREPROCESSED_TASK).check()
+    with open(translated_task) as f:
+        assert f.read() == 'translated\n'
+    [planner] = fake_subprocess.planners
+    assert get_sas_file(planner) == translated_task
+    assert '--transform-task' not in planner
+    assert fake_subprocess.preprocessor_calls == 0
+
+
+def test_preprocessed_task_with_h2(tmpdir, monkeypatch):
+    plan_ipc, fake_subprocess = setup_plan_ipc(tmpdir, monkeypatch, H2_PLANNER)
+    write_stale_task(tmpdir)
+    assert plan_ipc.determine_and_run_planner(
+        'domain.pddl', 'problem.pddl', 'sas_plan', False)
+    preprocessed_task = str(tmpdir.join(speculative_translation.PREPROCESSED_TASK))
+    with open(preprocessed_task) as f:
+        assert f.read() == 'translated\npreprocessed\n'
+    [planner] = fake_subprocess.planners
+    assert get_sas_file(planner) == preprocessed_task
+    assert '--transform-task' not in planner
+    assert fake_subprocess.preprocessor_calls == 1
+
+
+def test_stale_task_with_failed_graph_computation(tmpdir, monkeypatch):
+    plan_ipc, fake_subprocess = setup_plan_ipc(tmpdir, monkeypatch, H2_PLANNER)
+    monkeypatch.setattr(plan_ipc, 'compute_graph_for_task',
+                        lambda *args: None)
+    write_stale_task(tmpdir)
+    assert not plan_ipc.determine_and_run_planner(
+        'domain.pddl', 'problem.pddl', 'sas_plan', False)
+    # The task kept by an earlier run is removed ...
+    assert not tmpdir.join(speculative_translation.TRANSLATED_TASK).check()
+    # ... and the fallback planner translates the task itself.
+    plan_ipc.run_planner(str(tmpdir), 'fallback', pwd=str(tmpdir))
+    [planner] = fake_subprocess.planners
+    assert get_sas_file(planner) is None
+    assert planner[planner.index('--transform-task') + 1] == 'preprocess'
+    assert fake_subprocess.preprocessor_calls == 0
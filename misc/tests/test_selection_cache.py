@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the cache of planner selections. Run with
+
+    py.test misc/tests/test_selection_cache.py
+"""
+
+import multiprocessing
+import os
+import sys
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+BENCHMARKS = os.path.join(DIR, 'benchmarks')
+sys.path.insert(0, REPO)
+
+import graph_image
+import selection_cache
+
+
+def get_model_files(tmpdir):
+    model_files = []
+    for name in ['model.json', 'model.h5']:
+        path = tmpdir.join(name)
+        path.write('model')
+        model_files.append(str(path))
+    return model_files
+
+
+def test_normalize_pddl():
+    text = "(define (PROBLEM p) ; comment\n  (:objects a b)\n\t(:init (at a)))"
+    assert (selection_cache.normalize_pddl(text) ==
+            "( define ( problem p ) ( :objects a b ) ( :init ( at a ) ) )")
+
+
+def test_task_key(tmpdir):
+    model_files = get_model_files(tmpdir)
+    domain = os.path.join(BENCHMARKS, 'gripper', 'domain.pddl')
+    problem = os.path.join(BENCHMARKS, 'gripper', 'prob01.pddl')
+    reformatted_problem = tmpdir.join('problem.pddl')
+    with open(problem) as f:
+        reformatted_problem.write(
+            '; reformatted\n' + f.read().upper().replace(' ', '\n  '))
+    other_problem = os.path.join(BENCHMARKS, 'miconic', 's1-0.pddl')
+
+    key = selection_cache.get_task_key(domain, problem, True, model_files)
+    assert key == selection_cache.get_task_key(
+        domain, str(reformatted_problem), True, model_files)
+    assert key != selection_cache.get_task_key(
+        domain, other_problem, True, model_files)
+    assert key != selection_cache.get_task_key(
+        domain, problem, False, model_files)
+
+
+def test_graph_key(tmpdir):
+    model_files = get_model_files(tmpdir)
+    graph = [[1, 2], [2], [], [0, 1]]
+    reordered_graph = [[2, 1], [2], [], [1, 0]]
+    csr_graph = graph_image.CSRGraph(
+        graph_image.np.array([0, 2, 3, 3, 5]),
+        graph_image.np.array([1, 2, 2, 0, 1]))
+    key = selection_cache.get_graph_key(graph, True, model_files)
+    assert key == selection_cache.get_graph_key(reordered_graph, True, model_files)
+    assert key == selection_cache.get_graph_key(csr_graph, True, model_files)
+    assert key != selection_cache.get_graph_key(graph + [[]], True, model_files)
+
+
+def test_store_and_lookup(tmpdir):
+    cache = selection_cache.SelectionCache(str(tmpdir.join('cache')))
+    image = tmpdir.join('image.png')
+    image.write('image')
+    assert cache.lookup('key') is None
+    cache.store('key', 'algorithm', {'image.png': str(image)})
+    assert cache.lookup('key') == 'algorithm'
+    assert tmpdir.join('cache', 'entries', 'key', 'image.png').read() == 'image'
+    # Existing entries are kept.
+    cache.store('key', 'other-algorithm')
+    assert cache.lookup('key') == 'algorithm'
+    assert tmpdir.join('cache', 'tmp').listdir() == []
+
+
+def test_eviction(tmpdir):
+    data = tmpdir.join('data')
+    data.write('x' * 1000)
+    cache = selection_cache.SelectionCache(str(tmpdir.join('cache')), max_size=2500)
+    for index, key in enumerate(['a', 'b']):
+        cache.store(key, 'algorithm', {'data': str(data)})
+        algorithm_file = tmpdir.join('cache', 'entries', key, 'algorithm')
+        os.utime(str(algorithm_file), (index, index))
+    # Using entry a makes b the least recently used entry.
+    assert cache.lookup('a') == 'algorithm'
+    cache.store('c', 'algorithm', {'data': str(data)})
+    assert cache.lookup('a') == 'algorithm'
+    assert cache.lookup('b') is None
+    assert cache.lookup('c') == 'algorithm'
+
+
+def store_entries(args):
+    cache_dir, data, worker = args
+    cache = selection_cache.SelectionCache(cache_dir, max_size=20000)
+    for index in range(20):
+        cache.store('shared', 'algorithm', {'data': data})
+        cache.store('%d-%d' % (worker, index), 'algorithm', {'data': data})
+        assert cache.lookup('shared') in ['algorithm', None]
+
+
+def test_concurrent_access(tmpdir):
+    data = tmpdir.join('data')
+    data.write('x' * 1000)
+    cache_dir = str(tmpdir.join('cache'))
+    pool = multiprocessing.Pool(4)
+    try:
+        pool.map(store_entries, [(cache_dir, str(data), worker)
+                                 for worker in range(8)])
+    finally:
+        pool.close()
+        pool.join()
+    entries = tmpdir.join('cache', 'entries').listdir()
+    assert 0 < len(entries) <= 20
+    for entry in entries:
+        assert entry.join('algorithm').read() == 'algorithm\n'
+        assert entry.join('data').size() == 1000
+    assert tmpdir.join('cache', 'tmp').listdir() == []
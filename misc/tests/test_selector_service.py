@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the planner selection service of selector-daemon.py. Run with
+
+    py.test misc/tests/test_selector_service.py
+"""
+
+import io
+import os
+import socket
+import sys
+import threading
+import time
+
+from PIL import Image
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+sys.path.insert(0, REPO)
+
+from dl_model import service
+import helpers
+
+MODELS = {'lifted': 'lifted-model', 'grounded': 'grounded-model'}
+
+
+def select_algorithm(model, image):
+    """Stand-in for selector.select_algorithm that shows its inputs."""
+    return '%s-%sx%s' % (model, image.size[0], image.size[1])
+
+
+def failing_select_algorithm(model, image):
+    raise ValueError('cannot classify image')
+
+
+def write_image(tmpdir, name):
+    path = str(tmpdir.join(name))
+    Image.new('L', (128, 128), 255).save(path, 'png')
+    return path
+
+
+def test_serve_text_streams(tmpdir, monkeypatch):
+    monkeypatch.setattr(service.selector, 'select_algorithm', select_algorithm)
+    image_path = write_image(tmpdir, 'image with spaces.png')
+    infile = io.StringIO(u'lifted %s\n'
+                         u'grounded %s\n'
+                         u'unknown %s\n'
+                         u'malformed\n'
+                         u'lifted %s\n'
+                         u'\n'
+                         u'lifted %s\n' % (image_path, image_path, image_path,
+                                           str(tmpdir.join('missing.png')),
+                                           image_path))
+    outfile = io.StringIO()
+    service.serve(MODELS, infile, outfile)
+    lines = outfile.getvalue().splitlines()
+    assert lines[:3] == ['lifted-model-128x128', 'grounded-model-128x128',
+                         'error: no model unknown loaded']
+    assert lines[3] == 'error: malformed request "malformed"'
+    assert lines[4].startswith('error: ')
+    # The empty line ends the session.
+    assert len(lines) == 5
+
+
+def test_serve_error_reply(tmpdir, monkeypatch):
+    monkeypatch.setattr(service.selector, 'select_algorithm',
+                        failing_select_algorithm)
+    image_path = write_image(tmpdir, 'image.png')
+    outfile = io.StringIO()
+    service.serve(MODELS, io.StringIO(u'lifted %s\n' % image_path), outfile)
+    assert outfile.getvalue() == 'error: cannot classify image\n'
+
+
+def test_serve_binary_streams(tmpdir, monkeypatch):
+    monkeypatch.setattr(service.selector, 'select_algorithm', select_algorithm)
+    image_path = write_image(tmpdir, u'bild-äöü.png')
+    infile = io.BytesIO(b'lifted \xff\xfe.png\n' +
+                        (u'grounded %s\n' % image_path).encode('utf-8'))
+    outfile = io.BytesIO()
+    service.serve(MODELS, infile, outfile)
+    lines = outfile.getvalue().decode('utf-8').splitlines()
+    assert len(lines) == 2
+    # A request that is not UTF-8 is answered with an error, and the
+    # session goes on.
+    assert lines[0].startswith('error: request is not utf-8')
+    assert lines[1] == 'grounded-model-128x128'
+
+
+def start_service(socket_path, answer):
+    """Listen on socket_path and handle one connection in a thread, with
+    service.serve if answer is true and without ever answering otherwise."""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+
+    def handle():
+        connection, _ = server.accept()
+        if answer:
+            service.serve(MODELS, connection.makefile('rb'),
+                          connection.makefile('wb'))
+        else:
+            connection.recv(4096)
+            time.sleep(5)
+        connection.close()
+        server.close()
+
+    thread = threading.Thread(target=handle)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def test_request_selection(tmpdir, monkeypatch):
+    monkeypatch.setattr(service.selector, 'select_algorithm', select_algorithm)
+    image_path = write_image(tmpdir, u'bild-äöü.png')
+    socket_path = str(tmpdir.join('selector.socket'))
+    thread = start_service(socket_path, answer=True)
+    assert service.request_selection(
+        socket_path, 'lifted', image_path, timeout=10) == 'lifted-model-128x128'
+    thread.join(10)
+
+
+def test_request_selection_error_reply(tmpdir):
+    socket_path = str(tmpdir.join('selector.socket'))
+    thread = start_service(socket_path, answer=True)
+    try:
+        service.request_selection(socket_path, 'unknown', 'image.png',
+                                  timeout=10)
+    except service.SelectorServiceError as err:
+        assert 'no model unknown loaded' in str(err)
+    else:
+        assert False, 'error reply not raised'
+    thread.join(10)
+
+
+def test_request_selection_timeout(tmpdir):
+    socket_path = str(tmpdir.join('selector.socket'))
+    start_service(socket_path, answer=False)
+    start = time.time()
+    try:
+        service.request_selection(socket_path, 'lifted', 'image.png',
+                                  timeout=0.5)
+    except service.SelectorServiceError as err:
+        assert 'not available' in str(err)
+    else:
+        assert False, 'timeout not raised'
+    assert time.time() - start < 4
+
+
+def test_fallback_to_in_process_model(tmpdir, monkeypatch):
+    plan_ipc = helpers.load_plan_ipc()
+    monkeypatch.setattr(plan_ipc, 'SELECTOR_SERVICE_TIME_LIMIT', 0.5)
+    pwd = str(tmpdir)
+    image_path = os.path.join(pwd, plan_ipc.IMAGE_FILE_NAME)
+
+    def create_image(command, timeout):
+        # Stand-in for create-image-from-graph.py.
+        Image.new('L', (128, 128), 255).save(image_path, 'png')
+    monkeypatch.setattr(plan_ipc.subprocess, 'check_call', create_image)
+    monkeypatch.setattr(plan_ipc.selector, 'select_algorithm_from_model',
+                        lambda json_model, h5_model, path: 'in-process')
+
+    socket_path = str(tmpdir.join('selector.socket'))
+    start_service(socket_path, answer=False)
+    start = time.time()
+    assert plan_ipc.select_planner_from_model(
+        REPO, pwd, str(tmpdir.join('graph.txt')), True,
+        selector_socket=socket_path) == 'in-process'
+    assert time.time() - start < 4
+    # Without a service, the model is also loaded in-process.
+    assert plan_ipc.select_planner_from_model(
+        REPO, pwd, str(tmpdir.join('graph.txt')), True,
+        selector_socket=str(tmpdir.join('missing.socket'))) == 'in-process'
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test module for the speculative translation of plan-ipc.py. Run with
+
+    py.test misc/tests/test_speculative_translation.py
+"""
+
+import os
+import sys
+import time
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+sys.path.insert(0, REPO)
+
+import speculative_translation
+
+## Stand-in for fast-downward.py that writes a translated task after the
+## given number of seconds.
+FAKE_DRIVER = """
+import time
+time.sleep(%s)
+with open('output.sas', 'w') as f:
+    f.write('begin_version\\n3\\nend_version\\n')
+"""
+
+
+def create_base_dir(tmpdir, seconds=0):
+    base_dir = tmpdir.mkdir('base')
+    base_dir.join('fast-downward.py').write(FAKE_DRIVER % seconds)
+    return str(base_dir)
+
+
+def create_speculation(tmpdir, seconds=0):
+    return speculative_translation.SpeculativeTranslation(
+        create_base_dir(tmpdir, seconds), 'domain.pddl', 'problem.pddl',
+        str(tmpdir.join('work')))
+
+
+def test_translated_task(tmpdir):
+    speculation = create_speculation(tmpdir)
+    speculation.start()
+    sas_file = speculation.get_task(use_h2_preprocessor=False, timeout=60)
+    assert sas_file == str(tmpdir.join('work', speculative_translation.TRANSLATED_TASK))
+    with open(sas_file) as f:
+        assert f.readline() == 'begin_version\n'
+
+
+def test_missing_preprocessor(tmpdir):
+    speculation = create_speculation(tmpdir)
+    speculation.start()
+    speculation._thread.join(60)
+    if speculation.preprocessed_task is None:
+        # Without the h2 preprocessor, the task is translated again.
+        assert speculation.get_task(use_h2_preprocessor=True) is None
+    assert speculation.get_task(use_h2_preprocessor=False) is not None
+
+
+def test_timeout(tmpdir):
+    speculation = create_speculation(tmpdir, seconds=60)
+    speculation.start()
+    assert speculation.get_task(use_h2_preprocessor=False, timeout=0.1) is None
+    speculation.cancel()
+
+
+def test_cancel(tmpdir):
+    speculation = create_speculation(tmpdir, seconds=60)
+    speculation.start()
+    time.sleep(0.5)
+    start = time.time()
+    speculation.cancel()
+    assert speculation.get_task(use_h2_preprocessor=True, timeout=30) is None
+    assert time.time() - start < 30
+    assert not os.path.exists(str(tmpdir.join('work', speculative_translation.TRANSLATED_TASK)))
@@ -4,6 +4,7 @@
 import argparse
 import os
 import sys
+import time
 
 if (sys.version_info > (3, 0)):
     import subprocess
@@ -11,10 +12,21 @@ else:
     import subprocess32 as subprocess
 
 from dl_model import selector
+from dl_model import service
+from driver import run_components
+import graph_image
+import selection_cache
+import selection_pipeline
+import speculative_translation
 
 FALLBACK_COMMAND_LINE_OPTIONS = ['--symmetries', 'sym=structural_symmetries(search_symmetries=dks)', '--search', 'astar(celmcut,symmetries=sym,pruning=stubborn_sets_simple(minimum_pruning_ratio=0.01),num_por_probes=1000)']
 GRAPH_CREATION_TIME_LIMIT = 60 # seconds
 IMAGE_CREATION_TIME_LIMIT = 180 # seconds
+# The selector daemon answers one request at a time, so a busy daemon must
+# not keep us from selecting the planner in-process.
+SELECTOR_SERVICE_TIME_LIMIT = 60 # seconds
+IMAGE_FILE_NAME = 'graph-gs-L-bolded-cs.png'
+SPECULATIVE_TRANSLATION_DIR = 'speculative-translation'
 
 def get_script():
     """Get file name of main script."""
@@ -39,10 +51,12 @@ def print_highlighted_line(string, block=True):
         print
 
 
-def compute_graph_for_task(base_dir, pwd, domain, problem, image_from_lifted_task):
+def compute_graph_for_task(base_dir, pwd, domain, problem, image_from_lifted_task, graph_template_dir=None):
     if image_from_lifted_task:
         command = [sys.executable, os.path.join(base_dir, 'src/translate/abstract_structure_module.py'), '--only-functions-from-initial-state', domain, problem]
-        graph_file = os.path.join(pwd, 'abstract-structure-graph.txt')
+        if graph_template_dir is not None:
+            command += ['--abstract-structure-graph-template-dir', graph_template_dir]
+        graph_file = os.path.join(pwd, 'abstract-structure-graph.bin')
     else:
         command = [sys.executable, os.path.join(base_dir, 'fast-downward.py'), '--build', 'release64', domain, problem, '--symmetries','sym=structural_symmetries(time_bound=0,search_symmetries=oss,dump_symmetry_graph=true,stop_after_symmetry_graph_creation=true)', '--search', 'astar(blind(),symmetries=sym)']
         graph_file = os.path.join(pwd, 'symmetry-graph.txt')
@@ -62,13 +76,66 @@ def compute_graph_for_task(base_dir, pwd, domain, problem, image_from_lifted_tas
         # our fallback planner.
         return None
         #raise
+    if not image_from_lifted_task:
+        keep_grounded_task(pwd)
     return graph_file
 
 
-def select_planner_from_model(base_dir, pwd, graph_file, image_from_lifted_task):
+def select_algorithm_from_service(selector_socket, image_path, image_from_lifted_task):
+    """Return the algorithm selected by a running selector-daemon.py, or None
+    if the service is not available."""
+    model_name = 'lifted' if image_from_lifted_task else 'grounded'
+    try:
+        return service.request_selection(selector_socket, model_name, image_path, timeout=SELECTOR_SERVICE_TIME_LIMIT)
+    except service.SelectorServiceError as err:
+        print("{}, loading the model in-process.".format(err))
+        return None
+
+
+def lookup_cached_selection(cache, get_key, *args):
+    """Return the cache key computed by get_key(*args) and the algorithm
+    stored for it (None if there is none). The key is None if it cannot be
+    computed, in which case the selection is neither looked up nor stored."""
+    try:
+        key = get_key(*args)
+    except Exception as err:
+        print("Could not compute selection cache key: {}".format(err))
+        return None, None
+    selected_algorithm = cache.lookup(key)
+    if selected_algorithm is not None:
+        print("Found selection {} in the cache.".format(selected_algorithm))
+    return key, selected_algorithm
+
+
+def store_selection(cache, key, selected_algorithm, files):
+    try:
+        cache.store(key, selected_algorithm, files)
+    except (IOError, OSError) as err:
+        print("Could not store selection in the cache: {}".format(err))
+
+
+def get_cached_files(graph_file, image_path):
+    files = {'image.png': image_path}
+    if graph_file is not None:
+        files['graph' + os.path.splitext(graph_file)[1]] = graph_file
+    return files
+
+
+def select_planner_from_model(base_dir, pwd, graph_file, image_from_lifted_task, selector_socket=None, streaming_image_creation=True, cache=None):
+    model_files = selection_pipeline.get_model_files(base_dir, image_from_lifted_task)
+    if cache is not None:
+        # Identical graphs lead to the same selection.
+        graph_key, selected_algorithm = lookup_cached_selection(
+            cache, selection_cache.get_graph_file_key, graph_file, image_from_lifted_task, model_files)
+        if selected_algorithm is not None:
+            return selected_algorithm
+
+    command = [sys.executable, os.path.join(base_dir, 'create-image-from-graph.py'), '--write-abstract-structure-image-reg', '--bolding-abstract-structure-image', '--abstract-structure-image-target-size', '128', graph_file, pwd]
+    if not streaming_image_creation:
+        command.append('--abstract-structure-image-no-streaming')
     try:
         # Create an image from the abstract structure for the given domain and problem.
-        subprocess.check_call([sys.executable, os.path.join(base_dir, 'create-image-from-graph.py'), '--write-abstract-structure-image-reg', '--bolding-abstract-structure-image', '--abstract-structure-image-target-size', '128', graph_file, pwd], timeout=IMAGE_CREATION_TIME_LIMIT)
+        subprocess.check_call(command, timeout=IMAGE_CREATION_TIME_LIMIT)
     except subprocess.TimeoutExpired:
         sys.stdout.flush()
         print("Image computation reached the time limit!")
@@ -85,68 +152,240 @@ def select_planner_from_model(base_dir, pwd, graph_file, image_from_lifted_task)
         #raise
 
     # TODO: we should be able to not hard-code the file name
-    image_file_name = 'graph-gs-L-bolded-cs.png'
-    image_path = os.path.join(pwd, image_file_name)
+    image_path = os.path.join(pwd, IMAGE_FILE_NAME)
     assert os.path.exists(image_path)
     # Use the learned model to select the appropriate planner (its command line options)
+    selected_algorithm = None
+    if selector_socket is not None:
+        selected_algorithm = select_algorithm_from_service(selector_socket, image_path, image_from_lifted_task)
+    if selected_algorithm is None:
+        json_model, h5_model = model_files
+        selected_algorithm = selector.select_algorithm_from_model(json_model, h5_model, image_path)
+    if cache is not None and graph_key is not None:
+        store_selection(cache, graph_key, selected_algorithm, get_cached_files(graph_file, image_path))
+    return selected_algorithm
+
+
+def run_stage_in_process(description, time_limit, function, *args):
+    try:
+        with selection_pipeline.time_limit(time_limit):
+            return function(*args)
+    except selection_pipeline.StageTimeout:
+        sys.stdout.flush()
+        print("{} reached the time limit!".format(description))
+        return None
+    except:
+        # We catch all exceptions (this includes SystemExit raised by the
+        # translator on errors) to make sure that if we cannot automatically
+        # select a planner, we still run our fallback planner.
+        sys.stdout.flush()
+        print("{} failed!".format(description))
+        return None
+
+
+def select_planner_in_process(base_dir, pwd, domain, problem, image_from_lifted_task, selector_socket=None, streaming_image_creation=True, cache=None, graph_template_dir=None):
+    """Compute graph, image and selected planner without starting a new Python
+    interpreter for each of these steps."""
+    graph_file = None
     if image_from_lifted_task:
-        model_subfolder = 'lifted'
+        graph = run_stage_in_process(
+            "Graph computation", GRAPH_CREATION_TIME_LIMIT,
+            selection_pipeline.compute_abstract_structure_graph,
+            base_dir, domain, problem, graph_template_dir)
     else:
-        model_subfolder = 'grounded'
-    json_model = os.path.join(base_dir, 'dl_model', 'models', model_subfolder, 'model.json')
-    h5_model = os.path.join(base_dir, 'dl_model', 'models', model_subfolder, 'model.h5')
-    selected_algorithm = selector.select_algorithm_from_model(json_model, h5_model, image_path)
+        # The graph of the grounded task is computed by the search component.
+        graph_file = compute_graph_for_task(base_dir, pwd, domain, problem, image_from_lifted_task)
+        if graph_file is None:
+            return None
+        graph = run_stage_in_process(
+            "Reading the graph", GRAPH_CREATION_TIME_LIMIT,
+            graph_image.read_graph, graph_file)
+    if graph is None:
+        return None
+    print_highlighted_line("Done computing an abstract structure graph.")
+
+    model_files = selection_pipeline.get_model_files(base_dir, image_from_lifted_task)
+    if cache is not None:
+        # Identical graphs lead to the same selection.
+        graph_key, selected_algorithm = lookup_cached_selection(
+            cache, selection_cache.get_graph_key, graph, image_from_lifted_task, model_files)
+        if selected_algorithm is not None:
+            return selected_algorithm
+
+    image = run_stage_in_process(
+        "Image computation", IMAGE_CREATION_TIME_LIMIT,
+        selection_pipeline.create_image, graph, 128, streaming_image_creation)
+    if image is None:
+        return None
+    del graph
+
+    print_highlighted_line("Selecting planner from learned model...")
+    image_path = os.path.join(pwd, IMAGE_FILE_NAME)
+    if selector_socket is not None or cache is not None:
+        # The service reads the image from disk, and the cache stores a copy.
+        image.save(image_path, 'png')
+    selected_algorithm = None
+    if selector_socket is not None:
+        selected_algorithm = select_algorithm_from_service(selector_socket, image_path, image_from_lifted_task)
+    if selected_algorithm is None:
+        json_model, h5_model = model_files
+        model = selector.load_model(json_model, h5_model)
+        selected_algorithm = selector.select_algorithm(model, image)
+    if cache is not None and graph_key is not None:
+        store_selection(cache, graph_key, selected_algorithm, get_cached_files(graph_file, image_path))
     return selected_algorithm
 
 
-def build_planner_from_command_line_options(base_dir, command_line_options, use_h2_preprocessor):
+def get_remaining_time(deadline):
+    if deadline is None:
+        return None
+    return max(0, int(deadline - time.time()))
+
+
+def get_speculatively_translated_task(speculation, use_h2_preprocessor, deadline):
+    """Return the translated (and preprocessed) task computed concurrently with
+    the selection, waiting for it if necessary, or None if there is none."""
+    if speculation is None:
+        return None
+    print_highlighted_line("Waiting for the speculative translation...")
+    sas_file = speculation.get_task(use_h2_preprocessor, get_remaining_time(deadline))
+    if sas_file is None:
+        print("Speculative translation failed or did not finish in time.")
+        speculation.cancel()
+    else:
+        print("Using speculatively translated task {}".format(sas_file))
+    return sas_file
+
+
+def keep_grounded_task(pwd):
+    """Keep the task translated for computing the grounded graph, so that the
+    selected planner can start directly with the search."""
+    try:
+        os.rename(os.path.join(pwd, speculative_translation.PREPROCESSED_TASK),
+                  os.path.join(pwd, speculative_translation.TRANSLATED_TASK))
+    except OSError as err:
+        print("Could not keep the translated task: {}".format(err))
+
+
+def remove_grounded_task(pwd):
+    """Remove the translated task kept by an earlier run in the same
+    directory, which may belong to a different task."""
+    translated_task = os.path.join(pwd, speculative_translation.TRANSLATED_TASK)
+    if os.path.exists(translated_task):
+        os.remove(translated_task)
+
+
+def get_grounded_task(pwd, use_h2_preprocessor, deadline):
+    """Return the task translated for computing the grounded graph (preprocessed
+    with the h2 preprocessor, if use_h2_preprocessor is true), or None if it is
+    not available. The translated task is kept as output-translated.sas, the
+    preprocessed task is written to output.sas."""
+    translated_task = os.path.join(pwd, speculative_translation.TRANSLATED_TASK)
+    if not os.path.exists(translated_task):
+        return None
+    if not use_h2_preprocessor:
+        print("Using translated task {}".format(translated_task))
+        return translated_task
+    print_highlighted_line("Preprocessing the translated task...")
+    try:
+        preprocess = run_components.get_executable(
+            speculative_translation.BUILD, speculative_translation.H2_PREPROCESSOR)
+        with open(translated_task) as stdin:
+            subprocess.check_call([preprocess], stdin=stdin, cwd=pwd, timeout=get_remaining_time(deadline))
+    except (IOError, OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired) as err:
+        sys.stdout.flush()
+        print("Preprocessing the translated task failed: {}".format(err))
+        return None
+    preprocessed_task = os.path.join(pwd, speculative_translation.PREPROCESSED_TASK)
+    print("Using preprocessed task {}".format(preprocessed_task))
+    return preprocessed_task
+
+
+def build_planner_from_command_line_options(base_dir, command_line_options, use_h2_preprocessor, sas_file=None, time_limit=None):
     planner = [sys.executable, os.path.join(base_dir, 'fast-downward.py')]
-    if use_h2_preprocessor:
+    if use_h2_preprocessor and sas_file is None:
         planner.extend(['--transform-task', 'preprocess'])
-    planner.extend(['--build', 'release64', '--search-memory-limit', '7600M', '--plan-file', plan, domain, problem])
+    planner.extend(['--build', 'release64', '--search-memory-limit', '7600M'])
+    if time_limit is not None:
+        planner.extend(['--overall-time-limit', '{}s'.format(time_limit)])
+    planner.extend(['--plan-file', plan])
+    if sas_file is None:
+        planner.extend([domain, problem])
+    else:
+        # The driver only runs the search for translated tasks.
+        planner.append(sas_file)
     planner.extend(command_line_options)
     return planner
 
 
-def run_planner(base_dir, selected_planner):
+def run_planner(base_dir, selected_planner, speculation=None, deadline=None, pwd=None):
     if selected_planner == 'seq-opt-symba-1':
+        if speculation is not None:
+            speculation.cancel()
         planner = [sys.executable, os.path.join(base_dir, 'symba.py'), selected_planner, domain, problem, plan]
-    elif selected_planner == 'fallback':
-        planner = build_planner_from_command_line_options(base_dir, FALLBACK_COMMAND_LINE_OPTIONS, use_h2_preprocessor=True)
     else:
-        command_line_options = selector.ALGORITHM_TO_COMMAND_LINE_STRING[selected_planner]
-        use_h2_preprocessor = selected_planner not in selector.ALGORITHMS_WITHOUT_H2_PREPROCESSOR
-        planner = build_planner_from_command_line_options(base_dir, command_line_options, use_h2_preprocessor)
+        if selected_planner == 'fallback':
+            command_line_options = FALLBACK_COMMAND_LINE_OPTIONS
+            use_h2_preprocessor = True
+        else:
+            command_line_options = selector.ALGORITHM_TO_COMMAND_LINE_STRING[selected_planner]
+            use_h2_preprocessor = selected_planner not in selector.ALGORITHMS_WITHOUT_H2_PREPROCESSOR
+        sas_file = get_speculatively_translated_task(speculation, use_h2_preprocessor, deadline)
+        if sas_file is None and pwd is not None:
+            sas_file = get_grounded_task(pwd, use_h2_preprocessor, deadline)
+        planner = build_planner_from_command_line_options(base_dir, command_line_options, use_h2_preprocessor, sas_file, get_remaining_time(deadline))
     print("Running planner, call string: {}".format(planner))
     sys.stdout.flush()
     subprocess.call(planner)
 
 
-def determine_and_run_planner(domain, problem, plan, image_from_lifted_task):
+def determine_and_run_planner(domain, problem, plan, image_from_lifted_task, in_process_selection=False, selector_socket=None, streaming_image_creation=True, selection_cache_dir=None, selection_cache_size=selection_cache.DEFAULT_MAX_SIZE, speculation=None, deadline=None, graph_template_dir=None):
     """Return true iff the determined planner succesfully solved the task."""
     base_dir = get_base_dir()
     pwd = os.getcwd()
+    remove_grounded_task(pwd)
 
-    print_highlighted_line("Computing an abstract structure graph from the " + ("lifted" if image_from_lifted_task else "grounded") + " task description...")
-    graph_file = compute_graph_for_task(base_dir, pwd, domain, problem, image_from_lifted_task)
-    if graph_file is None:
-        print_highlighted_line("Computing abstract structure graph failed, using fallback planner!")
-        return False
-    else:
-        print_highlighted_line("Done computing an abstract structure graph.")
+    cache = None
+    selected_planner = None
+    if selection_cache_dir is not None:
+        cache = selection_cache.SelectionCache(selection_cache_dir, selection_cache_size)
+        model_files = selection_pipeline.get_model_files(base_dir, image_from_lifted_task)
+        task_key, selected_planner = lookup_cached_selection(
+            cache, selection_cache.get_task_key, domain, problem, image_from_lifted_task, model_files)
 
-    print_highlighted_line("Selecting planner from learned model...")
-    selected_planner = select_planner_from_model(base_dir, pwd, graph_file, image_from_lifted_task)
-    if selected_planner is None:
-        print_highlighted_line("Image creation or selection from model failed, using fallback planner!")
-        return False
+    if selected_planner is not None:
+        print_highlighted_line("Using the planner selected for this task before.")
+    elif in_process_selection:
+        print_highlighted_line("Computing an abstract structure graph from the " + ("lifted" if image_from_lifted_task else "grounded") + " task description...")
+        selected_planner = select_planner_in_process(base_dir, pwd, domain, problem, image_from_lifted_task, selector_socket, streaming_image_creation, cache, graph_template_dir)
+        if selected_planner is None:
+            print_highlighted_line("Graph or image creation or selection from model failed, using fallback planner!")
+            return False
+        else:
+            print_highlighted_line("Done selecting planner from learned model.")
     else:
-        print_highlighted_line("Done selecting planner from learned model.")
+        print_highlighted_line("Computing an abstract structure graph from the " + ("lifted" if image_from_lifted_task else "grounded") + " task description...")
+        graph_file = compute_graph_for_task(base_dir, pwd, domain, problem, image_from_lifted_task, graph_template_dir)
+        if graph_file is None:
+            print_highlighted_line("Computing abstract structure graph failed, using fallback planner!")
+            return False
+        else:
+            print_highlighted_line("Done computing an abstract structure graph.")
+
+        print_highlighted_line("Selecting planner from learned model...")
+        selected_planner = select_planner_from_model(base_dir, pwd, graph_file, image_from_lifted_task, selector_socket, streaming_image_creation, cache)
+        if selected_planner is None:
+            print_highlighted_line("Image creation or selection from model failed, using fallback planner!")
+            return False
+        else:
+            print_highlighted_line("Done selecting planner from learned model.")
+    if cache is not None and task_key is not None:
+        store_selection(cache, task_key, selected_planner, {})
 
     print_highlighted_line("Running the selected planner...")
     # Uncomment the following line for testing running symba.
     # selected_planner = 'seq-opt-symba-1'
-    run_planner(base_dir, selected_planner)
+    run_planner(base_dir, selected_planner, speculation, deadline, pwd)
     print_highlighted_line("Done running the selected planner.")
     # Consider any non-crashed planner run as succesful.
     return True
@@ -165,8 +404,53 @@ if __name__ == "__main__":
         "--image-from-grounded-task", action="store_true",
         help="If true, create the PDG-style graph based on the grounded SAS "
         "task and then create an image from it.")
+    parser.add_argument(
+        "--in-process-selection", action="store_true",
+        help="If true, compute the graph, the image and the prediction of "
+        "the learned model within this process instead of calling a separate "
+        "Python script for each step.")
+    parser.add_argument(
+        "--selector-socket",
+        help="Unix domain socket of a running selector-daemon.py. If given, "
+        "the planner is selected by the daemon, which has the learned models "
+        "already loaded. If the daemon is not available, the model is loaded "
+        "in-process.")
+    parser.add_argument(
+        "--no-streaming-image-creation", action="store_false",
+        dest="streaming_image_creation",
+        help="If given, create the image in the original size of the graph "
+        "and resize it to 128x128. By default, the 128x128 image is computed "
+        "directly from the graph, which needs much less memory for large "
+        "graphs.")
+    parser.add_argument(
+        "--selection-cache",
+        help="Directory of a cache of planner selections, which can be shared "
+        "by concurrent runs. Tasks that only differ in comments, whitespace "
+        "and case, or that lead to the same graph, reuse the selection.")
+    parser.add_argument(
+        "--selection-cache-size", type=int, default=selection_cache.DEFAULT_MAX_SIZE // (1024 * 1024),
+        help="Maximal size of the selection cache in MiB (default: %(default)s). "
+        "The least recently used selections are removed first.")
+    parser.add_argument(
+        "--speculative-translation", action="store_true",
+        help="If true, translate the task and preprocess it with the h2 "
+        "preprocessor while selecting the planner, so that the selected "
+        "planner can start directly with the search.")
+    parser.add_argument(
+        "--graph-template-dir",
+        help="Directory in which the parts of the abstract structure graph of "
+        "the lifted task that only depend on the domain are stored, so that "
+        "only the parts of the problem need to be computed for further "
+        "problems of the same domain. Can be shared by concurrent runs.")
+    parser.add_argument(
+        "--time-limit", type=int,
+        help="Wall-clock time limit in seconds for the whole run. The selected "
+        "planner gets the time that remains after the selection.")
 
     args = parser.parse_args()
+    deadline = None
+    if args.time_limit is not None:
+        deadline = time.time() + args.time_limit
     domain = args.domain_file
     problem = args.problem_file
     plan = args.plan_file
@@ -175,9 +459,15 @@ if __name__ == "__main__":
     if (image_from_lifted_task and image_from_grounded_task) or (not image_from_lifted_task and not image_from_grounded_task):
         sys.exit("Please use exactly one of --image-from-lifted-task and --image-from-grounded-task")
 
-    success = determine_and_run_planner(domain, problem, plan, image_from_lifted_task)
+    base_dir = get_base_dir()
+    speculation = None
+    if args.speculative_translation:
+        speculation = speculative_translation.SpeculativeTranslation(
+            base_dir, domain, problem, os.path.join(os.getcwd(), SPECULATIVE_TRANSLATION_DIR))
+        speculation.start()
+
+    success = determine_and_run_planner(domain, problem, plan, image_from_lifted_task, args.in_process_selection, args.selector_socket, args.streaming_image_creation, args.selection_cache, args.selection_cache_size * 1024 * 1024, speculation, deadline, args.graph_template_dir)
     if not success:
         print_highlighted_line("Running fallback planner...")
-        base_dir = get_base_dir()
-        run_planner(base_dir, 'fallback')
+        run_planner(base_dir, 'fallback', speculation, deadline, os.getcwd())
         print_highlighted_line("Done running fallback planner.")
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""On-disk cache of planner selections.
+
+Entries are stored under a key that is the hash of the inputs that determine
+the selection: either the normalized PDDL domain and problem (see
+get_task_key) or the abstract structure graph itself (see get_graph_key),
+together with the model used for the selection. An entry consists of the
+selected algorithm and, optionally, the graph file and the image it was
+selected for.
+
+The cache can be shared by many planner processes. Entries are written to a
+temporary directory and then atomically renamed into place, so readers never
+see incomplete entries. When the cache grows beyond its size limit, the
+least recently used entries are removed (under a lock file, so that only one
+process evicts at a time).
+"""
+
+import errno
+import fcntl
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+
+import graph_image
+
+## Change this whenever the selection for the same input can change, e.g.,
+## when changing the way graphs or images are created.
+CACHE_FORMAT_VERSION = '1'
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024 # bytes
+ALGORITHM_FILE = 'algorithm'
+PDDL_TOKEN_REGEX = re.compile(r'[()]|[^\s()]+')
+
+
+def normalize_pddl(text):
+    """Return the PDDL text without comments and with a single space
+    between tokens. PDDL is case-insensitive, so we also lower-case it."""
+    text = re.sub(r';[^\n]*', '', text.lower())
+    return ' '.join(PDDL_TOKEN_REGEX.findall(text))
+
+
+def _read_pddl(filename):
+    with io.open(filename, encoding='latin-1') as f:
+        return normalize_pddl(f.read())
+
+
+def _get_model_fingerprint(model_files):
+    """Identify the model by the names, sizes and modification times of its
+    files, which is much cheaper than hashing the weights."""
+    parts = []
+    for filename in model_files:
+        stat = os.stat(filename)
+        parts.append('%s:%d:%d' % (os.path.abspath(filename), stat.st_size,
+                                   int(stat.st_mtime)))
+    return ','.join(parts)
+
+
+def _get_key(kind, image_from_lifted_task, model_files, data_chunks):
+    key_hash = hashlib.sha256()
+    header = '%s|%s|%s|%s|' % (
+        CACHE_FORMAT_VERSION, kind,
+        'lifted' if image_from_lifted_task else 'grounded',
+        _get_model_fingerprint(model_files))
+    key_hash.update(header.encode('utf-8'))
+    for chunk in data_chunks:
+        key_hash.update(chunk)
+        # Separate the chunks so that their boundaries are part of the key.
+        key_hash.update(b'\0')
+    return '%s-%s' % (kind, key_hash.hexdigest())
+
+
+def get_task_key(domain, problem, image_from_lifted_task, model_files):
+    """Return the key for selecting a planner for the given PDDL files. Files
+    that only differ in comments, whitespace or case get the same key."""
+    return _get_key('task', image_from_lifted_task, model_files,
+                    [_read_pddl(domain).encode('latin-1'),
+                     _read_pddl(problem).encode('latin-1')])
+
+
+def get_graph_key(graph, image_from_lifted_task, model_files):
+    """Return the key for selecting a planner for the given graph (an
+    adjacency list or graph_image.CSRGraph). The key does not depend on the
+    order in which successors are listed."""
+    sources, targets = graph_image.get_edge_arrays(graph)
+    order = np.lexsort((targets, sources))
+    edges = np.stack((sources[order], targets[order])).astype('<i8')
+    return _get_key('graph', image_from_lifted_task, model_files,
+                    [str(len(graph)).encode('ascii'), edges.tobytes()])
+
+
+def get_graph_file_key(graph_file, image_from_lifted_task, model_files):
+    return get_graph_key(graph_image.read_graph(graph_file),
+                         image_from_lifted_task, model_files)
+
+
+def _remove_tree(path):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class SelectionCache(object):
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.entries_dir = os.path.join(cache_dir, 'entries')
+        self.tmp_dir = os.path.join(cache_dir, 'tmp')
+        self.lock_file = os.path.join(cache_dir, 'lock')
+        for directory in [self.entries_dir, self.tmp_dir]:
+            try:
+                os.makedirs(directory)
+            except OSError as err:
+                if err.errno != errno.EEXIST:
+                    raise
+
+    def _get_entry_dir(self, key):
+        return os.path.join(self.entries_dir, key)
+
+    def lookup(self, key):
+        """Return the algorithm stored for the key, or None if there is no
+        such entry. Marks the entry as recently used."""
+        algorithm_file = os.path.join(self._get_entry_dir(key), ALGORITHM_FILE)
+        try:
+            with open(algorithm_file) as f:
+                algorithm = f.read().strip()
+            os.utime(algorithm_file, None)
+        except (IOError, OSError):
+            # No such entry, or it has just been evicted.
+            return None
+        return algorithm or None
+
+    def store(self, key, algorithm, files=None):
+        """Store the algorithm and copies of the given files (a dictionary
+        mapping names in the entry to paths) for the key. If there already is
+        an entry for the key, it is kept."""
+        tmp_entry_dir = tempfile.mkdtemp(dir=self.tmp_dir)
+        try:
+            for name, path in (files or {}).items():
+                shutil.copyfile(path, os.path.join(tmp_entry_dir, name))
+            with open(os.path.join(tmp_entry_dir, ALGORITHM_FILE), 'w') as f:
+                f.write(algorithm + '\n')
+            try:
+                os.rename(tmp_entry_dir, self._get_entry_dir(key))
+            except OSError:
+                # Another process has stored an entry for the key meanwhile.
+                _remove_tree(tmp_entry_dir)
+        except:
+            _remove_tree(tmp_entry_dir)
+            raise
+        self.evict()
+
+    def _get_entries(self):
+        """Return the list of (last use, size, key) of all entries."""
+        entries = []
+        for key in os.listdir(self.entries_dir):
+            entry_dir = self._get_entry_dir(key)
+            try:
+                last_use = os.stat(os.path.join(entry_dir, ALGORITHM_FILE)).st_mtime
+                size = sum(os.path.getsize(os.path.join(entry_dir, name))
+                           for name in os.listdir(entry_dir))
+            except OSError:
+                # Evicted meanwhile.
+                continue
+            entries.append((last_use, size, key))
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache is no larger
+        than its maximal size."""
+        with open(self.lock_file, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                entries = sorted(self._get_entries())
+                total_size = sum(size for _, size, _ in entries)
+                for _, size, key in entries:
+                    if total_size <= self.max_size:
+                        break
+                    # Move the entry out of the way first, so that readers
+                    # never see partially removed entries.
+                    removed_dir = tempfile.mkdtemp(dir=self.tmp_dir)
+                    try:
+                        os.rename(self._get_entry_dir(key),
+                                  os.path.join(removed_dir, key))
+                    except OSError:
+                        pass
+                    _remove_tree(removed_dir)
+                    total_size -= size
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""In-process version of the planner selection of plan-ipc.py.
+
+The abstract structure graph, its image and the prediction of the learned
+model are computed in the current Python process and handed from one stage
+to the next as in-memory objects, instead of starting a new interpreter
+(which has to re-parse and re-normalize the PDDL task) for every stage.
+"""
+
+import contextlib
+import os
+import signal
+import sys
+
+import graph_image
+
+
+class StageTimeout(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def time_limit(seconds):
+    """Raise StageTimeout if the block does not finish within the given
+    number of (wall-clock) seconds.
+
+    This uses SIGALRM and hence only works in the main thread. Code
+    running inside of a C extension (e.g., numpy or tensorflow) is only
+    interrupted once it returns control to the interpreter."""
+    def handle_alarm(signum, frame):
+        raise StageTimeout()
+    old_handler = signal.signal(signal.SIGALRM, handle_alarm)
+    signal.alarm(seconds)
+    try:
+        yield
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, old_handler)
+
+
+def _setup_translator(base_dir, domain, problem):
+    """Make the translator modules importable and configure them as
+    plan-ipc.py calls abstract_structure_module.py.
+
+    The translator reads its configuration from the options module, which
+    parses sys.argv."""
+    translate_dir = os.path.join(base_dir, 'src', 'translate')
+    if translate_dir not in sys.path:
+        # Append rather than prepend so that we keep using our own timers.
+        sys.path.append(translate_dir)
+    argv = sys.argv
+    sys.argv = [os.path.join(translate_dir, 'abstract_structure_module.py'),
+                '--only-functions-from-initial-state', domain, problem]
+    try:
+        import options
+        options.setup()
+    finally:
+        sys.argv = argv
+
+
+def compute_abstract_structure_graph(base_dir, domain, problem,
+                                     template_dir=None):
+    """Return the abstract structure graph of the lifted task as adjacency
+    list, as read by create-image-from-graph.py from the
+    abstract-structure-graph.bin (or .txt) file written by
+    abstract_structure_module.py.
+
+    The parts of the graph that only depend on the domain are reused for
+    further problems of the same domain in this process and, if template_dir
+    is given, stored there for other processes."""
+    _setup_translator(base_dir, domain, problem)
+    import abstract_structure_module
+    import normalize
+    import options
+    import pddl_parser
+
+    task = pddl_parser.open(domain_filename=domain, task_filename=problem)
+    normalize.normalize(task)
+    graph = abstract_structure_module.create_abstract_structure_graph(
+        task, options.only_object_symmetries,
+        not options.do_not_stabilize_initial_state,
+        not options.do_not_stabilize_goal, template_dir)
+    return graph_image.drop_last_vertex_without_successors(
+        graph.get_adjacency_graph(hide_equal_predicates=True))
+
+
+def create_image(graph, target_size=128, streaming=True):
+    """Return the image used for selecting a planner, i.e., the image that
+    create-image-from-graph.py writes to graph-gs-L-bolded-cs.png."""
+    return graph_image.create_constant_size_image(
+        graph, bolded=True, shrink_ratio=3, target_size=target_size,
+        streaming=streaming)
+
+
+def get_model_files(base_dir, image_from_lifted_task):
+    if image_from_lifted_task:
+        model_subfolder = 'lifted'
+    else:
+        model_subfolder = 'grounded'
+    model_dir = os.path.join(base_dir, 'dl_model', 'models', model_subfolder)
+    return (os.path.join(model_dir, 'model.json'),
+            os.path.join(model_dir, 'model.h5'))
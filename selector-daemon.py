@@ -0,0 +1,64 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Long-running planner selection service.
+
+Loads the learned models once and then answers "image -> algorithm name"
+requests (see dl_model/service.py for the protocol), either on a Unix domain
+socket or on stdin/stdout. plan-ipc.py uses the service when called with
+--selector-socket.
+"""
+
+import argparse
+import os
+import sys
+
+from dl_model import selector
+from dl_model import service
+import selection_pipeline
+
+MODEL_NAMES = ['lifted', 'grounded']
+
+
+def get_base_dir():
+    """Assume that this script always lives in the base dir of the infrastructure."""
+    return os.path.dirname(os.path.abspath(sys.argv[0]))
+
+
+def load_models(base_dir, model_names):
+    models = {}
+    for model_name in model_names:
+        json_model, h5_model = selection_pipeline.get_model_files(
+            base_dir, model_name == 'lifted')
+        models[model_name] = selector.load_model(json_model, h5_model)
+    return models
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument(
+        "--socket",
+        help="Path of the Unix domain socket on which requests are answered.")
+    group.add_argument(
+        "--stdio", action="store_true",
+        help="Answer requests read from stdin on stdout. All other output "
+        "is written to stderr.")
+    parser.add_argument(
+        "--models", nargs="+", choices=MODEL_NAMES, default=MODEL_NAMES,
+        help="Models to load (default: %(default)s).")
+    args = parser.parse_args()
+
+    protocol_out = sys.stdout
+    if args.stdio:
+        # Keep log output (e.g. from keras) out of the protocol stream.
+        sys.stdout = sys.stderr
+
+    models = load_models(get_base_dir(), args.models)
+
+    if args.stdio:
+        service.serve(models, sys.stdin, protocol_out)
+    else:
+        print("Serving planner selection requests on {}".format(args.socket))
+        sys.stdout.flush()
+        service.serve_on_socket(models, args.socket)
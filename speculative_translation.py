@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""Translate the task (and preprocess it with the h2 preprocessor) in the
+background while plan-ipc.py selects a planner.
+
+All Fast Downward configurations that can be selected share the translator,
+and most also the h2 preprocessor. Running these steps concurrently with the
+selection lets the selected configuration start directly with the search.
+The files are written to a separate working directory, so that they do not
+interfere with the files written by the selection:
+
+    output-translated.sas  output of the translator
+    output.sas             output of the h2 preprocessor
+    speculative.log        output of the translator and preprocessor
+"""
+
+import os
+import shutil
+import signal
+import sys
+import threading
+
+if (sys.version_info > (3, 0)):
+    import subprocess
+else:
+    import subprocess32 as subprocess
+
+from driver import run_components
+
+BUILD = 'release64'
+H2_PREPROCESSOR = 'preprocess'
+TRANSLATED_TASK = 'output-translated.sas'
+PREPROCESSED_TASK = 'output.sas'
+LOG_FILE = 'speculative.log'
+
+
+class SpeculativeTranslation(object):
+    def __init__(self, base_dir, domain, problem, work_dir):
+        self.base_dir = base_dir
+        self.domain = os.path.abspath(domain)
+        self.problem = os.path.abspath(problem)
+        self.work_dir = work_dir
+        self.translated_task = None
+        self.preprocessed_task = None
+        self._translation_done = threading.Event()
+        self._lock = threading.Lock()
+        self._process = None
+        self._cancelled = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def start(self):
+        if not os.path.exists(self.work_dir):
+            os.makedirs(self.work_dir)
+        self._thread.start()
+
+    def _call(self, command, log, stdin=None):
+        """Run the command in the working directory and return its exit code
+        (None if it was cancelled)."""
+        with self._lock:
+            if self._cancelled:
+                return None
+            # Start a new session, so that we can also stop the translator
+            # started by the driver.
+            self._process = subprocess.Popen(
+                command, cwd=self.work_dir, stdin=stdin, stdout=log,
+                stderr=subprocess.STDOUT, start_new_session=True)
+        returncode = self._process.wait()
+        with self._lock:
+            self._process = None
+            if self._cancelled:
+                return None
+        return returncode
+
+    def _translate(self, log):
+        translate = [sys.executable, os.path.join(self.base_dir, 'fast-downward.py'),
+                     '--build', BUILD, '--translate', self.domain, self.problem]
+        if self._call(translate, log) != 0:
+            return False
+        translated_task = os.path.join(self.work_dir, TRANSLATED_TASK)
+        shutil.copyfile(os.path.join(self.work_dir, PREPROCESSED_TASK), translated_task)
+        self.translated_task = translated_task
+        return True
+
+    def _preprocess(self, log):
+        preprocess = run_components.get_executable(BUILD, H2_PREPROCESSOR)
+        with open(self.translated_task) as stdin:
+            if self._call([preprocess], log, stdin) == 0:
+                self.preprocessed_task = os.path.join(self.work_dir, PREPROCESSED_TASK)
+
+    def _run(self):
+        try:
+            with open(os.path.join(self.work_dir, LOG_FILE), 'w') as log:
+                try:
+                    translated = self._translate(log)
+                finally:
+                    self._translation_done.set()
+                if translated:
+                    self._preprocess(log)
+        except (IOError, OSError):
+            # E.g., no such build. We then translate after the selection.
+            pass
+
+    def get_task(self, use_h2_preprocessor, timeout=None):
+        """Wait at most timeout seconds (forever if None) for the task to be
+        translated (and preprocessed, if use_h2_preprocessor is true) and
+        return the path of the resulting file, or None if it is not
+        available."""
+        if use_h2_preprocessor:
+            self._thread.join(timeout)
+            return self.preprocessed_task
+        self._translation_done.wait(timeout)
+        return self.translated_task
+
+    def cancel(self):
+        """Stop the translator or preprocessor if it is still running."""
+        with self._lock:
+            self._cancelled = True
+            if self._process is not None:
+                try:
+                    os.killpg(self._process.pid, signal.SIGKILL)
+                except OSError:
+                    # The process has already terminated.
+                    pass
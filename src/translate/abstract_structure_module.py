@@ -3,9 +3,24 @@
 
 import pddl
 
+import array
+import errno
+import hashlib
 import os
+import struct
 import sys
 
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+try:
+    # Python 2
+    from StringIO import StringIO
+except ImportError:
+    # Python 3
+    from io import StringIO
+
 import normalize
 import options
 import pddl_parser
@@ -14,30 +29,73 @@ import timers
 # HACK
 GLOBAL_COLOR_COUNT = -1
 
+# Binary graph files start with a header consisting of the magic string, the
+# format version, the number of vertices and the number of edges, followed by
+# the offsets and targets of the graph in compressed sparse row format, all
+# little-endian int32. Must match the format read by graph_image.py.
+BINARY_GRAPH_MAGIC = b'CSRG'
+BINARY_GRAPH_VERSION = 1
+BINARY_GRAPH_HEADER_FORMAT = '<4siii'
+
+# Change this whenever the domain graphs written by DomainGraphCache change.
+DOMAIN_GRAPH_CACHE_VERSION = 1
+
 class AbstractStructureGraphCreator:
     """
     Class that collects all vertices and edges of a symmetry graph.
     On demand, it creates the pybliss module and computes the
     automorphisms.
+
+    Vertices get consecutive integer ids in the order in which they are
+    added, and the successors of every vertex are stored as a list of ids,
+    so that the graph can be exported in time linear in its size.
     """
     def __init__(self, only_object_symmetries):
-        self.vertex_to_color = {}
+        self.vertex_to_id = {}
+        self.vertices = []
+        self.colors = []
+        self.successors = []
+        # Pairs of vertex ids, used to ignore duplicate edges.
         self.edges = set()
         # To exclude "="-predicates and all related nodes from dot output
         self.excluded_vertices = set()
         self.only_object_symmetries = only_object_symmetries
+        # See start_problem.
+        self.num_domain_vertices = None
+        self.num_problem_successors = None
+
+    def copy(self):
+        result = AbstractStructureGraphCreator(self.only_object_symmetries)
+        result.vertex_to_id = dict(self.vertex_to_id)
+        result.vertices = list(self.vertices)
+        result.colors = list(self.colors)
+        result.successors = [list(successors) for successors in self.successors]
+        result.edges = set(self.edges)
+        result.excluded_vertices = set(self.excluded_vertices)
+        return result
+
+    def start_problem(self):
+        """Start adding the vertices and edges that depend on the problem
+        (objects, initial state and goal), after those of the domain.
+
+        Edges that start in a vertex of the domain are placed before the
+        edges of the domain that start in the same vertex. The successors
+        are then in the same order as if the problem had been added first,
+        which the graph was originally built in."""
+        self.num_domain_vertices = len(self.vertices)
+        self.num_problem_successors = [0] * self.num_domain_vertices
 
     def get_color(self, vertex):
-        return self.vertex_to_color[vertex]
+        return self.colors[self.vertex_to_id[vertex]]
 
     def add_vertex(self, vertex, color, exclude=False):
         vertex = tuple(vertex)
         # Do nothing if the vertex has already been added
-        if vertex in self.vertex_to_color:
+        if vertex in self.vertex_to_id:
             if not self.only_object_symmetries:
                 # This test potentially fails when using object symmetries,
                 # because the color manually gets overwritten.
-                assert color == self.vertex_to_color[vertex]
+                assert color == self.get_color(vertex)
             return
 
         # Update color to a unique number if using object symmetries and not adding an object node
@@ -48,27 +106,88 @@ class AbstractStructureGraphCreator:
             GLOBAL_COLOR_COUNT += 1
 
         # Add the vertex
-        self.vertex_to_color[vertex] = color
+        self.vertex_to_id[vertex] = len(self.vertices)
+        self.vertices.append(vertex)
+        self.colors.append(color)
+        self.successors.append([])
         if exclude:
             self.excluded_vertices.add(vertex)
 
     def add_edge(self, vertex1, vertex2):
         assert (vertex1 != vertex2) # we do not support self-loops
-        assert vertex1 in self.vertex_to_color
-        assert vertex2 in self.vertex_to_color
-        self.edges.add((vertex1, vertex2))
+        assert vertex1 in self.vertex_to_id
+        assert vertex2 in self.vertex_to_id
+        edge = (self.vertex_to_id[vertex1], self.vertex_to_id[vertex2])
+        if edge not in self.edges:
+            self.edges.add(edge)
+            source = edge[0]
+            if (self.num_domain_vertices is not None and
+                    source < self.num_domain_vertices):
+                self.successors[source].insert(
+                    self.num_problem_successors[source], edge[1])
+                self.num_problem_successors[source] += 1
+            else:
+                self.successors[source].append(edge[1])
 
     def get_vertices(self):
-        return sorted(self.vertex_to_color.keys())
+        return sorted(self.vertices)
 
     def get_successors(self, vertex):
-        successors = []
-        for edge in self.edges:
-            assert type(edge) is tuple
-            assert len(edge) == 2
-            if edge[0] == vertex:
-                successors.append(edge[1])
-        return successors
+        return [self.vertices[succ_id]
+                for succ_id in self.successors[self.vertex_to_id[vertex]]]
+
+    def get_export_order(self, hide_excluded=False):
+        """Return the ids of the exported vertices, sorted by vertex (the
+        order in which get_vertices() returns them), and a list mapping
+        every vertex id to its index in that order (None for vertices that
+        are not exported)."""
+        ids = sorted(range(len(self.vertices)), key=self.vertices.__getitem__)
+        if hide_excluded:
+            ids = [vertex_id for vertex_id in ids
+                   if self.vertices[vertex_id] not in self.excluded_vertices]
+        indices = [None] * len(self.vertices)
+        for index, vertex_id in enumerate(ids):
+            indices[vertex_id] = index
+        return ids, indices
+
+    def get_adjacency_graph(self, hide_excluded=False):
+        """Return the graph as adjacency list: for every exported vertex (in
+        the order of get_vertices()), the list of indices of its successors."""
+        ids, indices = self.get_export_order(hide_excluded)
+        adjacency_graph = []
+        for vertex_id in ids:
+            successors = [indices[succ_id]
+                          for succ_id in self.successors[vertex_id]]
+            if hide_excluded:
+                successors = [succ for succ in successors if succ is not None]
+            adjacency_graph.append(successors)
+        return adjacency_graph
+
+    def write_adjacency_graph(self, file, hide_excluded=False):
+        """Write the adjacency list into a file, one line with the
+        comma-separated successors per vertex."""
+        adjacency_graph = self.get_adjacency_graph(hide_excluded)
+        file.write('\n'.join(','.join(str(succ) for succ in successors)
+                             for successors in adjacency_graph))
+
+    def write_binary_adjacency_graph(self, file, hide_excluded=False):
+        """Write the adjacency list into a file (opened in binary mode) in the
+        binary graph format (see BINARY_GRAPH_HEADER_FORMAT)."""
+        adjacency_graph = self.get_adjacency_graph(hide_excluded)
+        offsets = array.array('i', [0])
+        targets = array.array('i')
+        assert offsets.itemsize == 4
+        for successors in adjacency_graph:
+            targets.extend(successors)
+            offsets.append(len(targets))
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+            targets.byteswap()
+        file.write(struct.pack(BINARY_GRAPH_HEADER_FORMAT, BINARY_GRAPH_MAGIC,
+                               BINARY_GRAPH_VERSION, len(adjacency_graph),
+                               len(targets)))
+        offsets.tofile(file)
+        targets.tofile(file)
 
 class NodeType:
     """Used by AbstractStructureGraph to make nodes of different types distinguishable."""
@@ -89,11 +208,18 @@ class Color:
     function = None # will be set by Symmetry Graph
     number = None # will be set by Symmetry Graph
 
-class AbstractStructureGraph:
-    def __init__(self, task, only_object_symmetries, stabilize_initial_state, stabilize_goal):
+class DomainGraph:
+    """
+    The part of the abstract structure graph that only depends on the
+    domain, i.e., the nodes of the predicates, functions, operators and
+    axioms of the normalized task, and of the constants they mention.
+
+    The domain graph can be shared by all problems of the domain (see
+    DomainGraphCache). AbstractStructureGraph extends a copy of it with the
+    objects, the initial state and the goal of a problem.
+    """
+    def __init__(self, task, only_object_symmetries):
         self.only_object_symmetries = only_object_symmetries
-        self.stabilize_initial_state = stabilize_initial_state
-        self.stabilize_goal = stabilize_goal
         self.graph = AbstractStructureGraphCreator(only_object_symmetries)
         self.numbers = set()
         self.constant_functions = dict()
@@ -107,31 +233,32 @@ class AbstractStructureGraph:
         Color.number = Color.function + self.max_function_arity + 1
         self.type_dict = dict((type.name, type) for type in task.types)
 
-        if not self.stabilize_initial_state:
-            #task_predicate_names = set([predicate.name for predicate in task.predicates])
-            self.fluent_predicates = set()
-            for action in task.actions:
-                for effect in action.effects:
-                    self.fluent_predicates.add(effect.literal.predicate)
-            for axiom in task.axioms:
-                self.fluent_predicates.add(axiom.name)
-            #assert self.fluent_predicates.issubset(task_predicate_names)
-            #self.static_predicates = task_predicate_names.difference(self.fluent_predicates)
+        # Only used for the initial state if it is not stabilized.
+        #task_predicate_names = set([predicate.name for predicate in task.predicates])
+        self.fluent_predicates = set()
+        for action in task.actions:
+            for effect in action.effects:
+                self.fluent_predicates.add(effect.literal.predicate)
+        for axiom in task.axioms:
+            self.fluent_predicates.add(axiom.name)
+        #assert self.fluent_predicates.issubset(task_predicate_names)
+        #self.static_predicates = task_predicate_names.difference(self.fluent_predicates)
 
         if self.only_object_symmetries:
             # TODO: are there planning tasks with numbers larger than that?
             global GLOBAL_COLOR_COUNT
             GLOBAL_COLOR_COUNT = Color.number + 10000
 
-        self._add_objects(task)
         self._add_predicates(task)
         self._add_functions(task)
-        self._add_init(task)
-        if self.stabilize_goal:
-            self._add_goal(task)
         self._add_operators(task)
         self._add_axioms(task)
 
+        # Needed to continue with the same colors for the problem.
+        self.color_values = (Color.derived_predicate, Color.function,
+                             Color.number)
+        self.global_color_count = GLOBAL_COLOR_COUNT
+
     def _get_number_node(self, no):
         node = (NodeType.number, no)
         if no not in self.numbers:
@@ -142,6 +269,13 @@ class AbstractStructureGraph:
     def _get_obj_node(self, obj_name):
         return (NodeType.constant, obj_name)
 
+    def _add_obj_node(self, obj_name):
+        # The constants of the domain are added with the operators and
+        # axioms that mention them, all other objects with the problem.
+        obj_node = self._get_obj_node(obj_name)
+        self.graph.add_vertex(obj_node, Color.constant)
+        return obj_node
+
     def _get_pred_node(self, pred_name):
         return (NodeType.predicate, pred_name)
 
@@ -163,14 +297,6 @@ class AbstractStructureGraph:
     def _get_mutex_group_node(self, id_indices):
         return (NodeType.mutex_group, id_indices)
 
-    def _add_objects(self, task):
-        """Add a node for each object of the task.
-
-        All nodes have color Color.constant.
-        """
-        for o in task.objects:
-            self.graph.add_vertex(self._get_obj_node(o.name), Color.constant)
-
     def _add_predicates(self, task):
         """Add nodes for each declared predicate and type predicate.
 
@@ -233,7 +359,7 @@ class AbstractStructureGraph:
                 else:
                     assert(False)
             else:
-                self.graph.add_edge(self._get_obj_node(arg), arg_node)
+                self.graph.add_edge(self._add_obj_node(arg), arg_node)
             prev_node = arg_node
         return first_node, prev_node
 
@@ -265,56 +391,10 @@ class AbstractStructureGraph:
                 else:
                     assert(False)
             else:
-                self.graph.add_edge(self._get_obj_node(arg), arg_node)
+                self.graph.add_edge(self._add_obj_node(arg), arg_node)
             prev_node = arg_node
         return first_node
 
-    def _add_init(self, task):
-        def get_key(init_entry):
-            if isinstance(init_entry, pddl.Literal):
-                return init_entry.key
-            elif isinstance(init_entry, pddl.Assign):
-                return str(init_entry)
-            else:
-                assert False
-        assert isinstance(task.init, list)
-        init = sorted(task.init, key=get_key)
-        for no, entry in enumerate(init):
-            if isinstance(entry, pddl.Literal):
-                if options.only_functions_from_initial_state:
-                    continue
-                if self.stabilize_initial_state or entry.predicate not in self.fluent_predicates:
-                    self._add_literal(NodeType.init, Color.init, entry, (no,))
-            else: # numeric function
-                assert(isinstance(entry, pddl.Assign))
-                assert(isinstance(entry.fluent, pddl.PrimitiveNumericExpression))
-                assert(isinstance(entry.expression, pddl.NumericConstant))
-                if entry.fluent.symbol == "total-cost":
-                    continue
-                first, last = self._add_pne(NodeType.init, Color.init, entry.fluent, (no,))
-                num_node = self._get_number_node(entry.expression.value)
-                self.graph.add_edge(last, num_node)
-
-        if not options.only_functions_from_initial_state:
-            # add types
-            counter = len(init)
-            for o in task.objects:
-                the_type = self.type_dict[o.type_name]
-                while the_type.name != "object":
-                    literal = pddl.Atom(the_type.get_predicate_name(), (o.name,))
-                    self._add_literal(NodeType.init, Color.init, literal, (counter,))
-                    counter += 1
-                    the_type = self.type_dict[the_type.basetype_name]
-
-    def _add_goal(self, task):
-        if isinstance(task.goal, pddl.Literal):
-            self._add_literal(NodeType.goal, Color.goal, task.goal, (0,))
-        elif isinstance(task.goal, pddl.Conjunction):
-            for no, fact in enumerate(task.goal.parts):
-                self._add_literal(NodeType.goal, Color.goal, fact, (no,))
-        else:
-            assert isinstance(task.goal, pddl.Truth)
-
     def _add_condition(self, node_type, color, literal, id_indices,
                        base_node, op_args,
                        eff_args):
@@ -465,10 +545,110 @@ class AbstractStructureGraph:
                     else:
                         assert(False)
                 else:
-                    self.graph.add_edge(self._get_obj_node(arg), arg_node)
+                    self.graph.add_edge(self._add_obj_node(arg), arg_node)
                 prev_node = arg_node
 
 
+class AbstractStructureGraph(DomainGraph):
+    def __init__(self, task, only_object_symmetries, stabilize_initial_state,
+                 stabilize_goal, domain_graph=None):
+        """Create the graph of the task by extending a copy of the domain
+        graph of the task (see DomainGraphCache), or of a new one if none
+        is given."""
+        if domain_graph is None:
+            domain_graph = DomainGraph(task, only_object_symmetries)
+        assert domain_graph.only_object_symmetries == only_object_symmetries
+        self.only_object_symmetries = only_object_symmetries
+        self.stabilize_initial_state = stabilize_initial_state
+        self.stabilize_goal = stabilize_goal
+        self.graph = domain_graph.graph.copy()
+        self.numbers = set(domain_graph.numbers)
+        self.constant_functions = dict(domain_graph.constant_functions)
+        self.max_predicate_arity = domain_graph.max_predicate_arity
+        self.max_function_arity = domain_graph.max_function_arity
+        (Color.derived_predicate, Color.function,
+         Color.number) = domain_graph.color_values
+        self.type_dict = domain_graph.type_dict
+        self.fluent_predicates = domain_graph.fluent_predicates
+        if self.only_object_symmetries:
+            global GLOBAL_COLOR_COUNT
+            GLOBAL_COLOR_COUNT = domain_graph.global_color_count
+
+        self.graph.start_problem()
+        self._add_objects(task)
+        self._add_init(task)
+        if self.stabilize_goal:
+            self._add_goal(task)
+
+    def _add_objects(self, task):
+        """Add a node for each object of the task.
+
+        All nodes have color Color.constant.
+        """
+        for o in task.objects:
+            self.graph.add_vertex(self._get_obj_node(o.name), Color.constant)
+
+    def _add_init(self, task):
+        def get_key(init_entry):
+            if isinstance(init_entry, pddl.Literal):
+                return init_entry.key
+            elif isinstance(init_entry, pddl.Assign):
+                return str(init_entry)
+            else:
+                assert False
+        assert isinstance(task.init, list)
+        init = sorted(task.init, key=get_key)
+        for no, entry in enumerate(init):
+            if isinstance(entry, pddl.Literal):
+                if options.only_functions_from_initial_state:
+                    continue
+                if self.stabilize_initial_state or entry.predicate not in self.fluent_predicates:
+                    self._add_literal(NodeType.init, Color.init, entry, (no,))
+            else: # numeric function
+                assert(isinstance(entry, pddl.Assign))
+                assert(isinstance(entry.fluent, pddl.PrimitiveNumericExpression))
+                assert(isinstance(entry.expression, pddl.NumericConstant))
+                if entry.fluent.symbol == "total-cost":
+                    continue
+                first, last = self._add_pne(NodeType.init, Color.init, entry.fluent, (no,))
+                num_node = self._get_number_node(entry.expression.value)
+                self.graph.add_edge(last, num_node)
+
+        if not options.only_functions_from_initial_state:
+            # add types
+            counter = len(init)
+            for o in task.objects:
+                the_type = self.type_dict[o.type_name]
+                while the_type.name != "object":
+                    literal = pddl.Atom(the_type.get_predicate_name(), (o.name,))
+                    self._add_literal(NodeType.init, Color.init, literal, (counter,))
+                    counter += 1
+                    the_type = self.type_dict[the_type.basetype_name]
+
+    def _add_goal(self, task):
+        if isinstance(task.goal, pddl.Literal):
+            self._add_literal(NodeType.goal, Color.goal, task.goal, (0,))
+        elif isinstance(task.goal, pddl.Conjunction):
+            for no, fact in enumerate(task.goal.parts):
+                self._add_literal(NodeType.goal, Color.goal, fact, (no,))
+        else:
+            assert isinstance(task.goal, pddl.Truth)
+
+    def get_adjacency_graph(self, hide_equal_predicates=False):
+        """Return the graph as adjacency list: for every vertex (in the order
+        of get_vertices()), the list of indices of its successors."""
+        return self.graph.get_adjacency_graph(hide_equal_predicates)
+
+    def write_adjacency_graph(self, file, hide_equal_predicates=False):
+        """Write the graph into a file in the format read by
+        create-image-from-graph.py."""
+        self.graph.write_adjacency_graph(file, hide_equal_predicates)
+
+    def write_binary_adjacency_graph(self, file, hide_equal_predicates=False):
+        """Write the graph into a file (opened in binary mode) in the binary
+        graph format read by create-image-from-graph.py."""
+        self.graph.write_binary_adjacency_graph(file, hide_equal_predicates)
+
     def write_dot_graph(self, file, hide_equal_predicates=False):
         """Write the graph into a file in the graphviz dot format."""
         def dot_label(node):
@@ -513,10 +693,10 @@ class AbstractStructureGraph:
         file.write("digraph g {\n")
         if hide_equal_predicates:
             file.write("\"extra\" [style=filled, fillcolor=red, label=\"Warning: hidden =-predicates\"];\n")
-        for vertex in self.graph.get_vertices():
-            if hide_equal_predicates and vertex in self.graph.excluded_vertices:
-                continue
-            color = self.graph.get_color(vertex)
+        ids, indices = self.graph.get_export_order(hide_equal_predicates)
+        for vertex_id in ids:
+            vertex = self.graph.vertices[vertex_id]
+            color = self.graph.colors[vertex_id]
             if self.only_object_symmetries and color not in [Color.constant, Color.init, Color.goal]:
                 dot_color_scheme = "X11"
                 dot_color = "red"
@@ -525,15 +705,145 @@ class AbstractStructureGraph:
                 dot_color = colors[color][1]
             file.write("\"%s\" [style=filled, label=\"%s\", colorscheme=%s, fillcolor=%s];\n" %
                 (vertex, dot_label(vertex), dot_color_scheme, dot_color))
-        for vertex in self.graph.get_vertices():
-            if hide_equal_predicates and vertex in self.graph.excluded_vertices:
-                continue
-            for succ in self.graph.get_successors(vertex):
-                if hide_equal_predicates and succ in self.graph.excluded_vertices:
+        for vertex_id in ids:
+            vertex = self.graph.vertices[vertex_id]
+            for succ_id in self.graph.successors[vertex_id]:
+                if indices[succ_id] is None:
                     continue
-                file.write("\"%s\" -> \"%s\";\n" % (vertex, succ))
+                file.write("\"%s\" -> \"%s\";\n" % (vertex, self.graph.vertices[succ_id]))
         file.write("}\n")
 
+def _dump_domain(task):
+    """Return a description of the parts of the normalized task that the
+    domain graph depends on."""
+    output = StringIO()
+    for type in task.types:
+        output.write("%r\n" % type)
+    for predicate in task.predicates:
+        output.write("%s\n" % predicate)
+    for function in task.functions:
+        output.write("%s: %s\n" % (function, function.type_name))
+    stdout = sys.stdout
+    sys.stdout = output
+    try:
+        for action in task.actions:
+            action.dump()
+        for axiom in task.axioms:
+            # Axiom.dump only shows the external parameters.
+            output.write("%s\n" % ", ".join(map(str, axiom.parameters)))
+            axiom.dump()
+    finally:
+        sys.stdout = stdout
+    return output.getvalue()
+
+def get_domain_key(task, only_object_symmetries):
+    """Return the key of the domain graph of the normalized task. Tasks of
+    the same domain usually share the key, unless normalizing the goal
+    adds axioms."""
+    digest = hashlib.sha1()
+    digest.update(("%d %d.%d %d\n" % (
+        DOMAIN_GRAPH_CACHE_VERSION, sys.version_info[0], sys.version_info[1],
+        only_object_symmetries)).encode())
+    source_file = os.path.splitext(os.path.abspath(__file__))[0] + ".py"
+    with open(source_file, "rb") as f:
+        digest.update(f.read())
+    digest.update(_dump_domain(task).encode("utf-8"))
+    return digest.hexdigest()
+
+class DomainGraphCache:
+    """
+    Domain graphs of the tasks, kept in memory and, if a directory is
+    given, also on disk, so that the graphs of further problems of the same
+    domain only need to add the objects, the initial state and the goal.
+
+    The files in the directory can be shared by concurrent processes. They
+    are never removed automatically.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.domain_graphs = {}
+
+    def _get_filename(self, key):
+        return os.path.join(self.directory, "domain-graph-%s.pickle" % key)
+
+    def _load(self, key):
+        filename = self._get_filename(key)
+        if not os.path.exists(filename):
+            return None
+        try:
+            with open(filename, "rb") as f:
+                return pickle.load(f)
+        except (EnvironmentError, EOFError, pickle.UnpicklingError,
+                AttributeError, ImportError):
+            return None
+
+    def _save(self, key, domain_graph):
+        filename = self._get_filename(key)
+        try:
+            os.makedirs(self.directory)
+        except OSError as err:
+            if err.errno != errno.EEXIST:
+                raise
+        # Write to a temporary file first, so that concurrent processes
+        # never read incomplete files.
+        tmp_filename = "%s.tmp-%d" % (filename, os.getpid())
+        with open(tmp_filename, "wb") as f:
+            pickle.dump(domain_graph, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_filename, filename)
+
+    def get(self, task, only_object_symmetries):
+        """Return the domain graph of the normalized task."""
+        key = get_domain_key(task, only_object_symmetries)
+        domain_graph = self.domain_graphs.get(key)
+        if domain_graph is None and self.directory is not None:
+            with timers.timing("Loading domain graph"):
+                domain_graph = self._load(key)
+        if domain_graph is None:
+            with timers.timing("Creating domain graph"):
+                domain_graph = DomainGraph(task, only_object_symmetries)
+            if self.directory is not None:
+                with timers.timing("Saving domain graph"):
+                    self._save(key, domain_graph)
+        self.domain_graphs[key] = domain_graph
+        return domain_graph
+
+_domain_graph_caches = {}
+
+def get_domain_graph_cache(directory=None):
+    """Return the domain graph cache for the directory, which is kept for
+    the lifetime of the process."""
+    cache = _domain_graph_caches.get(directory)
+    if cache is None:
+        cache = DomainGraphCache(directory)
+        _domain_graph_caches[directory] = cache
+    return cache
+
+def create_abstract_structure_graph(task, only_object_symmetries,
+                                    stabilize_initial_state, stabilize_goal,
+                                    template_dir=None):
+    """Create the graph of the normalized task, reusing the domain graphs
+    created before in this process or stored in template_dir."""
+    domain_graph = get_domain_graph_cache(template_dir).get(
+        task, only_object_symmetries)
+    return AbstractStructureGraph(task, only_object_symmetries,
+                                  stabilize_initial_state, stabilize_goal,
+                                  domain_graph)
+
+def write_graph_file(graph, hide_equal_predicates=False):
+    """Write the graph to abstract-structure-graph.bin or, with
+    --abstract-structure-graph-text, to abstract-structure-graph.txt, and
+    return the name of the written file."""
+    if options.abstract_structure_graph_text:
+        filename = 'abstract-structure-graph.txt'
+        f = open(filename, 'w')
+        graph.write_adjacency_graph(f, hide_equal_predicates)
+    else:
+        filename = 'abstract-structure-graph.bin'
+        f = open(filename, 'wb')
+        graph.write_binary_adjacency_graph(f, hide_equal_predicates)
+    f.close()
+    return filename
+
 if __name__ == "__main__":
     timer = timers.Timer()
 
@@ -550,34 +860,12 @@ if __name__ == "__main__":
     #print("Dumping task..")
     #task.dump()
     with timers.timing("Creating abstract structure graph..", True):
-        graph = AbstractStructureGraph(task, only_object_symmetries, stabilize_initial_state, stabilize_goal)
+        graph = create_abstract_structure_graph(
+            task, only_object_symmetries, stabilize_initial_state,
+            stabilize_goal, options.abstract_structure_graph_template_dir)
         if options.dump_dot_graph:
             f = open('abstract-structure-graph.dot', 'w')
             graph.write_dot_graph(f, hide_equal_predicates=True)
             f.close()
 
-        # print("Turning graph into adjacency list representation")
-        adjacency_graph = []
-        node_counter = 0
-        vertex_indices = {}
-        for vertex in graph.graph.get_vertices():
-            if hide_equal_predicates and vertex in graph.graph.excluded_vertices:
-                continue
-            vertex_indices[vertex] = node_counter
-            adjacency_graph.append([])
-            node_counter += 1
-        for edge in graph.graph.edges:
-            assert type(edge) is tuple
-            assert len(edge) == 2
-            if edge[0] in vertex_indices and edge[1] in vertex_indices:
-                i = vertex_indices[edge[0]]
-                j = vertex_indices[edge[1]]
-                adjacency_graph[i].append(j)
-
-        def get_string(some_list):
-            return ','.join(str(elem) for elem in some_list)
-
-        f = open('abstract-structure-graph.txt', 'w')
-        lines = '\n'.join(get_string(successors) for successors in adjacency_graph)
-        f.write(lines)
-        f.close()
+        write_graph_file(graph, hide_equal_predicates)
@@ -82,6 +82,9 @@ def compute_necessary_axiom_literals(axioms_by_atom, operators, goal):
 
     # Initialize queue with axioms required for goal and operators.
     register_literals(goal, False)
+    if not axioms_by_atom:
+        # Avoid instantiating the operators (see instantiate.py) in vain.
+        return necessary_literals
     for op in operators:
         register_literals(op.precondition, False)
         for (cond, _) in op.add_effects:
@@ -7,6 +7,7 @@ import sys
 import itertools
 
 import pddl
+import profiling
 import timers
 from functools import reduce
 
@@ -298,6 +299,12 @@ class Queue:
         self.queue_pos += 1
         return result
 
+def set_model_counters(rules, relevant_atoms, auxiliary_atoms, queue):
+    profiling.set_counter("rules", len(rules))
+    profiling.set_counter("relevant atoms", relevant_atoms)
+    profiling.set_counter("auxiliary atoms", auxiliary_atoms)
+    profiling.set_counter("total queue pushes", queue.num_pushes)
+
 def compute_model(prog):
     with timers.timing("Preparing model"):
         rules = convert_rules(prog)
@@ -321,6 +328,7 @@ def compute_model(prog):
             for rule, cond_index in matches:
                 rule.update_index(next_atom, cond_index)
                 rule.fire(next_atom, cond_index, queue.push)
+        set_model_counters(rules, relevant_atoms, auxiliary_atoms, queue)
     print("%d relevant atoms" % relevant_atoms)
     print("%d auxiliary atoms" % auxiliary_atoms)
     print("%d final queue length" % len(queue.queue))
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""Checkpoints of intermediate results of the translator (option
+--checkpoint-dir).
+
+After every stage, the translator pickles its results together with the
+results of the previous stages (so that shared objects like the actions
+stay shared) into the checkpoint directory:
+
+    task        the normalized task
+    model       the relaxed model (after removing delete effects with
+                --relaxed)
+    invariants  the sorted invariants
+    groups      the fact groups, mutex groups and translation key
+
+A later run restarts after the deepest stage with a valid checkpoint. The
+key of a stage is a hash of the checkpoint format version, the Python
+version, the sources of the translator, the PDDL files and the options
+that the stage and the previous stages depend on. Options that only
+affect later steps, e.g. --keep-unimportant-variables or
+--add-implied-preconditions, can therefore be varied without recomputing
+the checkpointed stages. If invariant generation reaches its time limit,
+its result depends on the speed of the machine, so neither the invariants
+nor the groups are saved. Checkpoints are never removed automatically.
+"""
+
+from __future__ import print_function
+
+import errno
+import hashlib
+import os
+import sys
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import timers
+
+CHECKPOINT_VERSION = 1
+
+## The stages in the order of the translation, and the options that the
+## results of each stage depend on (in addition to those of the previous
+## stages).
+STAGES = [
+    ("task", []),
+    ("model", ["generate_relaxed_task"]),
+    ("invariants", ["invariant_generation_max_candidates",
+                    "invariant_generation_max_time"]),
+    ("groups", ["use_partial_encoding"]),
+]
+
+TRANSLATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIRS = [TRANSLATOR_DIR,
+               os.path.join(TRANSLATOR_DIR, "pddl"),
+               os.path.join(TRANSLATOR_DIR, "pddl_parser")]
+
+
+def _update_with_file(digest, filename):
+    with open(filename, "rb") as f:
+        digest.update(f.read())
+
+
+def get_stage_keys(domain_filename, task_filename, options):
+    """Return the dictionary mapping each stage to its key."""
+    digest = hashlib.sha1()
+    digest.update(("%d %d.%d\n" % ((CHECKPOINT_VERSION,) +
+                                   tuple(sys.version_info[:2]))).encode())
+    for source_dir in SOURCE_DIRS:
+        for filename in sorted(os.listdir(source_dir)):
+            if filename.endswith(".py"):
+                _update_with_file(digest, os.path.join(source_dir, filename))
+    _update_with_file(digest, domain_filename)
+    _update_with_file(digest, task_filename)
+    keys = {}
+    for stage, stage_options in STAGES:
+        for name in stage_options:
+            digest.update(("%s=%r\n" % (name, getattr(options, name))).encode())
+        keys[stage] = digest.hexdigest()
+    return keys
+
+
+class Checkpoints(object):
+    def __init__(self, directory, keys):
+        self.directory = directory
+        self.keys = keys
+
+    def _get_filename(self, stage):
+        return os.path.join(self.directory,
+                            "%s-%s.pickle" % (stage, self.keys[stage]))
+
+    def load(self):
+        """Return the stage and the results of the deepest stage with a
+        valid checkpoint, or (None, {}) if there is none. The results are
+        a dictionary mapping the names of the stages up to the returned
+        one to their results."""
+        for stage, _ in reversed(STAGES):
+            filename = self._get_filename(stage)
+            if not os.path.exists(filename):
+                continue
+            with timers.timing("Loading %s checkpoint" % stage):
+                try:
+                    with open(filename, "rb") as f:
+                        results = pickle.load(f)
+                except (EnvironmentError, EOFError, pickle.UnpicklingError,
+                        AttributeError, ImportError) as err:
+                    print("Ignoring invalid checkpoint %s: %s" % (filename, err))
+                    continue
+            return stage, results
+        return None, {}
+
+    def save(self, stage, results):
+        """Write the results (see load) of the stage and all previous
+        stages."""
+        filename = self._get_filename(stage)
+        try:
+            os.makedirs(self.directory)
+        except OSError as err:
+            if err.errno != errno.EEXIST:
+                raise
+        # Write to a temporary file first, so that concurrent runs never
+        # read incomplete checkpoints.
+        tmp_filename = "%s.tmp-%d" % (filename, os.getpid())
+        with timers.timing("Saving %s checkpoint" % stage):
+            with open(tmp_filename, "wb") as f:
+                pickle.dump(results, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_filename, filename)
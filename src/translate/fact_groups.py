@@ -3,6 +3,7 @@ from __future__ import print_function
 import invariant_finder
 import options
 import pddl
+import profiling
 import timers
 
 
@@ -77,6 +78,7 @@ def choose_groups(groups, reachable_facts):
         uncovered_facts.difference_update(group)
         result.append(group)
     print(len(uncovered_facts), "uncovered facts")
+    profiling.set_counter("uncovered facts", len(uncovered_facts))
     result += [[fact] for fact in uncovered_facts]
     return result
 
@@ -106,8 +108,9 @@ def collect_all_mutex_groups(groups, atoms):
 def sort_groups(groups):
     return sorted(sorted(group) for group in groups)
 
-def compute_groups(task, atoms, reachable_action_params):
-    groups = invariant_finder.get_groups(task, reachable_action_params)
+def compute_groups(task, atoms, reachable_action_params, invariants=None):
+    groups = invariant_finder.get_groups(task, reachable_action_params,
+                                         invariants)
 
     with timers.timing("Instantiating groups"):
         groups = instantiate_groups(groups, task, atoms)
@@ -1,5 +1,6 @@
 from __future__ import print_function
 
+from collections import defaultdict
 import sys
 
 import pddl
@@ -67,6 +68,126 @@ class CostMatrix(object):
                 -len(common_vars))
     def can_join(self):
         return len(self.joinees) >= 2
+    def add_projection(self, atom, source):
+        """Called for the atom of a new projection rule before it is added
+        as a joinee."""
+        pass
+    def add_join(self, atom, left, right):
+        """Called for the atom of a new join rule before it is added as a
+        joinee."""
+        pass
+
+class JoinStatistics(object):
+    """Number of facts and of distinct arguments at each position of the
+    predicates of a Datalog program, used to estimate the number of atoms
+    that a join produces.
+
+    For predicates that are derived by rules, we assume that every
+    combination of the arguments that occur in the facts is reachable
+    (or, if there are no facts, every combination of objects)."""
+    def __init__(self, prog):
+        self.num_objects = max(len(prog.objects), 1)
+        self.num_facts = defaultdict(int)
+        arguments = defaultdict(set)
+        for fact in prog.facts:
+            atom = fact.atom
+            self.num_facts[atom.predicate] += 1
+            for position, arg in enumerate(atom.args):
+                arguments[atom.predicate, position].add(arg)
+        self.num_distinct = dict((key, len(args))
+                                 for key, args in arguments.items())
+        self.derived_predicates = set(rule.effect.predicate
+                                      for rule in prog.rules)
+    def get_distinct(self, predicate, position):
+        if predicate not in self.num_facts:
+            return self.num_objects
+        return self.num_distinct[predicate, position]
+    def estimate(self, atom):
+        """Return the pair (size, distinct) of the estimated number of
+        atoms that match the symbolic atom and the dictionary mapping its
+        variables to the estimated number of their values."""
+        size = self.num_facts.get(atom.predicate, 0)
+        if atom.predicate in self.derived_predicates:
+            size = max(size, product(
+                self.get_distinct(atom.predicate, position)
+                for position in range(len(atom.args))))
+        distinct = {}
+        for position, arg in enumerate(atom.args):
+            num_values = self.get_distinct(atom.predicate, position)
+            if arg[0] == "?":
+                distinct[arg] = num_values
+            else:
+                # Only one of the values matches the constant.
+                size /= float(max(num_values, 1))
+        return cap_estimate(size, distinct)
+
+## Upper bound of the estimates, so that all costs compare smaller than the
+## initial minimum of CostMatrix.find_min_pair.
+MAX_ESTIMATE = sys.maxsize // 2
+
+def product(numbers):
+    result = 1
+    for number in numbers:
+        result *= number
+    return result
+
+def cap_estimate(size, distinct):
+    size = min(max(size, 1), MAX_ESTIMATE)
+    return size, dict((var, min(num_values, size))
+                      for var, num_values in distinct.items())
+
+def estimate_join(left, right):
+    """Estimate the size and the distinct values of the join of two
+    estimates, assuming that the values of the common variables are
+    distributed independently and uniformly."""
+    left_size, left_distinct = left
+    right_size, right_distinct = right
+    size = float(left_size) * right_size
+    distinct = dict(left_distinct)
+    for var, num_values in right_distinct.items():
+        if var in distinct:
+            size /= max(distinct[var], num_values)
+            distinct[var] = min(distinct[var], num_values)
+        else:
+            distinct[var] = num_values
+    return cap_estimate(size, distinct)
+
+def estimate_projection(estimate, variables):
+    size, distinct = estimate
+    distinct = dict((var, distinct[var]) for var in variables)
+    return cap_estimate(min(size, product(distinct.values())), distinct)
+
+class EstimatedCostMatrix(CostMatrix):
+    """Cost matrix that prefers the join with the smallest estimated
+    number of resulting atoms (see JoinStatistics) among the joins with
+    common variables. Ties are broken with the costs of CostMatrix."""
+    def __init__(self, joinees, statistics):
+        self.statistics = statistics
+        self.estimates = {}
+        CostMatrix.__init__(self, joinees)
+    def get_estimate(self, joinee):
+        estimate = self.estimates.get(joinee)
+        if estimate is None:
+            estimate = self.statistics.estimate(joinee)
+            self.estimates[joinee] = estimate
+        return estimate
+    def compute_join_cost(self, left_joinee, right_joinee):
+        # Joins without common variables (cross products) are never
+        # preferred, because build_model requires that the two conditions
+        # of a join rule share a variable.
+        left_estimate = self.get_estimate(left_joinee)
+        right_estimate = self.get_estimate(right_joinee)
+        is_cross_product = not (set(left_estimate[1]) & set(right_estimate[1]))
+        size, _ = estimate_join(left_estimate, right_estimate)
+        return (is_cross_product, size) + CostMatrix.compute_join_cost(
+            self, left_joinee, right_joinee)
+    def add_projection(self, atom, source):
+        self.estimates[atom] = estimate_projection(
+            self.get_estimate(source), atom.args)
+    def add_join(self, atom, left, right):
+        self.estimates[atom] = estimate_projection(
+            estimate_join(self.get_estimate(left), self.get_estimate(right)),
+            atom.args)
 
 class ResultList(object):
     def __init__(self, rule, name_generator):
@@ -83,9 +204,15 @@ class ResultList(object):
         self.result.append(rule)
         return rule.effect
 
-def greedy_join(rule, name_generator):
+def greedy_join(rule, name_generator, statistics=None):
+    """Split the rule into binary join rules. If statistics
+    (JoinStatistics) are given, the joins are ordered by the estimated
+    number of atoms that they produce."""
     assert len(rule.conditions) >= 2
-    cost_matrix = CostMatrix(rule.conditions)
+    if statistics is None:
+        cost_matrix = CostMatrix(rule.conditions)
+    else:
+        cost_matrix = EstimatedCostMatrix(rule.conditions, statistics)
     occurrences = OccurrencesTracker(rule)
     result = ResultList(rule, name_generator)
 
@@ -102,7 +229,9 @@ def greedy_join(rule, name_generator):
             retained_vars = joinee_vars & (effect_vars | common_vars)
             if retained_vars != joinee_vars:
                 joinees[i] = result.add_rule("project", [joinee], sorted(retained_vars))
+                cost_matrix.add_projection(joinees[i], joinee)
         joint_condition = result.add_rule("join", joinees, sorted(effect_vars))
+        cost_matrix.add_join(joint_condition, joinees[0], joinees[1])
         cost_matrix.add_entry(joint_condition)
         occurrences.update(joint_condition, +1)
 
@@ -5,6 +5,8 @@ from __future__ import print_function
 from collections import defaultdict
 
 import build_model
+import interned_model
+import options
 import pddl_to_prolog
 import pddl
 import timers
@@ -30,6 +32,33 @@ def get_objects_by_type(typed_objects, types):
             result[type].append(obj.name)
     return result
 
+class InstantiatedActions(object):
+    """Iterable over the PropositionalActions of the reachable action atoms.
+
+    The actions are instantiated whenever the object is iterated, so that
+    the consumers (in particular translate_strips_operators) only need to
+    keep one PropositionalAction in memory at a time. instantiate() only
+    returns such an object if the actions are iterated once (see there)."""
+    def __init__(self, task, action_atoms, init_facts, fluent_facts,
+                 type_to_objects):
+        self.action_atoms = action_atoms
+        self.init_facts = init_facts
+        self.fluent_facts = fluent_facts
+        self.type_to_objects = type_to_objects
+        self.use_min_cost_metric = task.use_min_cost_metric
+
+    def __iter__(self):
+        for atom in self.action_atoms:
+            action = atom.predicate
+            variable_mapping = dict([(par.name, arg)
+                                     for par, arg in zip(action.parameters, atom.args)])
+            inst_action = action.instantiate(variable_mapping, self.init_facts,
+                                             self.fluent_facts,
+                                             self.type_to_objects,
+                                             self.use_min_cost_metric)
+            if inst_action:
+                yield inst_action
+
 def instantiate(task, model):
     relaxed_reachable = False
     fluent_facts = get_fluent_facts(task, model)
@@ -37,7 +66,7 @@ def instantiate(task, model):
 
     type_to_objects = get_objects_by_type(task.objects, task.types)
 
-    instantiated_actions = []
+    action_atoms = []
     instantiated_axioms = []
     reachable_action_parameters = defaultdict(list)
     for atom in model:
@@ -51,13 +80,7 @@ def instantiate(task, model):
             # actions with the same name after normalization, and we
             # want to distinguish their instantiations.
             reachable_action_parameters[action].append(inst_parameters)
-            variable_mapping = dict([(par.name, arg)
-                                     for par, arg in zip(parameters, atom.args)])
-            inst_action = action.instantiate(variable_mapping, init_facts,
-                                             fluent_facts, type_to_objects,
-                                             task.use_min_cost_metric)
-            if inst_action:
-                instantiated_actions.append(inst_action)
+            action_atoms.append(atom)
         elif isinstance(atom.predicate, pddl.Axiom):
             axiom = atom.predicate
             variable_mapping = dict([(par.name, arg)
@@ -68,12 +91,25 @@ def instantiate(task, model):
         elif atom.predicate == "@goal-reachable":
             relaxed_reachable = True
 
+    instantiated_actions = InstantiatedActions(
+        task, action_atoms, init_facts, fluent_facts, type_to_objects)
+    if instantiated_axioms or options.dump_task:
+        # Axiom handling and dumping the task iterate over the actions
+        # before translate_strips_operators does. Instantiate them only once.
+        instantiated_actions = list(instantiated_actions)
     return (relaxed_reachable, fluent_facts, instantiated_actions,
             sorted(instantiated_axioms), reachable_action_parameters)
 
-def explore(task):
-    prog = pddl_to_prolog.translate(task)
-    model = build_model.compute_model(prog)
+def compute_model(task):
+    prog = pddl_to_prolog.translate(task, options.cost_based_join_order)
+    if options.interned_exploration:
+        return interned_model.compute_model(prog)
+    else:
+        return build_model.compute_model(prog)
+
+def explore(task, model=None):
+    if model is None:
+        model = compute_model(task)
     with timers.timing("Completing instantiation"):
         return instantiate(task, model)
 
@@ -81,6 +117,7 @@ if __name__ == "__main__":
     import pddl_parser
     task = pddl_parser.open()
     relaxed_reachable, atoms, actions, axioms, _ = explore(task)
+    actions = list(actions)
     print("goal relaxed reachable: %s" % relaxed_reachable)
     print("%d atoms:" % len(atoms))
     for atom in atoms:
@@ -0,0 +1,257 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Alternative implementation of build_model.compute_model that works on
+interned atoms (option --interned-exploration).
+
+Predicates and objects are mapped to small integers and atoms are pairs
+(predicate, args) with a tuple of integers as args, so that no pddl.Atom
+objects are created during the exploration. The rules of build_model are
+compiled into index tuples: the arguments of a derived atom are selected
+with a single operator.itemgetter call from the concatenated arguments of
+the atoms that fire the rule.
+
+The program is evaluated semi-naively like in build_model: every new atom
+(the delta) is joined exactly once with the atoms derived before it. The
+atoms are processed in the same order as by build_model, so the model is
+the same list of atoms.
+"""
+
+from __future__ import print_function
+
+import itertools
+from operator import itemgetter
+
+import build_model
+import pddl
+import timers
+
+
+class Interner(object):
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+    def intern(self, value):
+        id = self.ids.get(value)
+        if id is None:
+            id = len(self.values)
+            self.ids[value] = id
+            self.values.append(value)
+        return id
+    def __len__(self):
+        return len(self.values)
+
+def make_getter(indices):
+    """Return a function mapping a sequence to the tuple of its elements at
+    the given indices."""
+    if not indices:
+        return lambda seq: ()
+    elif len(indices) == 1:
+        index = indices[0]
+        return lambda seq: (seq[index],)
+    return itemgetter(*indices)
+
+def compile_effect(rule, cond_indices, objects):
+    """Return the pair (getter, constants) such that getter(args + constants)
+    is the tuple of effect arguments, where args is the concatenation of the
+    arguments of the atoms matching the conditions with the given indices
+    (in this order).
+
+    Like BuildRule.prepare_effect, later conditions overwrite the bindings
+    of earlier ones."""
+    sources = [None] * len(rule.effect.args)
+    offset = 0
+    for cond_index in cond_indices:
+        cond = rule.conditions[cond_index]
+        for position, var_no in enumerate(cond.args):
+            if isinstance(var_no, int):
+                sources[var_no] = offset + position
+        offset += len(cond.args)
+    constants = []
+    for position, source in enumerate(sources):
+        if source is None:
+            sources[position] = offset + len(constants)
+            constants.append(objects.intern(rule.effect.args[position]))
+    return make_getter(sources), tuple(constants)
+
+class InternedJoinRule(object):
+    def __init__(self, rule, objects, predicates):
+        self.effect_predicate = predicates.intern(rule.effect.predicate)
+        self.key_getters = [make_getter(positions)
+                            for positions in rule.common_var_positions]
+        self.effects = [compile_effect(rule, [0, 1], objects),
+                        compile_effect(rule, [1, 0], objects)]
+        self.atoms_by_key = ({}, {})
+    def fire(self, args, cond_index, push):
+        key = self.key_getters[cond_index](args)
+        self.atoms_by_key[cond_index].setdefault(key, []).append(args)
+        other_atoms = self.atoms_by_key[1 - cond_index].get(key)
+        if other_atoms:
+            getter, constants = self.effects[cond_index]
+            predicate = self.effect_predicate
+            for other_args in other_atoms:
+                push(predicate, getter(args + other_args + constants))
+
+class InternedProductRule(object):
+    def __init__(self, rule, objects, predicates):
+        self.effect_predicate = predicates.intern(rule.effect.predicate)
+        num_conditions = len(rule.conditions)
+        self.effects = [
+            compile_effect(rule, [cond_index] + [
+                index for index in range(num_conditions) if index != cond_index],
+                           objects)
+            for cond_index in range(num_conditions)]
+        self.atoms_by_index = [[] for _ in range(num_conditions)]
+        self.empty_atom_list_no = num_conditions
+    def fire(self, args, cond_index, push):
+        atom_list = self.atoms_by_index[cond_index]
+        if not atom_list:
+            self.empty_atom_list_no -= 1
+        atom_list.append(args)
+        if self.empty_atom_list_no:
+            return
+        getter, constants = self.effects[cond_index]
+        predicate = self.effect_predicate
+        other_atom_lists = [atoms for index, atoms in enumerate(self.atoms_by_index)
+                            if index != cond_index]
+        for other_args in itertools.product(*other_atom_lists):
+            push(predicate, getter(
+                args + tuple(itertools.chain.from_iterable(other_args)) + constants))
+
+class InternedProjectRule(object):
+    def __init__(self, rule, objects, predicates):
+        self.effect_predicate = predicates.intern(rule.effect.predicate)
+        self.getter, self.constants = compile_effect(rule, [0], objects)
+    def fire(self, args, cond_index, push):
+        push(self.effect_predicate, self.getter(args + self.constants))
+
+RULE_TYPES = {
+    build_model.JoinRule: InternedJoinRule,
+    build_model.ProductRule: InternedProductRule,
+    build_model.ProjectRule: InternedProjectRule,
+}
+
+def compile_generator(generator, compiled_rules, objects):
+    """Convert a generator of build_model.Unifier into nested tuples
+    (matches, index, branches, next) with interned objects as keys of the
+    branches. For leaves, index, branches and next are None."""
+    matches = [(compiled_rules[rule], cond_index)
+               for rule, cond_index in generator.matches]
+    if isinstance(generator, build_model.LeafGenerator):
+        return (matches, None, None, None)
+    branches = dict(
+        (objects.intern(obj), compile_generator(branch, compiled_rules, objects))
+        for obj, branch in generator.match_generator.items())
+    return (matches, generator.index, branches,
+            compile_generator(generator.next, compiled_rules, objects))
+
+def generate(generator, args, result):
+    """Collect the matches for args in the same order as
+    build_model.MatchGenerator.generate."""
+    matches, index, branches, next = generator
+    result += matches
+    if index is not None:
+        branch = branches.get(args[index])
+        if branch:
+            generate(branch, args, result)
+        generate(next, args, result)
+
+class Queue:
+    def __init__(self, atoms, num_predicates):
+        self.queue = atoms
+        self.queue_pos = 0
+        self.enqueued = [set() for _ in range(num_predicates)]
+        for predicate, args in atoms:
+            self.enqueued[predicate].add(args)
+        self.num_pushes = len(atoms)
+    def __bool__(self):
+        return self.queue_pos < len(self.queue)
+    __nonzero__ = __bool__
+    def push(self, predicate, args):
+        self.num_pushes += 1
+        enqueued = self.enqueued[predicate]
+        if args not in enqueued:
+            enqueued.add(args)
+            self.queue.append((predicate, args))
+    def pop(self):
+        result = self.queue[self.queue_pos]
+        self.queue_pos += 1
+        return result
+
+def compute_model(prog):
+    with timers.timing("Preparing model"):
+        rules = build_model.convert_rules(prog)
+        unifier = build_model.Unifier(rules)
+        objects = Interner()
+        predicates = Interner()
+        compiled_rules = dict(
+            (rule, RULE_TYPES[rule.__class__](rule, objects, predicates))
+            for rule in rules)
+        fact_atoms = [
+            (predicates.intern(atom.predicate),
+             tuple([objects.intern(arg) for arg in atom.args]))
+            for atom in sorted(fact.atom for fact in prog.facts)]
+        generators = {}
+        for predicate, generator in unifier.predicate_to_rule_generator.items():
+            generators[predicates.intern(predicate)] = compile_generator(
+                generator, compiled_rules, objects)
+        # For predicates without constants in the rule conditions, the
+        # matches do not depend on the atom.
+        static_matches = [None] * len(predicates)
+        dynamic_generators = [None] * len(predicates)
+        for predicate in range(len(predicates)):
+            generator = generators.get(predicate)
+            if generator is None:
+                static_matches[predicate] = []
+            elif generator[1] is None:
+                static_matches[predicate] = generator[0]
+            else:
+                dynamic_generators[predicate] = generator
+        is_auxiliary = [isinstance(pred, str) and "$" in pred
+                        for pred in predicates.values]
+        queue = Queue(fact_atoms, len(predicates))
+
+    print("Generated %d rules." % len(rules))
+    with timers.timing("Computing model"):
+        relevant_atoms = 0
+        auxiliary_atoms = 0
+        push = queue.push
+        while queue:
+            predicate, args = queue.pop()
+            if is_auxiliary[predicate]:
+                auxiliary_atoms += 1
+            else:
+                relevant_atoms += 1
+            matches = static_matches[predicate]
+            if matches is None:
+                matches = []
+                generate(dynamic_generators[predicate], args, matches)
+            for rule, cond_index in matches:
+                rule.fire(args, cond_index, push)
+        build_model.set_model_counters(
+            rules, relevant_atoms, auxiliary_atoms, queue)
+    print("%d relevant atoms" % relevant_atoms)
+    print("%d auxiliary atoms" % auxiliary_atoms)
+    print("%d final queue length" % len(queue.queue))
+    print("%d total queue pushes" % queue.num_pushes)
+    object_names = objects.values
+    return [pddl.Atom(predicates.values[predicate],
+                      [object_names[obj] for obj in args])
+            for predicate, args in queue.queue]
+
+if __name__ == "__main__":
+    import pddl_parser
+    import normalize
+    import pddl_to_prolog
+
+    print("Parsing...")
+    task = pddl_parser.open()
+    print("Normalizing...")
+    normalize.normalize(task)
+    print("Writing rules...")
+    prog = pddl_to_prolog.translate(task)
+
+    model = compute_model(prog)
+    for atom in model:
+        print(atom)
+    print("%d atoms" % len(model))
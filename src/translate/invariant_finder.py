@@ -4,17 +4,31 @@ from __future__ import print_function
 
 from collections import deque, defaultdict
 import itertools
+import multiprocessing
 import time
 
 import invariants
 import options
 import pddl
+import profiling
 import timers
+import tools
+
+## Number of candidates per worker process that are checked at once by
+## check_candidates_in_parallel.
+CANDIDATES_PER_JOB = 16
+
+# True iff the last invariant generation was aborted because it reached the
+# time limit. Its result then depends on the speed of the machine.
+time_limit_reached = False
 
 class BalanceChecker(object):
-    def __init__(self, task, reachable_action_params):
+    def __init__(self, task, reachable_action_params, cache_size=0):
         self.predicates_to_add_actions = defaultdict(set)
         self.action_to_heavy_action = {}
+        self.action_to_effect_predicates = {}
+        # Results of Invariant.check_action_balance.
+        self.cache = tools.LRUCache(cache_size)
         for act in task.actions:
             action = self.add_inequality_preconds(act, reachable_action_params)
             too_heavy_effects = []
@@ -36,6 +50,8 @@ class BalanceChecker(object):
             # heavy_act: duplicated universal effects and assigned unique names
             # to all quantified variables (implicitly in constructor)
             self.action_to_heavy_action[action] = heavy_act
+            self.action_to_effect_predicates[action] = frozenset(
+                eff.literal.predicate for eff in action.effects)
 
     def get_threats(self, predicate):
         return self.predicates_to_add_actions.get(predicate, set())
@@ -43,6 +59,13 @@ class BalanceChecker(object):
     def get_heavy_action(self, action):
         return self.action_to_heavy_action[action]
 
+    def get_effect_predicates(self, action):
+        return self.action_to_effect_predicates[action]
+
+    def print_cache_statistics(self):
+        print("Balance check cache: %d hits, %d misses, %d entries" % (
+            self.cache.hits, self.cache.misses, len(self.cache.entries)))
+
     def add_inequality_preconds(self, action, reachable_action_params):
         if reachable_action_params is None or len(action.parameters) < 2:
             return action
@@ -85,26 +108,103 @@ def get_initial_invariants(task):
             yield invariants.Invariant((part,))
 
 def find_invariants(task, reachable_action_params):
+    global time_limit_reached
+    time_limit_reached = False
     limit = options.invariant_generation_max_candidates
     candidates = deque(itertools.islice(get_initial_invariants(task), 0, limit))
     print(len(candidates), "initial candidates")
     seen_candidates = set(candidates)
 
-    balance_checker = BalanceChecker(task, reachable_action_params)
+    balance_checker = BalanceChecker(
+        task, reachable_action_params,
+        options.invariant_generation_balance_cache_size)
 
     def enqueue_func(invariant):
         if len(seen_candidates) < limit and invariant not in seen_candidates:
             candidates.append(invariant)
             seen_candidates.add(invariant)
 
-    start_time = time.clock()
-    while candidates:
-        candidate = candidates.popleft()
-        if time.clock() - start_time > options.invariant_generation_max_time:
-            print("Time limit reached, aborting invariant generation")
+    num_initial_candidates = len(candidates)
+    try:
+        jobs = options.invariant_generation_jobs
+        if jobs > 1:
+            for candidate in check_candidates_in_parallel(
+                    candidates, balance_checker, enqueue_func, jobs):
+                yield candidate
             return
-        if candidate.check_balance(balance_checker, enqueue_func):
-            yield candidate
+
+        start_time = time.clock()
+        while candidates:
+            candidate = candidates.popleft()
+            if time.clock() - start_time > options.invariant_generation_max_time:
+                print("Time limit reached, aborting invariant generation")
+                time_limit_reached = True
+                return
+            if candidate.check_balance(balance_checker, enqueue_func):
+                yield candidate
+    finally:
+        balance_checker.print_cache_statistics()
+        profiling.set_counter("initial candidates", num_initial_candidates)
+        profiling.set_counter("candidates", len(seen_candidates))
+        profiling.set_counter("unchecked candidates", len(candidates))
+        profiling.set_counter("balance check cache hits",
+                              balance_checker.cache.hits)
+        profiling.set_counter("balance check cache misses",
+                              balance_checker.cache.misses)
+
+# Balance checker of a worker process of check_candidates_in_parallel. It
+# is passed to _init_worker when the worker starts, which only copies it
+# if the worker is not forked (e.g. with the start method "spawn").
+_balance_checker = None
+
+def _init_worker(balance_checker):
+    global _balance_checker
+    _balance_checker = balance_checker
+
+def _check_candidate(candidate):
+    cache = _balance_checker.cache
+    hits, misses = cache.hits, cache.misses
+    refinements = []
+    balanced = candidate.check_balance(_balance_checker, refinements.append)
+    return balanced, refinements, cache.hits - hits, cache.misses - misses
+
+def check_candidates_in_parallel(candidates, balance_checker, enqueue_func,
+                                 jobs):
+    """Check the candidates with a pool of worker processes and yield the
+    balanced ones.
+
+    The workers check batches of candidates from the front of the queue.
+    The refinements reported for a batch are passed to enqueue_func in
+    the order of the candidates, so the candidates are checked and
+    refined in the same order as in the serial loop of find_invariants.
+    The time limit refers to wall-clock time and is only checked between
+    batches. Every worker has its own balance check cache, the statistics
+    of the workers are added to the cache of balance_checker."""
+    global time_limit_reached
+    pool = multiprocessing.Pool(jobs, initializer=_init_worker,
+                                initargs=(balance_checker,))
+    try:
+        start_time = time.time()
+        while candidates:
+            if time.time() - start_time > options.invariant_generation_max_time:
+                print("Time limit reached, aborting invariant generation")
+                time_limit_reached = True
+                return
+            batch_size = min(len(candidates), jobs * CANDIDATES_PER_JOB)
+            batch = [candidates.popleft() for _ in range(batch_size)]
+            results = pool.map(_check_candidate, batch,
+                               chunksize=max(1, batch_size // (4 * jobs)))
+            for candidate, result in zip(batch, results):
+                balanced, refinements, hits, misses = result
+                balance_checker.cache.hits += hits
+                balance_checker.cache.misses += misses
+                for refinement in refinements:
+                    enqueue_func(refinement)
+                if balanced:
+                    yield candidate
+    finally:
+        pool.terminate()
+        pool.join()
 
 def useful_groups(invariants, initial_facts):
     predicate_to_invariants = defaultdict(list)
@@ -127,9 +227,15 @@ def useful_groups(invariants, initial_facts):
     for (invariant, parameters) in useful_groups:
         yield [part.instantiate(parameters) for part in sorted(invariant.parts)]
 
-def get_groups(task, reachable_action_params=None):
+def get_invariants(task, reachable_action_params=None):
     with timers.timing("Finding invariants", block=True):
-        invariants = sorted(find_invariants(task, reachable_action_params))
+        result = sorted(find_invariants(task, reachable_action_params))
+        profiling.set_counter("invariants", len(result))
+    return result
+
+def get_groups(task, reachable_action_params=None, invariants=None):
+    if invariants is None:
+        invariants = get_invariants(task, reachable_action_params)
     with timers.timing("Checking invariant weight"):
         result = list(useful_groups(invariants, task.init))
     return result
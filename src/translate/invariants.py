@@ -243,13 +243,41 @@ class Invariant:
         for part in self.parts:
             actions_to_check |= balance_checker.get_threats(part.predicate)
         for action in actions_to_check:
-            heavy_action = balance_checker.get_heavy_action(action)
-            if self.operator_too_heavy(heavy_action):
-                return False
-            if self.operator_unbalanced(action, enqueue_func):
+            # The balance of the action only depends on the parts for the
+            # predicates of its effects, so the result of the check can be
+            # reused for all candidates that agree on these parts.
+            key = (action, self.get_relevant_parts(
+                balance_checker.get_effect_predicates(action)))
+            result = balance_checker.cache.get(key)
+            if result is None:
+                heavy_action = balance_checker.get_heavy_action(action)
+                result = self.check_action_balance(action, heavy_action)
+                balance_checker.cache.set(key, result)
+            balanced, refinement_parts = result
+            for part in refinement_parts:
+                enqueue_func(Invariant(self.parts.union((part,))))
+            if not balanced:
                 return False
         return True
 
+    def get_relevant_parts(self, predicates):
+        """Return the parts for the given predicates in a canonical form.
+        The omitted position does not matter for the balance check."""
+        return tuple(sorted((part.predicate, tuple(part.order))
+                            for part in self.parts
+                            if part.predicate in predicates))
+
+    def check_action_balance(self, action, heavy_action):
+        """Return the pair (balanced, refinement_parts). If the action is
+        unbalanced, refinement_parts are the parts that are added to
+        the invariant to obtain the refined candidates."""
+        if self.operator_too_heavy(heavy_action):
+            return False, []
+        refinement_parts = []
+        if self.operator_unbalanced(action, refinement_parts.append):
+            return False, refinement_parts
+        return True, []
+
     def operator_too_heavy(self, h_action):
         add_effects = [eff for eff in h_action.effects
                        if not eff.literal.negated and
@@ -273,7 +301,7 @@ class Invariant:
                 return True
         return False
 
-    def operator_unbalanced(self, action, enqueue_func):
+    def operator_unbalanced(self, action, add_refinement_part):
         inv_vars = find_unique_variables(action, self)
         relevant_effs = [eff for eff in action.effects
                          if self.predicate_to_part.get(eff.literal.predicate)]
@@ -283,7 +311,7 @@ class Invariant:
                        if eff.literal.negated]
         for eff in add_effects:
             if self.add_effect_unbalanced(action, eff, del_effects, inv_vars,
-                                          enqueue_func):
+                                          add_refinement_part):
                 return True
         return False
 
@@ -311,7 +339,7 @@ class Invariant:
         return minimal_renamings
 
     def add_effect_unbalanced(self, action, add_effect, del_effects,
-                              inv_vars, enqueue_func):
+                              inv_vars, add_refinement_part):
 
         minimal_renamings = self.minimal_covering_renamings(action, add_effect,
                                                             inv_vars)
@@ -329,18 +357,19 @@ class Invariant:
                 return False
 
         # Otherwise, the balance check fails => Generate new candidates.
-        self.refine_candidate(add_effect, action, enqueue_func)
+        self.refine_candidate(add_effect, action, add_refinement_part)
         return True
 
-    def refine_candidate(self, add_effect, action, enqueue_func):
+    def refine_candidate(self, add_effect, action, add_refinement_part):
         """refines the candidate for an add effect that is unbalanced in the
-           action and adds the refined one to the queue"""
+           action and passes the parts of the refined candidates to
+           add_refinement_part"""
         part = self.predicate_to_part[add_effect.literal.predicate]
         for del_eff in [eff for eff in action.effects if eff.literal.negated]:
             if del_eff.literal.predicate not in self.predicate_to_part:
                 for match in part.possible_matches(add_effect.literal,
                                                    del_eff.literal):
-                    enqueue_func(Invariant(self.parts.union((match,))))
+                    add_refinement_part(match)
 
     def unbalanced_renamings(self, del_effect, add_effect,
         inv_vars, lhs_by_pred, unbalanced_renamings):
@@ -30,6 +30,16 @@ def parse_args():
     argparser.add_argument(
         "--invariant-generation-max-time", default=300, type=int,
         help="max time for invariant generation (default: %(default)ds)")
+    argparser.add_argument(
+        "--invariant-generation-balance-cache-size", default=100000, type=int,
+        help="max number of cached balance checks of actions for invariant "
+        "candidates (default: %(default)d). Set to 0 to disable the cache.")
+    argparser.add_argument(
+        "--invariant-generation-jobs", default=1, type=int,
+        help="number of processes checking invariant candidates in parallel "
+        "(default: %(default)d). The result does not depend on this number, "
+        "but with more than one process, the time limit refers to wall-clock "
+        "time instead of CPU time.")
     argparser.add_argument(
         "--add-implied-preconditions", action="store_true",
         help="infer additional preconditions. This setting can cause a "
@@ -57,6 +67,43 @@ def parse_args():
         "--keep-unimportant-variables",
         dest="filter_unimportant_vars", action="store_false",
         help="keep variables that do not influence the goal in the causal graph")
+    argparser.add_argument(
+        "--cost-based-join-order", action="store_true",
+        help="order the joins of the Datalog rules by the number of atoms "
+        "that they are estimated to produce, based on the number of facts "
+        "and distinct arguments of the predicates in the initial state (see "
+        "greedy_join.JoinStatistics), instead of only by their variables. "
+        "This can reduce the number of auxiliary atoms of the exploration.")
+    argparser.add_argument(
+        "--interned-exploration", action="store_true",
+        help="compute the relaxed reachable atoms with objects and predicates "
+        "mapped to integers (see interned_model.py). The result is the same "
+        "as with the default exploration.")
+    argparser.add_argument(
+        "--columnar-operators", action="store_true",
+        help="detect unreachable propositions and reorder the variables on "
+        "NumPy arrays of the operator conditions and effects (see "
+        "sas_arrays.py) instead of the operator lists. Requires NumPy. The "
+        "result is the same as without this option.")
+    argparser.add_argument(
+        "--binary-sas-output", action="store_true",
+        help="write the task in the compact binary format of sas_binary.py "
+        "to output.sasb instead of output.sas. The search component "
+        "cannot read this format.")
+    argparser.add_argument(
+        "--checkpoint-dir",
+        help="directory for checkpoints of the normalized task, the relaxed "
+        "model, the invariants and the fact groups (see checkpoints.py). "
+        "Later runs with the same files and relevant options restart from "
+        "the deepest checkpoint.")
+    argparser.add_argument(
+        "--profile-report", metavar="FILE",
+        help="write a JSON report with the time, memory usage and counters "
+        "of the phases of the translation to FILE (see profiling.py)")
+    argparser.add_argument(
+        "--profile-sample-interval", metavar="SECONDS", type=float, default=0,
+        help="with --profile-report, also record the memory usage every "
+        "SECONDS seconds (default: %(default)s, i.e., no samples)")
     argparser.add_argument(
         "--dump-task", action="store_true",
         help="dump human-readable SAS+ representation of the task")
@@ -85,6 +132,16 @@ def parse_args():
     argparser.add_argument(
         "--dump-dot-graph", action="store_true",
         help="If true, dumping the abstract structure as dot graph.")
+    argparser.add_argument(
+        "--abstract-structure-graph-text", action="store_true",
+        help="If true, write the abstract structure graph as text file "
+        "abstract-structure-graph.txt (one line of comma-separated successors "
+        "per vertex) instead of the binary abstract-structure-graph.bin.")
+    argparser.add_argument(
+        "--abstract-structure-graph-template-dir",
+        help="Directory in which the parts of the abstract structure graph "
+        "that only depend on the domain are stored and reused for further "
+        "problems of the same domain.")
 
     return argparser.parse_args()
 
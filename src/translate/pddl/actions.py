@@ -102,7 +102,8 @@ class Action(object):
             return None
 
 
-class PropositionalAction:
+class PropositionalAction(object):
+    __slots__ = ["name", "precondition", "add_effects", "del_effects", "cost"]
     def __init__(self, name, precondition, effects, cost):
         self.name = name
         self.precondition = precondition
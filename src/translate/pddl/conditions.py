@@ -13,6 +13,11 @@ class Condition(object):
         self.hash = hash((self.__class__, self.parts))
     def __hash__(self):
         return self.hash
+    def __reduce__(self):
+        # The hash depends on the hash of the class (and of strings), which
+        # differs between processes. Pickling the constructor arguments
+        # recomputes it when unpickling (see checkpoints.py).
+        return self.__class__, (self.parts,)
     def __ne__(self, other):
         return not self == other
     def __lt__(self, other):
@@ -78,6 +83,8 @@ class ConstantCondition(Condition):
     parts = ()
     def __init__(self):
         self.hash = hash(self.__class__)
+    def __reduce__(self):
+        return self.__class__, ()
     def change_parts(self, parts):
         return self
     def __eq__(self, other):
@@ -165,6 +172,8 @@ class QuantifiedCondition(Condition):
         self.parameters = tuple(parameters)
         self.parts = tuple(parts)
         self.hash = hash((self.__class__, self.parameters, self.parts))
+    def __reduce__(self):
+        return self.__class__, (self.parameters, self.parts)
     def __eq__(self, other):
         # Compare hash first for speed reasons.
         return (self.hash == other.hash and
@@ -227,6 +236,8 @@ class Literal(Condition):
         self.predicate = predicate
         self.args = tuple(args)
         self.hash = hash((self.__class__, self.predicate, self.args))
+    def __reduce__(self):
+        return self.__class__, (self.predicate, self.args)
     def __eq__(self, other):
         # Compare hash first for speed reasons.
         return (self.hash == other.hash and
@@ -1,3 +1,6 @@
+import gc
+import re
+
 __all__ = ["ParseError", "parse_nested_list"]
 
 class ParseError(Exception):
@@ -6,39 +9,89 @@ class ParseError(Exception):
     def __str__(self):
         return self.value
 
+# Comments extend from ";" to the end of the line.
+COMMENT_RE = re.compile(r";[^\n]*")
+
 # Basic functions for parsing PDDL (Lisp) files.
 def parse_nested_list(input_file):
-    tokens = tokenize(input_file)
-    next_token = next(tokens)
-    if next_token != "(":
-        raise ParseError("Expected '(', got %s." % next_token)
-    result = list(parse_list_aux(tokens))
-    for tok in tokens:  # Check that generator is exhausted.
-        raise ParseError("Unexpected token: %s." % tok)
+    # We read the whole file at once and tokenize it in one pass, which is
+    # much faster than processing it line by line for large task files.
+    text = input_file.read()
+    code = COMMENT_RE.sub("", text)
+    try:
+        code.encode("ascii")
+    except UnicodeEncodeError:
+        raise_non_ascii_error(text)
+    tokens = tokenize(code)
+    # The nested lists cannot contain cycles, so the collections that
+    # creating many lists triggers are useless.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return build_nested_list(tokens)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def tokenize(code):
+    """Return the list of tokens of PDDL code without comments."""
+    code = code.lower()
+    return code.replace("(", " ( ").replace(")", " ) ").replace("?", " ?").split()
+
+def build_nested_list(tokens, complete=True):
+    """Build the nested list from the tokens with an explicit stack.
+
+    If complete is False, the tokens are only a prefix of the file. Then
+    only the errors that are detected before the end of the prefix are
+    raised and None is returned otherwise."""
+    tokens = iter(tokens)
+    for token in tokens:
+        if token != "(":
+            raise ParseError("Expected '(', got %s." % token)
+        break
+    else:
+        if not complete:
+            return None
+        raise ParseError("Expected '(', got end of file.")
+    result = []
+    current = result
+    stack = []
+    for token in tokens:
+        if token == "(":
+            nested = []
+            current.append(nested)
+            stack.append(current)
+            current = nested
+        elif token == ")":
+            if not stack:
+                break
+            current = stack.pop()
+        else:
+            current.append(token)
+    else:
+        if not complete:
+            return None
+        raise ParseError("Missing ')'")
+    for token in tokens:  # Check that all tokens are used.
+        raise ParseError("Unexpected token: %s." % token)
     return result
 
-def tokenize(input):
-    for line in input:
-        line = line.split(";", 1)[0]  # Strip comments.
+def raise_non_ascii_error(text):
+    """Raise the error for the first line with a non-ASCII character
+    outside of comments, unless the preceding lines contain another
+    error."""
+    offset = 0
+    lines = text.split("\n")
+    for line_no, line in enumerate(lines):
+        if line_no < len(lines) - 1:
+            line += "\n"
+        code = line.split(";", 1)[0]
         try:
-            line.encode("ascii")
+            code.encode("ascii")
         except UnicodeEncodeError:
+            build_nested_list(
+                tokenize(COMMENT_RE.sub("", text[:offset])), complete=False)
             raise ParseError("Non-ASCII character outside comment: %s" %
-                             line[0:-1])
-        line = line.replace("(", " ( ").replace(")", " ) ").replace("?", " ?")
-        for token in line.split():
-            yield token.lower()
-
-def parse_list_aux(tokenstream):
-    # Leading "(" has already been swallowed.
-    while True:
-        try:
-            token = next(tokenstream)
-        except StopIteration:
-            raise ParseError("Missing ')'")
-        if token == ")":
-            return
-        elif token == "(":
-            yield list(parse_list_aux(tokenstream))
-        else:
-            yield token
+                             code[0:-1])
+        offset += len(line)
+    assert False, "no line with a non-ASCII character outside comments"
@@ -36,15 +36,21 @@ class PrologProgram:
         self.remove_free_effect_variables()
         self.split_duplicate_arguments()
         self.convert_trivial_rules()
-    def split_rules(self):
+    def split_rules(self, cost_based_join_order=False):
+        import greedy_join
         import split_rules
         # Splits rules whose conditions can be partitioned in such a way that
         # the parts have disjoint variable sets, then split n-ary joins into
         # a number of binary joins, introducing new pseudo-predicates for the
-        # intermediate values.
+        # intermediate values. With cost_based_join_order, the joins are
+        # ordered by the estimated number of atoms that they produce.
+        statistics = None
+        if cost_based_join_order:
+            statistics = greedy_join.JoinStatistics(self)
         new_rules = []
         for rule in self.rules:
-            new_rules += split_rules.split_rule(rule, self.new_name)
+            new_rules += split_rules.split_rule(
+                rule, self.new_name, statistics)
         self.rules = new_rules
     def remove_free_effect_variables(self):
         """Remove free effect variables like the variable Y in the rule
@@ -157,7 +163,7 @@ def translate_facts(prog, task):
         if isinstance(fact, pddl.Atom):
             prog.add_fact(fact)
 
-def translate(task):
+def translate(task, cost_based_join_order=False):
     # Note: The function requires that the task has been normalized.
     with timers.timing("Generating Datalog program"):
         prog = PrologProgram()
@@ -168,7 +174,7 @@ def translate(task):
         # Using block=True because normalization can output some messages
         # in rare cases.
         prog.normalize()
-        prog.split_rules()
+        prog.split_rules(cost_based_join_order)
     return prog
 
 
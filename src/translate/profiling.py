@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+"""Profiling report of the translator (option --profile-report).
+
+If profiling is enabled, every timers.timing block is recorded as a
+phase of the report. For each phase the report contains the CPU and
+wall-clock time, the resident set size (RSS) at the start and the end,
+the peak RSS during the phase, the change of the number of memory blocks
+allocated by the interpreter (Python >= 3.4 only) and the counters set
+with set_counter while the phase was the innermost running one, e.g. the
+number of atoms of the relaxed model or of checked invariant candidates.
+
+The peak RSS of a phase is measured by resetting the peak RSS of the
+process (VmHWM) at the start and the end of every phase, which needs
+Linux >= 4.0. Otherwise the peaks are the peaks since the start of the
+process, which is stated in the report ("peak_rss_per_phase": false).
+Worker processes (see --invariant-generation-jobs) are not measured.
+
+With a sample interval, a thread additionally records the RSS and the
+running phases periodically in "samples", so that the memory usage
+within long phases can be followed. The report is also written when the
+translator runs out of memory, with the phases that were running
+marked as unfinished.
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import sys
+import threading
+import time
+
+REPORT_VERSION = 1
+# Seconds to wait for the sampler thread to stop.
+SAMPLER_JOIN_TIMEOUT = 1.0
+
+_profiler = None
+
+
+def _read_memory_status():
+    """Return the current and the peak RSS of the process in KB, or
+    (None, None) if they cannot be determined."""
+    rss = peak_rss = None
+    try:
+        with open("/proc/self/status") as status_file:
+            for line in status_file:
+                parts = line.split()
+                if parts[0] == "VmRSS:":
+                    rss = int(parts[1])
+                elif parts[0] == "VmHWM:":
+                    peak_rss = int(parts[1])
+    except IOError:
+        pass
+    return rss, peak_rss
+
+
+def _reset_peak_memory():
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except (IOError, OSError):
+        return False
+    return True
+
+
+def _get_allocated_blocks():
+    if hasattr(sys, "getallocatedblocks"):
+        return sys.getallocatedblocks()
+    return None
+
+
+def _get_cpu_time():
+    times = os.times()
+    return times[0] + times[1]
+
+
+def _max(*values):
+    values = [value for value in values if value is not None]
+    if values:
+        return max(values)
+    return None
+
+
+def _difference(end, start):
+    if end is None or start is None:
+        return None
+    return end - start
+
+
+class Phase(object):
+    def __init__(self, name, parent, start_time):
+        self.name = name
+        self.parent = parent
+        if parent is None:
+            self.path = name
+        else:
+            self.path = "%s/%s" % (parent.path, name)
+        self.start_time = start_time
+        self.start_cpu = _get_cpu_time()
+        self.start_rss, _ = _read_memory_status()
+        self.start_blocks = _get_allocated_blocks()
+        self.end_time = self.end_cpu = None
+        self.end_rss = self.end_blocks = None
+        self.peak_rss = self.start_rss
+        self.counters = {}
+        self.finished = False
+
+    def finish(self, finished):
+        self.end_time = time.time()
+        self.end_cpu = _get_cpu_time()
+        self.end_rss, _ = _read_memory_status()
+        self.end_blocks = _get_allocated_blocks()
+        self.finished = finished
+
+    def get_report(self, start_time):
+        end_time = self.end_time
+        end_cpu = self.end_cpu
+        end_rss = self.end_rss
+        end_blocks = self.end_blocks
+        if end_time is None:
+            end_time = time.time()
+            end_cpu = _get_cpu_time()
+            end_rss, _ = _read_memory_status()
+            end_blocks = _get_allocated_blocks()
+        return {
+            "name": self.name,
+            "path": self.path,
+            "finished": self.finished,
+            "start": self.start_time - start_time,
+            "wall_time": end_time - self.start_time,
+            "cpu_time": end_cpu - self.start_cpu,
+            "start_rss_kb": self.start_rss,
+            "end_rss_kb": end_rss,
+            "rss_delta_kb": _difference(end_rss, self.start_rss),
+            "peak_rss_kb": _max(self.peak_rss, end_rss),
+            "allocated_blocks_delta": _difference(end_blocks,
+                                                  self.start_blocks),
+            "counters": self.counters,
+        }
+
+
+class Profiler(object):
+    def __init__(self, sample_interval=0):
+        self.start_time = time.time()
+        self.start_cpu = _get_cpu_time()
+        self.phases = []
+        self.running = []
+        self.counters = {}
+        self.samples = []
+        self.lock = threading.Lock()
+        self.peak_rss_per_phase = _reset_peak_memory()
+        _, self.peak_rss = _read_memory_status()
+        self.sample_interval = sample_interval
+        self.stop_sampling = threading.Event()
+        self.sampler = None
+        if sample_interval > 0:
+            self.sampler = threading.Thread(target=self._sample)
+            self.sampler.daemon = True
+            self.sampler.start()
+
+    def _update_peaks(self):
+        """Add the peak RSS since the last update to the running phases and
+        start a new measurement."""
+        _, peak_rss = _read_memory_status()
+        self.peak_rss = _max(self.peak_rss, peak_rss)
+        for phase in self.running:
+            phase.peak_rss = _max(phase.peak_rss, peak_rss)
+        if self.peak_rss_per_phase:
+            _reset_peak_memory()
+
+    def start_phase(self, name):
+        with self.lock:
+            self._update_peaks()
+            parent = self.running[-1] if self.running else None
+            phase = Phase(name, parent, time.time())
+            self.phases.append(phase)
+            self.running.append(phase)
+
+    def end_phase(self, finished=True):
+        """End the innermost running phase. finished is False if the phase
+        was left with an exception."""
+        with self.lock:
+            self._update_peaks()
+            phase = self.running.pop()
+            phase.finish(finished)
+
+    def set_counter(self, name, value):
+        if self.running:
+            self.running[-1].counters[name] = value
+        else:
+            self.counters[name] = value
+
+    def _sample(self):
+        while not self.stop_sampling.wait(self.sample_interval):
+            with self.lock:
+                rss, peak_rss = _read_memory_status()
+                path = self.running[-1].path if self.running else None
+                for phase in self.running:
+                    phase.peak_rss = _max(phase.peak_rss, rss)
+                self.samples.append(
+                    (time.time() - self.start_time, rss, peak_rss, path))
+
+    def get_report(self, status):
+        with self.lock:
+            self._update_peaks()
+            return {
+                "version": REPORT_VERSION,
+                "command": sys.argv,
+                "python": "%d.%d.%d" % tuple(sys.version_info[:3]),
+                "status": status,
+                "wall_time": time.time() - self.start_time,
+                "cpu_time": _get_cpu_time() - self.start_cpu,
+                "peak_rss_kb": self.peak_rss,
+                "peak_rss_per_phase": self.peak_rss_per_phase,
+                "counters": self.counters,
+                "phases": [phase.get_report(self.start_time)
+                           for phase in self.phases],
+                "sample_interval": self.sample_interval,
+                "samples": [
+                    {"time": sample_time, "rss_kb": rss,
+                     "peak_rss_kb": peak_rss, "phase": path}
+                    for sample_time, rss, peak_rss, path in self.samples],
+            }
+
+    def stop_sampler(self):
+        """Stop the sampler thread, so that it does not run into the
+        shutdown of the interpreter and does not change the report."""
+        self.stop_sampling.set()
+        if self.sampler is not None:
+            self.sampler.join(SAMPLER_JOIN_TIMEOUT)
+
+    def write_report(self, filename, status):
+        self.stop_sampler()
+        report = self.get_report(status)
+        with open(filename, "w") as report_file:
+            json.dump(report, report_file, indent=2, sort_keys=True)
+            report_file.write("\n")
+
+
+def enable(sample_interval=0):
+    global _profiler
+    _profiler = Profiler(sample_interval)
+
+
+def get_profiler():
+    """Return the profiler or None if profiling is disabled."""
+    return _profiler
+
+
+def set_counter(name, value):
+    """Record a counter for the innermost running phase (or the whole
+    run if there is none). Does nothing if profiling is disabled."""
+    if _profiler is not None:
+        _profiler.set_counter(name, value)
+
+
+def write_report(filename, status):
+    if _profiler is not None:
+        _profiler.write_report(filename, status)
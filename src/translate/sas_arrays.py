@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+
+"""Columnar representation of the operators of a SASTask (option
+--columnar-operators).
+
+OperatorArrays stores the prevail conditions, effects and effect
+conditions of all operators in flat NumPy integer arrays:
+
+    prevail_offsets    the prevail conditions of operator i are the
+                       entries prevail_offsets[i]:prevail_offsets[i + 1]
+    prevail_vars, prevail_values
+    effect_offsets     the pre_post entries of operator i are the entries
+                       effect_offsets[i]:effect_offsets[i + 1]
+    effect_vars, effect_pres, effect_posts
+    condition_offsets  the effect conditions of effect j are the entries
+                       condition_offsets[j]:condition_offsets[j + 1]
+    condition_vars, condition_values
+
+simplify.filter_unreachable_propositions and
+variable_order.find_and_apply_variable_order use these arrays instead
+of the lists of the operators if they are passed an OperatorArrays.
+get_operators() writes the result back into the SASOperator objects.
+The result is identical to that of the passes on the lists.
+"""
+
+from itertools import chain
+
+import numpy as np
+
+## Codes of the values always_false and always_true of simplify.py in the
+## arrays of rename.
+ALWAYS_FALSE = -2
+ALWAYS_TRUE = -3
+
+
+def _get_segment_ids(offsets):
+    """Return the array mapping each entry to the number of its segment."""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def _get_offsets(segment_ids, num_segments):
+    """Return the offsets of the segments of entries sorted by segment."""
+    offsets = np.zeros(num_segments + 1, dtype=np.int64)
+    np.cumsum(np.bincount(segment_ids, minlength=num_segments),
+              out=offsets[1:])
+    return offsets
+
+
+def _take_segments(offsets, indices):
+    """Return the offsets of the selected segments and the indices of their
+    entries, in the order of indices."""
+    lengths = np.diff(offsets)[indices]
+    new_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    entries = (np.repeat(offsets[:-1][indices] - new_offsets[:-1], lengths) +
+               np.arange(new_offsets[-1]))
+    return new_offsets, entries
+
+
+def _to_array(values):
+    return np.array(values, dtype=np.int64)
+
+
+class OperatorArrays(object):
+    def __init__(self, operators):
+        self.operators = list(operators)
+        self.prevail_offsets = _to_array(
+            [0] + [len(op.prevail) for op in self.operators]).cumsum()
+        prevail = _to_array(list(chain.from_iterable(
+            op.prevail for op in self.operators))).reshape(-1, 2)
+        self.prevail_vars = prevail[:, 0]
+        self.prevail_values = prevail[:, 1]
+
+        self.effect_offsets = _to_array(
+            [0] + [len(op.pre_post) for op in self.operators]).cumsum()
+        effects = list(chain.from_iterable(
+            op.pre_post for op in self.operators))
+        self.effect_vars = _to_array([var for var, _, _, _ in effects])
+        self.effect_pres = _to_array([pre for _, pre, _, _ in effects])
+        self.effect_posts = _to_array([post for _, _, post, _ in effects])
+        self.condition_offsets = _to_array(
+            [0] + [len(cond) for _, _, _, cond in effects]).cumsum()
+        conditions = _to_array(list(chain.from_iterable(
+            cond for _, _, _, cond in effects))).reshape(-1, 2)
+        self.condition_vars = conditions[:, 0]
+        self.condition_values = conditions[:, 1]
+
+    def __len__(self):
+        return len(self.operators)
+
+    def get_operators(self):
+        """Set prevail and pre_post of the operators to the content of the
+        arrays and return the list of operators."""
+        prevail_offsets = self.prevail_offsets.tolist()
+        prevail = list(zip(self.prevail_vars.tolist(),
+                           self.prevail_values.tolist()))
+        effect_offsets = self.effect_offsets.tolist()
+        condition_offsets = self.condition_offsets.tolist()
+        conditions = list(zip(self.condition_vars.tolist(),
+                              self.condition_values.tolist()))
+        effects = [
+            (var, pre, post, conditions[start:end])
+            for var, pre, post, start, end in zip(
+                self.effect_vars.tolist(), self.effect_pres.tolist(),
+                self.effect_posts.tolist(), condition_offsets[:-1],
+                condition_offsets[1:])]
+        for op_no, op in enumerate(self.operators):
+            op.prevail = prevail[
+                prevail_offsets[op_no]:prevail_offsets[op_no + 1]]
+            op.pre_post = effects[
+                effect_offsets[op_no]:effect_offsets[op_no + 1]]
+        return self.operators
+
+    def _get_effect_operators(self):
+        return _get_segment_ids(self.effect_offsets)
+
+    def _get_condition_effects(self):
+        return _get_segment_ids(self.condition_offsets)
+
+    def _get_applicability_conditions(self, num_variables):
+        """Return the arrays (keys, values) of the combined prevail
+        conditions and preconditions (see
+        SASOperator.get_applicability_conditions), sorted by key, where the
+        key of a condition var=value of operator op_no is
+        op_no * num_variables + var."""
+        effect_ops = self._get_effect_operators()
+        has_pre = self.effect_pres != -1
+        keys = np.concatenate([
+            _get_segment_ids(self.prevail_offsets) * num_variables +
+            self.prevail_vars,
+            effect_ops[has_pre] * num_variables + self.effect_vars[has_pre]])
+        values = np.concatenate([self.prevail_values,
+                                 self.effect_pres[has_pre]])
+        keys, positions = np.unique(keys, return_index=True)
+        return keys, values[positions]
+
+    def get_dtg_transitions(self, num_variables):
+        """Return the distinct transitions (var, pre, post) of the DTGs that
+        are induced by the operators (see simplify.build_dtgs). pre is -1
+        if the transition can start at any value."""
+        effect_ops = self._get_effect_operators()
+        cond_keys, cond_values = self._get_applicability_conditions(
+            num_variables)
+        effect_keys = effect_ops * num_variables + self.effect_vars
+        positions = np.minimum(np.searchsorted(cond_keys, effect_keys),
+                               max(len(cond_keys) - 1, 0))
+        effective_pres = np.full(len(effect_keys), -1, dtype=np.int64)
+        if len(cond_keys):
+            found = cond_keys[positions] == effect_keys
+            effective_pres[found] = cond_values[positions[found]]
+
+        # Effect conditions on the variable of the effect.
+        condition_effects = self._get_condition_effects()
+        on_effect_var = (self.condition_vars ==
+                         self.effect_vars[condition_effects])
+        effects = condition_effects[on_effect_var]
+        values = self.condition_values[on_effect_var]
+        num_effects = len(self.effect_vars)
+        num_conditions = np.bincount(effects, minlength=num_effects)
+        min_values = np.zeros(num_effects, dtype=np.int64)
+        max_values = np.zeros(num_effects, dtype=np.int64)
+        min_values[effects] = np.iinfo(np.int64).max
+        max_values[effects] = np.iinfo(np.int64).min
+        np.minimum.at(min_values, effects, values)
+        np.maximum.at(max_values, effects, values)
+        conditioned = num_conditions > 0
+        contradictory = conditioned & (
+            (min_values != max_values) |
+            ((effective_pres != -1) & (min_values != effective_pres)))
+        effective_pres = np.where(conditioned & (effective_pres == -1),
+                                  min_values, effective_pres)
+
+        keep = ~contradictory
+        if not keep.any():
+            # np.unique with an axis fails for empty arrays in numpy < 1.17.
+            return []
+        transitions = np.unique(np.stack(
+            [self.effect_vars[keep], effective_pres[keep],
+             self.effect_posts[keep]], axis=1), axis=0)
+        return [tuple(transition) for transition in transitions.tolist()]
+
+    def rename(self, new_var_nos, new_values, always_false, always_true):
+        """Apply the renaming of simplify.VarValueRenaming to the operators
+        and remove the operators that are never applicable or have no
+        effect (see VarValueRenaming.translate_operator). new_var_nos and
+        new_values are the lists of the renaming, and always_false and
+        always_true are the objects that mark removed values in new_values.
+        Return the number of removed operators."""
+        value_offsets = _to_array(
+            [0] + [len(values) for values in new_values]).cumsum()
+        new_value_codes = _to_array([
+            ALWAYS_FALSE if value is always_false else
+            ALWAYS_TRUE if value is always_true else value
+            for value in chain.from_iterable(new_values)])
+        new_var_codes = _to_array(
+            [-1 if var is None else var for var in new_var_nos])
+        num_variables = len(new_var_nos)
+        num_ops = len(self.operators)
+
+        def translate(vars, values):
+            return (new_var_codes[vars],
+                    new_value_codes[value_offsets[vars] + values])
+
+        # Applicability conditions.
+        cond_keys, cond_values = self._get_applicability_conditions(
+            num_variables)
+        cond_ops = cond_keys // num_variables
+        cond_new_vars, cond_new_values = translate(
+            cond_keys % num_variables, cond_values)
+        applicable = np.ones(num_ops, dtype=bool)
+        applicable[cond_ops[cond_new_values == ALWAYS_FALSE]] = False
+        keep = (cond_new_values != ALWAYS_TRUE) & applicable[cond_ops]
+        cond_ops = cond_ops[keep]
+        cond_new_vars = cond_new_vars[keep]
+        cond_new_values = cond_new_values[keep]
+        # New variables are numbered in the order of the old variables, so
+        # the converted conditions stay sorted by (operator, variable).
+        new_num_variables = max(int(new_var_codes.max()) + 1, 1)
+        new_cond_keys = cond_ops * new_num_variables + cond_new_vars
+
+        def lookup_condition(ops, vars):
+            """Return the value of the applicability condition on the
+            variable or -1 if there is none."""
+            keys = ops * new_num_variables + vars
+            result = np.full(len(keys), -1, dtype=np.int64)
+            if len(new_cond_keys):
+                positions = np.minimum(np.searchsorted(new_cond_keys, keys),
+                                       len(new_cond_keys) - 1)
+                found = new_cond_keys[positions] == keys
+                result[found] = cond_new_values[positions[found]]
+            return result
+
+        # Effects.
+        effect_ops = self._get_effect_operators()
+        new_effect_vars, new_posts = translate(self.effect_vars,
+                                               self.effect_posts)
+        has_pre = self.effect_pres != -1
+        _, new_pres = translate(self.effect_vars,
+                                np.where(has_pre, self.effect_pres, 0))
+        new_pres[~has_pre] = -1
+        keep_effect = (applicable[effect_ops] & (new_posts != ALWAYS_TRUE) &
+                       (new_posts != new_pres))
+
+        # Effect conditions.
+        condition_effects = self._get_condition_effects()
+        new_cond_vars, new_cond_values = translate(self.condition_vars,
+                                                   self.condition_values)
+        keep_effect[condition_effects[new_cond_values == ALWAYS_FALSE]] = False
+        keep_condition = (new_cond_values != ALWAYS_TRUE)
+        keep_condition &= keep_effect[condition_effects]
+        applicability_values = lookup_condition(
+            effect_ops[condition_effects[keep_condition]],
+            new_cond_vars[keep_condition])
+        incompatible = ((applicability_values != -1) &
+                        (applicability_values != new_cond_values[keep_condition]))
+        keep_effect[condition_effects[keep_condition][incompatible]] = False
+        keep_condition &= keep_effect[condition_effects]
+
+        effects = np.flatnonzero(keep_effect)
+        has_effect = np.zeros(num_ops, dtype=bool)
+        has_effect[effect_ops[effects]] = True
+        kept_ops = np.flatnonzero(has_effect)
+        new_op_nos = np.cumsum(has_effect) - 1
+
+        # Sort the effects like SASOperator._canonical_pre_post by
+        # (operator, var, -post, cond) and remove duplicates. Conditions
+        # are compared by their rank among all distinct conditions.
+        conditions = np.flatnonzero(keep_condition)
+        condition_offsets = _get_offsets(
+            np.searchsorted(effects, condition_effects[conditions]),
+            len(effects))
+        condition_lists = []
+        cond_vars_list = new_cond_vars[conditions].tolist()
+        cond_values_list = new_cond_values[conditions].tolist()
+        for start, end in zip(condition_offsets[:-1].tolist(),
+                              condition_offsets[1:].tolist()):
+            condition_lists.append(tuple(zip(cond_vars_list[start:end],
+                                             cond_values_list[start:end])))
+        ranks = dict((cond, rank) for rank, cond in
+                     enumerate(sorted(set(condition_lists))))
+        condition_ranks = _to_array([ranks[cond] for cond in condition_lists])
+        effect_new_ops = new_op_nos[effect_ops[effects]]
+        order = np.lexsort((new_pres[effects], condition_ranks,
+                            -new_posts[effects], new_effect_vars[effects],
+                            effect_new_ops))
+        sort_keys = np.stack([effect_new_ops, new_effect_vars[effects],
+                              new_posts[effects], condition_ranks,
+                              new_pres[effects]], axis=1)[order]
+        is_duplicate = np.zeros(len(order), dtype=bool)
+        is_duplicate[1:] = np.all(sort_keys[1:] == sort_keys[:-1], axis=1)
+        order = order[~is_duplicate]
+        condition_offsets, condition_entries = _take_segments(
+            condition_offsets, order)
+        condition_entries = conditions[condition_entries]
+
+        # Prevail conditions: the applicability conditions on variables
+        # without effects.
+        effect_keys = np.unique(effect_new_ops * new_num_variables +
+                                new_effect_vars[effects])
+        prevail = np.flatnonzero(has_effect[cond_ops])
+        prevail_keys = (new_op_nos[cond_ops[prevail]] * new_num_variables +
+                        cond_new_vars[prevail])
+        prevail = prevail[~np.isin(prevail_keys, effect_keys)]
+
+        self.operators = [self.operators[op_no] for op_no in kept_ops.tolist()]
+        self.prevail_offsets = _get_offsets(
+            new_op_nos[cond_ops[prevail]], len(kept_ops))
+        self.prevail_vars = cond_new_vars[prevail]
+        self.prevail_values = cond_new_values[prevail]
+        effects = effects[order]
+        self.effect_offsets = _get_offsets(effect_new_ops[order],
+                                           len(kept_ops))
+        self.effect_vars = new_effect_vars[effects]
+        self.effect_pres = new_pres[effects]
+        self.effect_posts = new_posts[effects]
+        self.condition_offsets = condition_offsets
+        self.condition_vars = new_cond_vars[condition_entries]
+        self.condition_values = new_cond_values[condition_entries]
+        return num_ops - len(kept_ops)
+
+    def get_causal_graph_arcs(self, num_variables):
+        """Return the arrays (sources, targets, weights) of the weighted
+        arcs of the causal graph that are induced by the operators (see
+        variable_order.CausalGraph.weight_graph_from_ops)."""
+        effect_ops = self._get_effect_operators()
+        # The source variables of an operator are the variables of its
+        # prevail conditions and preconditions, with repetitions.
+        has_pre = self.effect_pres != -1
+        source_ops = np.concatenate([_get_segment_ids(self.prevail_offsets),
+                                     effect_ops[has_pre]])
+        source_vars = np.concatenate([self.prevail_vars,
+                                      self.effect_vars[has_pre]])
+        order = np.argsort(source_ops, kind="stable")
+        source_vars = source_vars[order]
+        source_offsets = _get_offsets(source_ops[order], len(self.operators))
+        new_offsets, entries = _take_segments(source_offsets, effect_ops)
+        sources = np.concatenate([source_vars[entries],
+                                  self.condition_vars])
+        targets = np.concatenate([
+            np.repeat(self.effect_vars, np.diff(new_offsets)),
+            self.effect_vars[self._get_condition_effects()]])
+        different = sources != targets
+        keys, weights = np.unique(
+            sources[different] * num_variables + targets[different],
+            return_counts=True)
+        return keys // num_variables, keys % num_variables, weights
+
+    def apply_variable_order(self, new_var):
+        """Apply the variable order of variable_order.VariableOrder, where
+        new_var maps the old variables to the new ones, and remove the
+        operators without effects. Return the number of removed
+        operators."""
+        num_variables = 1 + max(
+            [-1] + list(new_var) + [int(vars.max(initial=-1)) for vars in (
+                self.prevail_vars, self.effect_vars, self.condition_vars)])
+        new_var_codes = np.full(num_variables, -1, dtype=np.int64)
+        for old, new in new_var.items():
+            new_var_codes[old] = new
+        effect_ops = self._get_effect_operators()
+        keep_effect = new_var_codes[self.effect_vars] != -1
+        condition_effects = self._get_condition_effects()
+        keep_condition = (keep_effect[condition_effects] &
+                          (new_var_codes[self.condition_vars] != -1))
+        has_effect = np.zeros(len(self.operators), dtype=bool)
+        has_effect[effect_ops[keep_effect]] = True
+        kept_ops = np.flatnonzero(has_effect)
+        new_op_nos = np.cumsum(has_effect) - 1
+        prevail_ops = _get_segment_ids(self.prevail_offsets)
+        keep_prevail = (has_effect[prevail_ops] &
+                        (new_var_codes[self.prevail_vars] != -1))
+        effects = np.flatnonzero(keep_effect)
+
+        num_removed = len(self.operators) - len(kept_ops)
+        self.operators = [self.operators[op_no] for op_no in kept_ops.tolist()]
+        self.prevail_offsets = _get_offsets(
+            new_op_nos[prevail_ops[keep_prevail]], len(kept_ops))
+        self.prevail_vars = new_var_codes[self.prevail_vars[keep_prevail]]
+        self.prevail_values = self.prevail_values[keep_prevail]
+        self.condition_offsets = _get_offsets(
+            np.searchsorted(effects, condition_effects[keep_condition]),
+            len(effects))
+        self.condition_vars = new_var_codes[self.condition_vars[keep_condition]]
+        self.condition_values = self.condition_values[keep_condition]
+        self.effect_offsets = _get_offsets(
+            new_op_nos[effect_ops[effects]], len(kept_ops))
+        self.effect_vars = new_var_codes[self.effect_vars[effects]]
+        self.effect_pres = self.effect_pres[effects]
+        self.effect_posts = self.effect_posts[effects]
+        return num_removed
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+"""Compact binary encoding of SAS tasks (option --binary-sas-output).
+
+The binary file contains the same data as the text format written by
+SASTask.output, in the same order, but numbers are stored as
+little-endian signed 32 bit integers ("int") and strings as an int
+holding the length of the UTF-8 encoding, followed by the encoding
+("string"). Lists of facts are an int holding the number of facts,
+followed by one (var, value) pair of ints per fact ("facts").
+
+    header     magic b"SASB", int BINARY_FORMAT_VERSION,
+               int SAS_FILE_VERSION
+    metric     int (0 or 1)
+    variables  int number of variables, then per variable:
+               string name, int axiom layer, int range,
+               and one string per value
+    mutexes    int number of mutex groups, then per group: facts
+    init       one int per variable
+    goal       facts
+    operators  int number of operators, then per operator:
+               string name (without parentheses, as in the text format),
+               facts prevail, int number of effects, then per effect:
+               facts condition, int var, int pre, int post;
+               followed by int cost
+    axioms     int number of axioms, then per axiom:
+               facts condition, int var, int value of the effect
+
+read_task(stream) is the reference reader for the format. It returns a
+SASTask whose text output is identical to that of the written task.
+"""
+
+from array import array
+import struct
+import sys
+
+import sas_tasks
+
+BINARY_FORMAT_MAGIC = b"SASB"
+BINARY_FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sii")
+INT = struct.Struct("<i")
+
+## Size (in bytes) up to which write_task collects the encoded blocks
+## before writing them to the stream.
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+
+class BinaryFormatError(Exception):
+    pass
+
+
+def _encode_ints(values):
+    ints = array("i", values)
+    if sys.byteorder == "big":
+        ints.byteswap()
+    if sys.version_info >= (3, 0):
+        return ints.tobytes()
+    return ints.tostring()
+
+
+def _encode_string(string):
+    if not isinstance(string, bytes):
+        string = string.encode("utf-8")
+    return INT.pack(len(string)) + string
+
+
+def _add_facts(ints, facts):
+    ints.append(len(facts))
+    for var, val in facts:
+        ints.append(var)
+        ints.append(val)
+
+
+def _encode_variables(variables):
+    blocks = [INT.pack(len(variables.ranges))]
+    for var, (rang, axiom_layer, values) in enumerate(zip(
+            variables.ranges, variables.axiom_layers, variables.value_names)):
+        blocks.append(_encode_string("var%d" % var))
+        blocks.append(_encode_ints([axiom_layer, rang]))
+        blocks.extend(_encode_string(str(value)) for value in values)
+    return b"".join(blocks)
+
+
+def _encode_operator(op):
+    ints = []
+    _add_facts(ints, op.prevail)
+    ints.append(len(op.pre_post))
+    for var, pre, post, cond in op.pre_post:
+        _add_facts(ints, cond)
+        ints.append(var)
+        ints.append(pre)
+        ints.append(post)
+    ints.append(op.cost)
+    return _encode_string(op.name[1:-1]) + _encode_ints(ints)
+
+
+def _encode_axiom(axiom):
+    ints = []
+    _add_facts(ints, axiom.condition)
+    ints.extend(axiom.effect)
+    return _encode_ints(ints)
+
+
+def _get_blocks(task):
+    yield HEADER.pack(BINARY_FORMAT_MAGIC, BINARY_FORMAT_VERSION,
+                      sas_tasks.SAS_FILE_VERSION)
+    yield INT.pack(int(task.metric))
+    yield _encode_variables(task.variables)
+    yield INT.pack(len(task.mutexes))
+    for mutex in task.mutexes:
+        ints = []
+        _add_facts(ints, mutex.facts)
+        yield _encode_ints(ints)
+    yield _encode_ints(task.init.values)
+    ints = []
+    _add_facts(ints, task.goal.pairs)
+    yield _encode_ints(ints)
+    yield INT.pack(len(task.operators))
+    for op in task.operators:
+        yield _encode_operator(op)
+    yield INT.pack(len(task.axioms))
+    for axiom in task.axioms:
+        yield _encode_axiom(axiom)
+
+
+def write_task(task, stream):
+    """Write the SASTask in the binary format to the binary stream."""
+    buffer = []
+    buffered_size = 0
+    for block in _get_blocks(task):
+        buffer.append(block)
+        buffered_size += len(block)
+        if buffered_size >= OUTPUT_BUFFER_SIZE:
+            stream.write(b"".join(buffer))
+            buffer = []
+            buffered_size = 0
+    stream.write(b"".join(buffer))
+
+
+class _Reader(object):
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read_int(self):
+        try:
+            value, = INT.unpack_from(self.data, self.pos)
+        except struct.error:
+            raise BinaryFormatError("unexpected end of file")
+        self.pos += INT.size
+        return value
+
+    def read_string(self):
+        length = self.read_int()
+        end = self.pos + length
+        if length < 0 or end > len(self.data):
+            raise BinaryFormatError("invalid string at offset %d" % self.pos)
+        string = self.data[self.pos:end]
+        self.pos = end
+        if sys.version_info >= (3, 0):
+            return string.decode("utf-8")
+        return string
+
+    def read_facts(self):
+        return [(self.read_int(), self.read_int())
+                for _ in range(self.read_int())]
+
+
+def read_task(stream):
+    """Read a SASTask in the binary format from the binary stream."""
+    data = stream.read()
+    if len(data) < HEADER.size:
+        raise BinaryFormatError("file too short")
+    magic, format_version, sas_version = HEADER.unpack_from(data, 0)
+    if magic != BINARY_FORMAT_MAGIC:
+        raise BinaryFormatError("not a binary SAS file")
+    if format_version != BINARY_FORMAT_VERSION:
+        raise BinaryFormatError(
+            "unsupported binary format version %d" % format_version)
+    if sas_version != sas_tasks.SAS_FILE_VERSION:
+        raise BinaryFormatError("unsupported SAS file version %d" % sas_version)
+    reader = _Reader(data)
+    reader.pos = HEADER.size
+
+    metric = bool(reader.read_int())
+
+    ranges = []
+    axiom_layers = []
+    value_names = []
+    for _ in range(reader.read_int()):
+        reader.read_string()
+        axiom_layers.append(reader.read_int())
+        rang = reader.read_int()
+        ranges.append(rang)
+        value_names.append([reader.read_string() for _ in range(rang)])
+    variables = sas_tasks.SASVariables(ranges, axiom_layers, value_names)
+
+    # The constructors sort the lists of facts, operators and axioms, but
+    # the translator does not keep them sorted when it reorders and
+    # filters the variables. We restore the order of the file, so that
+    # the written text is the same.
+    mutexes = []
+    for _ in range(reader.read_int()):
+        facts = reader.read_facts()
+        mutex = sas_tasks.SASMutexGroup(facts)
+        mutex.facts = facts
+        mutexes.append(mutex)
+    init = sas_tasks.SASInit([reader.read_int() for _ in ranges])
+    pairs = reader.read_facts()
+    goal = sas_tasks.SASGoal(pairs)
+    goal.pairs = pairs
+
+    operators = []
+    for _ in range(reader.read_int()):
+        name = "(%s)" % reader.read_string()
+        prevail = reader.read_facts()
+        pre_post = []
+        for _ in range(reader.read_int()):
+            cond = reader.read_facts()
+            var = reader.read_int()
+            pre = reader.read_int()
+            post = reader.read_int()
+            pre_post.append((var, pre, post, cond))
+        cost = reader.read_int()
+        op = sas_tasks.SASOperator(name, prevail, pre_post, cost)
+        op.prevail = prevail
+        op.pre_post = pre_post
+        operators.append(op)
+
+    axioms = []
+    for _ in range(reader.read_int()):
+        condition = reader.read_facts()
+        effect = (reader.read_int(), reader.read_int())
+        axiom = sas_tasks.SASAxiom(condition, effect)
+        axiom.condition = condition
+        axioms.append(axiom)
+
+    if reader.pos != len(data):
+        raise BinaryFormatError("unexpected data at offset %d" % reader.pos)
+    task = sas_tasks.SASTask(variables, mutexes, init, goal,
+                             operators, axioms, metric)
+    task.operators = operators
+    task.axioms = axioms
+    return task
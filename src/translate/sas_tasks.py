@@ -2,6 +2,10 @@ from __future__ import print_function
 
 SAS_FILE_VERSION = 3
 
+## Size (in characters) up to which SASTask.output collects the formatted
+## blocks before writing them to the stream.
+OUTPUT_BUFFER_SIZE = 1 << 20
+
 DEBUG = False
 
 
@@ -78,24 +82,34 @@ class SASTask:
         print("metric: %s" % self.metric)
 
     def output(self, stream):
-        print("begin_version", file=stream)
-        print(SAS_FILE_VERSION, file=stream)
-        print("end_version", file=stream)
-        print("begin_metric", file=stream)
-        print(int(self.metric), file=stream)
-        print("end_metric", file=stream)
-        self.variables.output(stream)
-        print(len(self.mutexes), file=stream)
+        buffer = []
+        buffered_size = 0
+        for block in self.get_output_blocks():
+            buffer.append(block)
+            buffered_size += len(block)
+            if buffered_size >= OUTPUT_BUFFER_SIZE:
+                stream.write("".join(buffer))
+                buffer = []
+                buffered_size = 0
+        stream.write("".join(buffer))
+
+    def get_output_blocks(self):
+        """Generate the text of the output file in blocks (one per
+        operator, axiom etc.)."""
+        yield "begin_version\n%d\nend_version\n" % SAS_FILE_VERSION
+        yield "begin_metric\n%d\nend_metric\n" % int(self.metric)
+        yield self.variables.format_output()
+        yield "%d\n" % len(self.mutexes)
         for mutex in self.mutexes:
-            mutex.output(stream)
-        self.init.output(stream)
-        self.goal.output(stream)
-        print(len(self.operators), file=stream)
+            yield mutex.format_output()
+        yield self.init.format_output()
+        yield self.goal.format_output()
+        yield "%d\n" % len(self.operators)
         for op in self.operators:
-            op.output(stream)
-        print(len(self.axioms), file=stream)
+            yield op.format_output()
+        yield "%d\n" % len(self.axioms)
         for axiom in self.axioms:
-            axiom.output(stream)
+            yield axiom.format_output()
 
     def get_encoding_size(self):
         task_size = 0
@@ -158,17 +172,21 @@ class SASVariables:
             print("v%d in {%s}%s" % (var, list(range(rang)), axiom_str))
 
     def output(self, stream):
-        print(len(self.ranges), file=stream)
+        stream.write(self.format_output())
+
+    def format_output(self):
+        lines = [str(len(self.ranges))]
         for var, (rang, axiom_layer, values) in enumerate(zip(
                 self.ranges, self.axiom_layers, self.value_names)):
-            print("begin_variable", file=stream)
-            print("var%d" % var, file=stream)
-            print(axiom_layer, file=stream)
-            print(rang, file=stream)
+            lines.append("begin_variable")
+            lines.append("var%d" % var)
+            lines.append(str(axiom_layer))
+            lines.append(str(rang))
             assert rang == len(values), (rang, values)
-            for value in values:
-                print(value, file=stream)
-            print("end_variable", file=stream)
+            lines.extend(map(str, values))
+            lines.append("end_variable")
+        lines.append("")
+        return "\n".join(lines)
 
     def get_encoding_size(self):
         # A variable with range k has encoding size k + 1 to also give the
@@ -192,11 +210,13 @@ class SASMutexGroup:
             print("v%d: %d" % (var, val))
 
     def output(self, stream):
-        print("begin_mutex_group", file=stream)
-        print(len(self.facts), file=stream)
-        for var, val in self.facts:
-            print(var, val, file=stream)
-        print("end_mutex_group", file=stream)
+        stream.write(self.format_output())
+
+    def format_output(self):
+        lines = ["begin_mutex_group", str(len(self.facts))]
+        lines.extend("%s %s" % fact for fact in self.facts)
+        lines.append("end_mutex_group\n")
+        return "\n".join(lines)
 
     def get_encoding_size(self):
         return len(self.facts)
@@ -222,10 +242,13 @@ class SASInit:
             print("v%d: %d" % (var, val))
 
     def output(self, stream):
-        print("begin_state", file=stream)
-        for val in self.values:
-            print(val, file=stream)
-        print("end_state", file=stream)
+        stream.write(self.format_output())
+
+    def format_output(self):
+        lines = ["begin_state"]
+        lines.extend(map(str, self.values))
+        lines.append("end_state\n")
+        return "\n".join(lines)
 
 
 class SASGoal:
@@ -242,11 +265,13 @@ class SASGoal:
             print("v%d: %d" % (var, val))
 
     def output(self, stream):
-        print("begin_goal", file=stream)
-        print(len(self.pairs), file=stream)
-        for var, val in self.pairs:
-            print(var, val, file=stream)
-        print("end_goal", file=stream)
+        stream.write(self.format_output())
+
+    def format_output(self):
+        lines = ["begin_goal", str(len(self.pairs))]
+        lines.extend("%s %s" % pair for pair in self.pairs)
+        lines.append("end_goal\n")
+        return "\n".join(lines)
 
     def get_encoding_size(self):
         return len(self.pairs)
@@ -372,19 +397,20 @@ class SASOperator:
             print("  v%d: %d -> %d%s" % (var, pre, post, cond_str))
 
     def output(self, stream):
-        print("begin_operator", file=stream)
-        print(self.name[1:-1], file=stream)
-        print(len(self.prevail), file=stream)
-        for var, val in self.prevail:
-            print(var, val, file=stream)
-        print(len(self.pre_post), file=stream)
+        stream.write(self.format_output())
+
+    def format_output(self):
+        lines = ["begin_operator", self.name[1:-1], str(len(self.prevail))]
+        lines.extend("%s %s" % fact for fact in self.prevail)
+        lines.append(str(len(self.pre_post)))
         for var, pre, post, cond in self.pre_post:
-            print(len(cond), end=' ', file=stream)
-            for cvar, cval in cond:
-                print(cvar, cval, end=' ', file=stream)
-            print(var, pre, post, file=stream)
-        print(self.cost, file=stream)
-        print("end_operator", file=stream)
+            parts = [str(len(cond))]
+            parts.extend("%s %s" % fact for fact in cond)
+            parts.append("%s %s %s" % (var, pre, post))
+            lines.append(" ".join(parts))
+        lines.append(str(self.cost))
+        lines.append("end_operator\n")
+        return "\n".join(lines)
 
     def get_encoding_size(self):
         size = 1 + len(self.prevail)
@@ -480,13 +506,15 @@ class SASAxiom:
         print("  v%d: %d" % (var, val))
 
     def output(self, stream):
-        print("begin_rule", file=stream)
-        print(len(self.condition), file=stream)
-        for var, val in self.condition:
-            print(var, val, file=stream)
+        stream.write(self.format_output())
+
+    def format_output(self):
+        lines = ["begin_rule", str(len(self.condition))]
+        lines.extend("%s %s" % fact for fact in self.condition)
         var, val = self.effect
-        print(var, 1 - val, val, file=stream)
-        print("end_rule", file=stream)
+        lines.append("%s %s %s" % (var, 1 - val, val))
+        lines.append("end_rule\n")
+        return "\n".join(lines)
 
     def get_encoding_size(self):
         return 1 + len(self.condition)
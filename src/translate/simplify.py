@@ -92,10 +92,13 @@ class DomainTransitionGraph(object):
                 print("  %d => %d" % (source, destination))
 
 
-def build_dtgs(task):
+def build_dtgs(task, operator_arrays=None):
     """Build DTGs for all variables of the SASTask `task`.
     Return a list(DomainTransitionGraph), one for each variable.
 
+    If `operator_arrays` (sas_arrays.OperatorArrays) is given, the
+    operators are taken from it instead of from the task.
+
     For derived variables, we do not consider the axiom bodies, i.e.,
     we treat each axiom as if it were an operator with no
     preconditions. In the case where the only derived variables used
@@ -145,12 +148,17 @@ def build_dtgs(task):
                     return None
         return result
 
-    for op in task.operators:
-        conditions = dict(op.get_applicability_conditions())
-        for var_no, _, post, cond in op.pre_post:
-            effective_pre = get_effective_pre(var_no, conditions, cond)
-            if effective_pre is not None:
-                add_arc(var_no, effective_pre, post)
+    if operator_arrays is not None:
+        for var_no, effective_pre, post in (
+                operator_arrays.get_dtg_transitions(len(sizes))):
+            add_arc(var_no, effective_pre, post)
+    else:
+        for op in task.operators:
+            conditions = dict(op.get_applicability_conditions())
+            for var_no, _, post, cond in op.pre_post:
+                effective_pre = get_effective_pre(var_no, conditions, cond)
+                if effective_pre is not None:
+                    add_arc(var_no, effective_pre, post)
     for axiom in task.axioms:
         var_no, val = axiom.effect
         add_arc(var_no, -1, val)
@@ -228,14 +236,17 @@ class VarValueRenaming(object):
             self.new_sizes.append(new_size)
             self.new_var_count += 1
 
-    def apply_to_task(self, task):
+    def apply_to_task(self, task, operator_arrays=None):
         if DEBUG:
             self.dump()
         self.apply_to_variables(task.variables)
         self.apply_to_mutexes(task.mutexes)
         self.apply_to_init(task.init)
         self.apply_to_goals(task.goal.pairs)
-        self.apply_to_operators(task.operators)
+        if operator_arrays is not None:
+            self.apply_to_operator_arrays(operator_arrays)
+        else:
+            self.apply_to_operators(task.operators)
         self.apply_to_axioms(task.axioms)
 
     def apply_to_variables(self, variables):
@@ -314,6 +325,12 @@ class VarValueRenaming(object):
         print("%d operators removed" % num_removed)
         operators[:] = new_operators
 
+    def apply_to_operator_arrays(self, operator_arrays):
+        # Same as apply_to_operators on the columnar representation.
+        num_removed = operator_arrays.rename(
+            self.new_var_nos, self.new_values, always_false, always_true)
+        print("%d operators removed" % num_removed)
+
     def apply_to_axioms(self, axioms):
         new_axioms = []
         num_removed = 0
@@ -488,7 +505,7 @@ def build_renaming(dtgs):
     return renaming
 
 
-def filter_unreachable_propositions(sas_task):
+def filter_unreachable_propositions(sas_task, operator_arrays=None):
     """We remove unreachable propositions and then prune variables
     with only one value.
 
@@ -510,16 +527,21 @@ def filter_unreachable_propositions(sas_task):
       that set them have inconsistent preconditions.
 
       Example: on(crate0, crate0) in depots-01.
+
+    If `operator_arrays` (sas_arrays.OperatorArrays) is given, the
+    operators in it are simplified instead of `sas_task.operators`.
     """
 
     if DEBUG:
         sas_task.validate()
-    dtgs = build_dtgs(sas_task)
+    dtgs = build_dtgs(sas_task, operator_arrays)
     renaming = build_renaming(dtgs)
     # apply_to_task may raise Impossible if the goal is detected as
     # unreachable or TriviallySolvable if it has no goal. We let the
     # exceptions propagate to the caller.
-    renaming.apply_to_task(sas_task)
+    renaming.apply_to_task(sas_task, operator_arrays)
     print("%d propositions removed" % renaming.num_removed_values)
     if DEBUG:
+        if operator_arrays is not None:
+            sas_task.operators = operator_arrays.get_operators()
         sas_task.validate()
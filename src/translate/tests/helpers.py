@@ -0,0 +1,36 @@
+"""Tasks and functions for the tests that run the scripts of the translator."""
+
+import os.path
+import subprocess
+import sys
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSLATE_DIR = os.path.dirname(DIR)
+REPO = os.path.abspath(os.path.join(DIR, "..", "..", ".."))
+BENCHMARKS = os.path.join(REPO, "misc", "tests", "benchmarks")
+REGRESSION_TESTS = os.path.join(TRANSLATE_DIR, "regression-tests")
+
+def get_regression_task(name):
+    """Return the domain and problem file of a regression test, e.g.
+    "issue7"."""
+    return (os.path.join(REGRESSION_TESTS, name + "-domain.pddl"),
+            os.path.join(REGRESSION_TESTS, name + "-problem.pddl"))
+
+def get_benchmark_task(domain_name, problem_name):
+    return (os.path.join(BENCHMARKS, domain_name, "domain.pddl"),
+            os.path.join(BENCHMARKS, domain_name, problem_name))
+
+def run_script(work_dir, script, domain, problem, *options):
+    """Run a script of the translator on the task in work_dir and return
+    its output."""
+    output = subprocess.check_output(
+        [sys.executable, os.path.join(TRANSLATE_DIR, script),
+         domain, problem] + list(options),
+        cwd=str(work_dir))
+    return output.decode()
+
+def translate(work_dir, domain, problem, *options):
+    """Translate the task in work_dir and return the output of the
+    translator and the translated task."""
+    log = run_script(work_dir, "translate.py", domain, problem, *options)
+    return log, work_dir.join("output.sas").read()
@@ -0,0 +1,34 @@
+import tools
+
+from .helpers import get_regression_task, translate
+
+DOMAIN, PROBLEM = get_regression_task("issue7")
+
+def test_lru_cache():
+    cache = tools.LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_disabled_lru_cache():
+    cache = tools.LRUCache(0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+def translate_with_cache_size(tmpdir, cache_size):
+    return translate(
+        tmpdir.mkdir("cache-size-%d" % cache_size), DOMAIN, PROBLEM,
+        "--invariant-generation-balance-cache-size", str(cache_size))
+
+def test_balance_cache(tmpdir):
+    log, uncached_task = translate_with_cache_size(tmpdir, 0)
+    assert "Balance check cache: 0 hits" in log
+    for cache_size in [1, 100000]:
+        log, task = translate_with_cache_size(tmpdir, cache_size)
+        assert task == uncached_task
+    assert "Balance check cache: 0 hits" not in log
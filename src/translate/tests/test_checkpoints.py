@@ -0,0 +1,42 @@
+from . import helpers
+
+DOMAIN, PROBLEM = helpers.get_regression_task("issue7")
+
+def translate(work_dir, *options):
+    return helpers.translate(work_dir, DOMAIN, PROBLEM, *options)
+
+def test_checkpoints(tmpdir):
+    checkpoint_dir = str(tmpdir.join("checkpoints"))
+    _, task = translate(tmpdir.mkdir("without-checkpoints"))
+
+    log, first_task = translate(
+        tmpdir.mkdir("first"), "--checkpoint-dir", checkpoint_dir)
+    assert "Restarting after stage" not in log
+    assert "Saving groups checkpoint" in log
+    assert first_task == task
+
+    log, second_task = translate(
+        tmpdir.mkdir("second"), "--checkpoint-dir", checkpoint_dir)
+    assert "Restarting after stage groups" in log
+    assert "Finding invariants" not in log
+    assert second_task == task
+
+def test_checkpoint_keys_depend_on_options(tmpdir):
+    checkpoint_dir = str(tmpdir.join("checkpoints"))
+    translate(tmpdir.mkdir("partial"), "--checkpoint-dir", checkpoint_dir)
+    _, task = translate(tmpdir.mkdir("without-checkpoints"), "--full-encoding")
+    log, full_task = translate(
+        tmpdir.mkdir("full"), "--checkpoint-dir", checkpoint_dir,
+        "--full-encoding")
+    assert "Restarting after stage invariants" in log
+    assert full_task == task
+
+def test_no_checkpoints_for_aborted_invariant_generation(tmpdir):
+    checkpoint_dir = tmpdir.join("checkpoints")
+    log, _ = translate(
+        tmpdir.mkdir("aborted"), "--checkpoint-dir", str(checkpoint_dir),
+        "--invariant-generation-max-time", "0")
+    assert "aborting invariant generation" in log
+    assert "Not saving invariants and groups checkpoints" in log
+    assert sorted(path.basename.split("-")[0]
+                  for path in checkpoint_dir.listdir()) == ["model", "task"]
@@ -0,0 +1,31 @@
+from .helpers import get_benchmark_task, get_regression_task, run_script
+
+TASKS = [
+    get_benchmark_task("miconic-simpleadl", "s1-0.pddl"),
+    get_regression_task("issue405"),
+]
+
+def compute_graph(work_dir, domain, problem, *options):
+    output = run_script(
+        work_dir, "abstract_structure_module.py", domain, problem,
+        "--abstract-structure-graph-text", "--dump-dot-graph", *options)
+    return (output,
+            work_dir.join("abstract-structure-graph.txt").read(),
+            work_dir.join("abstract-structure-graph.dot").read())
+
+def test_domain_graph_template(tmpdir):
+    template_dir = str(tmpdir.join("templates"))
+    for task_no, (domain, problem) in enumerate(TASKS):
+        _, graph, dot_graph = compute_graph(
+            tmpdir.mkdir("without-template-%d" % task_no), domain, problem)
+        log, first_graph, first_dot_graph = compute_graph(
+            tmpdir.mkdir("first-%d" % task_no), domain, problem,
+            "--abstract-structure-graph-template-dir", template_dir)
+        assert "Creating domain graph" in log
+        assert (first_graph, first_dot_graph) == (graph, dot_graph)
+        log, second_graph, second_dot_graph = compute_graph(
+            tmpdir.mkdir("second-%d" % task_no), domain, problem,
+            "--abstract-structure-graph-template-dir", template_dir)
+        assert "Creating domain graph" not in log
+        assert "Loading domain graph" in log
+        assert (second_graph, second_dot_graph) == (graph, dot_graph)
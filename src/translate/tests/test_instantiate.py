@@ -0,0 +1,61 @@
+from .helpers import TRANSLATE_DIR, get_benchmark_task, run_script
+
+## Runs the translator and counts the calls of Action.instantiate. If eager
+## is true, all actions are instantiated in advance, as before the lazy
+## instantiation of instantiate.InstantiatedActions.
+COUNTING_TRANSLATOR = """
+import collections
+import os
+import runpy
+import sys
+
+TRANSLATE_DIR = %r
+sys.path.insert(0, TRANSLATE_DIR)
+import instantiate
+import pddl
+
+counts = collections.Counter()
+original_instantiate = pddl.Action.instantiate
+def counting_instantiate(self, var_mapping, *args):
+    counts[(self.name, tuple(sorted(var_mapping.items())))] += 1
+    return original_instantiate(self, var_mapping, *args)
+pddl.Action.instantiate = counting_instantiate
+
+if %r:
+    LazyInstantiatedActions = instantiate.InstantiatedActions
+    instantiate.InstantiatedActions = (
+        lambda *args: list(LazyInstantiatedActions(*args)))
+
+sys.argv[0] = os.path.join(TRANSLATE_DIR, "translate.py")
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+finally:
+    print("Instantiations: %%d" %% sum(counts.values()))
+    print("Instantiated action atoms: %%d" %% len(counts))
+"""
+
+def translate_counting(work_dir, domain, problem, eager):
+    script = work_dir.join("counting_translator.py")
+    script.write(COUNTING_TRANSLATOR % (TRANSLATE_DIR, eager))
+    log = run_script(work_dir, str(script), domain, problem)
+    return log, work_dir.join("output.sas").read()
+
+def get_count(log, name):
+    [line] = [line for line in log.splitlines()
+              if line.startswith(name + ": ")]
+    return int(line.split(": ")[1])
+
+def test_instantiate_actions_once(tmpdir):
+    # Tasks with and without axioms.
+    for domain, problem in [
+            get_benchmark_task("philosophers", "p01-phil2.pddl"),
+            get_benchmark_task("gripper", "prob01.pddl")]:
+        work_dir = tmpdir.mkdir(domain.split("/")[-2])
+        log, task = translate_counting(
+            work_dir.mkdir("lazy"), domain, problem, eager=False)
+        _, eager_task = translate_counting(
+            work_dir.mkdir("eager"), domain, problem, eager=True)
+        assert task == eager_task
+        assert get_count(log, "Instantiated action atoms") > 0
+        assert (get_count(log, "Instantiations") ==
+                get_count(log, "Instantiated action atoms"))
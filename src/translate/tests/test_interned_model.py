@@ -0,0 +1,22 @@
+import re
+
+from .helpers import (TRANSLATE_DIR, get_benchmark_task, get_regression_task,
+                      run_script)
+
+TASKS = [
+    get_benchmark_task("gripper", "prob01.pddl"),
+    get_benchmark_task("miconic-simpleadl", "s1-0.pddl"),
+    get_regression_task("issue7"),
+    get_regression_task("issue49-orig"),
+]
+
+def compute_model(script, domain, problem):
+    output = run_script(TRANSLATE_DIR, script, domain, problem)
+    # Ignore the timing output and the addresses of actions and axioms.
+    return [re.sub(r" at 0x[0-9a-f]+", "", line)
+            for line in output.splitlines() if "[" not in line]
+
+def test_interned_model():
+    for domain, problem in TASKS:
+        assert (compute_model("interned_model.py", domain, problem) ==
+                compute_model("build_model.py", domain, problem))
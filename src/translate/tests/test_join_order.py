@@ -0,0 +1,24 @@
+import re
+
+from . import helpers
+
+TASKS = [
+    helpers.get_regression_task("issue34"),
+    helpers.get_benchmark_task("philosophers", "p01-phil2.pddl"),
+]
+
+def translate(work_dir, domain, problem, *options):
+    output, task = helpers.translate(work_dir, domain, problem, *options)
+    auxiliary_atoms = int(re.search(
+        r"^(\d+) auxiliary atoms$", output, re.M).group(1))
+    return auxiliary_atoms, task
+
+def test_cost_based_join_order(tmpdir):
+    for task_no, (domain, problem) in enumerate(TASKS):
+        auxiliary_atoms, task = translate(
+            tmpdir.mkdir("default-%d" % task_no), domain, problem)
+        cost_auxiliary_atoms, cost_task = translate(
+            tmpdir.mkdir("cost-%d" % task_no), domain, problem,
+            "--cost-based-join-order")
+        assert cost_task == task
+        assert cost_auxiliary_atoms < auxiliary_atoms
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import sys
+try:
+    # Python 2
+    from StringIO import StringIO
+except ImportError:
+    # Python 3
+    from io import StringIO
+
+import pytest
+
+from .helpers import get_regression_task
+
+@pytest.fixture
+def lisp_parser(monkeypatch):
+    # Importing pddl_parser parses the command line of the translator.
+    monkeypatch.setattr(sys, "argv",
+                        ["translate.py"] + list(get_regression_task("issue7")))
+    from pddl_parser import lisp_parser
+    return lisp_parser
+
+def parse(lisp_parser, text):
+    return lisp_parser.parse_nested_list(StringIO(text))
+
+def parse_error(lisp_parser, text):
+    with pytest.raises(lisp_parser.ParseError) as excinfo:
+        parse(lisp_parser, text)
+    return excinfo.value.value
+
+def test_nested_lists(lisp_parser):
+    text = """(define (Domain D) ; Comment (
+  (:predicates (at ?X?y ??z)(free)))
+"""
+    assert parse(lisp_parser, text) == [
+        "define", ["domain", "d"],
+        [":predicates", ["at", "?x", "?y", "?", "?z"], ["free"]]]
+
+def test_non_ascii_characters_in_comments(lisp_parser):
+    assert parse(lisp_parser, "(a ; \xe4\n b)") == ["a", "b"]
+
+def test_errors(lisp_parser):
+    assert parse_error(lisp_parser, "a (b)") == "Expected '(', got a."
+    assert parse_error(lisp_parser, "(a (b)") == "Missing ')'"
+    assert parse_error(lisp_parser, "(a) (b)") == "Unexpected token: (."
+    assert parse_error(lisp_parser, "(a\n b\xe4 c ; x\n)") == (
+        "Non-ASCII character outside comment:  b\xe4 c")
+    assert parse_error(lisp_parser, "(a\n b\xe4\n)") == (
+        "Non-ASCII character outside comment:  b\xe4")
+
+def test_errors_before_non_ascii_characters(lisp_parser):
+    assert parse_error(lisp_parser, "(a) b\n\xe4") == "Unexpected token: b."
+    assert parse_error(lisp_parser, "(a) b \xe4") == (
+        "Non-ASCII character outside comment: (a) b ")
+    assert parse_error(lisp_parser, "(a\n\xe4") == (
+        "Non-ASCII character outside comment: ")
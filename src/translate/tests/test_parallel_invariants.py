@@ -0,0 +1,42 @@
+import multiprocessing
+import subprocess
+import sys
+
+import pytest
+
+from .helpers import TRANSLATE_DIR, get_regression_task, translate
+
+DOMAIN, PROBLEM = get_regression_task("issue34")
+
+def test_parallel_invariants(tmpdir):
+    # A small candidate limit makes the result depend on the order in
+    # which candidates are checked and refined.
+    for max_candidates in ["20", "100000"]:
+        options = ["--invariant-generation-max-candidates", max_candidates]
+        _, serial = translate(tmpdir.mkdir("serial-" + max_candidates),
+                              DOMAIN, PROBLEM, *options)
+        _, parallel = translate(
+            tmpdir.mkdir("parallel-" + max_candidates), DOMAIN, PROBLEM,
+            *(options + ["--invariant-generation-jobs", "3"]))
+        assert serial == parallel
+
+# Start the translator with the given start method of multiprocessing.
+START_METHOD_SCRIPT = """
+import multiprocessing, sys
+multiprocessing.set_start_method(sys.argv.pop(1))
+sys.path.insert(0, %r)
+import translate
+translate.main()
+""" % TRANSLATE_DIR
+
+@pytest.mark.skipif(not hasattr(multiprocessing, "get_all_start_methods"),
+                    reason="start methods need Python >= 3.4")
+def test_parallel_invariants_start_methods(tmpdir):
+    options = ["--invariant-generation-jobs", "2"]
+    _, serial = translate(tmpdir.mkdir("serial"), DOMAIN, PROBLEM)
+    for method in multiprocessing.get_all_start_methods():
+        work_dir = tmpdir.mkdir(method)
+        subprocess.check_call(
+            [sys.executable, "-c", START_METHOD_SCRIPT, method,
+             DOMAIN, PROBLEM] + options, cwd=str(work_dir))
+        assert work_dir.join("output.sas").read() == serial
@@ -0,0 +1,48 @@
+import json
+
+import profiling
+
+from .helpers import get_regression_task, translate
+
+DOMAIN, PROBLEM = get_regression_task("issue7")
+
+def test_nested_phases(tmpdir):
+    profiler = profiling.Profiler()
+    profiler.start_phase("outer")
+    profiler.set_counter("before", 1)
+    profiler.start_phase("inner")
+    profiler.set_counter("atoms", 42)
+    profiler.end_phase()
+    profiler.start_phase("failed")
+    profiler.end_phase(finished=False)
+    report = profiler.get_report("done")
+    assert [phase["path"] for phase in report["phases"]] == [
+        "outer", "outer/inner", "outer/failed"]
+    outer, inner, failed = report["phases"]
+    assert outer["counters"] == {"before": 1}
+    assert inner["counters"] == {"atoms": 42}
+    assert not outer["finished"] and inner["finished"]
+    assert not failed["finished"]
+    assert report["status"] == "done"
+
+def test_sampler_stops(tmpdir):
+    profiler = profiling.Profiler(sample_interval=0.001)
+    profiler.start_phase("phase")
+    profiler.write_report(str(tmpdir.join("report.json")), "error")
+    assert not profiler.sampler.is_alive()
+    report = json.loads(tmpdir.join("report.json").read())
+    assert len(report["samples"]) == len(profiler.samples)
+
+def test_report(tmpdir):
+    translate(tmpdir, DOMAIN, PROBLEM, "--profile-report", "report.json",
+              "--profile-sample-interval", "0.001")
+    report = json.loads(tmpdir.join("report.json").read())
+    assert report["status"] == "done"
+    assert report["counters"]["operators"] > 0
+    phases = dict((phase["path"], phase) for phase in report["phases"])
+    assert all(phase["finished"] for phase in phases.values())
+    model = phases["Instantiating/Computing model"]
+    assert model["counters"]["relevant atoms"] > 0
+    assert model["peak_rss_kb"] >= model["start_rss_kb"]
+    invariants = phases["Computing fact groups/Finding invariants"]
+    assert invariants["counters"]["candidates"] > 0
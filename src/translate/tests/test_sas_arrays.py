@@ -0,0 +1,105 @@
+import random
+try:
+    # Python 2
+    from StringIO import StringIO
+except ImportError:
+    # Python 3
+    from io import StringIO
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import sas_arrays
+import sas_tasks
+import simplify
+import variable_order
+
+
+def make_random_task(rng):
+    num_vars = rng.randint(2, 7)
+    ranges = [rng.randint(2, 4) for _ in range(num_vars)]
+    num_derived = rng.randint(0, 1)
+    axiom_layers = [-1] * (num_vars - num_derived) + [0] * num_derived
+    value_names = [["Atom v%d(%d)" % (var, value) for value in range(rang)]
+                   for var, rang in enumerate(ranges)]
+    variables = sas_tasks.SASVariables(ranges, axiom_layers, value_names)
+    init = sas_tasks.SASInit([rng.randrange(rang) for rang in ranges])
+    goal_vars = rng.sample(range(num_vars), rng.randint(1, 2))
+    goal = sas_tasks.SASGoal([(var, rng.randrange(ranges[var]))
+                              for var in goal_vars])
+    mutexes = [sas_tasks.SASMutexGroup([(0, 0), (1, 1)])]
+
+    def random_fact(var):
+        return var, rng.randrange(ranges[var])
+
+    operators = []
+    for op_no in range(rng.randint(1, 12)):
+        vars = list(range(num_vars - num_derived))
+        rng.shuffle(vars)
+        effect_vars = vars[:rng.randint(1, 3)]
+        prevail_vars = [var for var in vars[len(effect_vars):]
+                        if rng.random() < 0.3]
+        pres = dict((var, rng.choice([-1, rng.randrange(ranges[var])]))
+                    for var in effect_vars)
+        condition_vars = [var for var in range(num_vars)
+                          if var not in prevail_vars and
+                          pres.get(var, -1) == -1]
+        pre_post = []
+        for var in effect_vars:
+            for _ in range(rng.randint(1, 2)):
+                cond = [random_fact(cvar) for cvar in sorted(rng.sample(
+                    condition_vars, rng.randint(0, min(2, len(condition_vars)))))]
+                pre_post.append(
+                    (var, pres[var], rng.randrange(ranges[var]), cond))
+        operators.append(sas_tasks.SASOperator(
+            "(op%d)" % op_no, [random_fact(var) for var in prevail_vars],
+            pre_post, 1))
+    axioms = [sas_tasks.SASAxiom([random_fact(0)], (num_vars - 1, 0))
+              for _ in range(num_derived)]
+    return sas_tasks.SASTask(variables, mutexes, init, goal,
+                             operators, axioms, False)
+
+
+def process(task, use_arrays):
+    operator_arrays = None
+    if use_arrays:
+        operator_arrays = sas_arrays.OperatorArrays(task.operators)
+    try:
+        simplify.filter_unreachable_propositions(task, operator_arrays)
+    except (simplify.Impossible, simplify.TriviallySolvable) as err:
+        return err.__class__.__name__
+    variable_order.find_and_apply_variable_order(
+        task, operator_arrays=operator_arrays)
+    if use_arrays:
+        task.operators = operator_arrays.get_operators()
+    output = StringIO()
+    task.output(output)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_same_result_as_operator_lists(seed):
+    expected = process(make_random_task(random.Random(seed)), False)
+    result = process(make_random_task(random.Random(seed)), True)
+    assert result == expected
+
+
+def test_no_operators():
+    # E.g., the task of issue405, whose goal violates a mutex.
+    task = make_random_task(random.Random(0))
+    task.operators = []
+    operator_arrays = sas_arrays.OperatorArrays(task.operators)
+    assert operator_arrays.get_dtg_transitions(
+        len(task.variables.ranges)) == []
+    expected = process(task, False)
+    task = make_random_task(random.Random(0))
+    task.operators = []
+    assert process(task, True) == expected
+
+
+def test_round_trip():
+    task = make_random_task(random.Random(0))
+    expected = [(op.prevail, op.pre_post) for op in task.operators]
+    operators = sas_arrays.OperatorArrays(task.operators).get_operators()
+    assert [(op.prevail, op.pre_post) for op in operators] == expected
@@ -0,0 +1,76 @@
+import io
+try:
+    # Python 2
+    from StringIO import StringIO
+except ImportError:
+    # Python 3
+    from io import StringIO
+
+import pytest
+
+import sas_binary
+import sas_tasks
+
+
+def make_task():
+    variables = sas_tasks.SASVariables(
+        [2, 3, 2], [-1, -1, 0],
+        [["Atom at(a)", "NegatedAtom at(a)"],
+         ["Atom in(b, c)", "Atom in(b, d)", "<none of those>"],
+         ["Atom derived()", "NegatedAtom derived()"]])
+    mutexes = [sas_tasks.SASMutexGroup([(1, 0), (1, 1)])]
+    init = sas_tasks.SASInit([0, 2, 1])
+    goal = sas_tasks.SASGoal([(0, 1), (2, 0)])
+    operators = [
+        sas_tasks.SASOperator("(move a b)", [(0, 0)],
+                              [(1, -1, 1, [(0, 0)]), (1, 2, 0, [])], 3),
+        sas_tasks.SASOperator("(drop a)", [], [(0, 0, 1, [])], 1),
+    ]
+    axioms = [sas_tasks.SASAxiom([(0, 1), (1, 0)], (2, 0))]
+    task = sas_tasks.SASTask(variables, mutexes, init, goal,
+                             operators, axioms, True)
+    # The translator does not keep the prevail conditions sorted when it
+    # reorders the variables.
+    task.operators[0].prevail = [(1, 0), (0, 1)]
+    return task
+
+
+def get_text(task):
+    output = StringIO()
+    task.output(output)
+    return output.getvalue()
+
+
+def write_binary(task):
+    output = io.BytesIO()
+    sas_binary.write_task(task, output)
+    return output.getvalue()
+
+
+def test_text_output():
+    lines = get_text(make_task()).splitlines()
+    assert lines[:6] == ["begin_version", str(sas_tasks.SAS_FILE_VERSION),
+                         "end_version", "begin_metric", "1", "end_metric"]
+    begin = lines.index("begin_operator")
+    assert lines[begin:begin + 10] == [
+        "begin_operator", "drop a", "2", "1 0", "0 1", "1", "0 0 0 1", "1",
+        "end_operator", "begin_operator"]
+    assert lines[-6:] == ["begin_rule", "2", "0 1", "1 0", "2 1 0", "end_rule"]
+
+
+def test_round_trip():
+    task = make_task()
+    data = write_binary(task)
+    read_task = sas_binary.read_task(io.BytesIO(data))
+    assert get_text(read_task) == get_text(task)
+    assert write_binary(read_task) == data
+
+
+def test_invalid_files():
+    data = write_binary(make_task())
+    with pytest.raises(sas_binary.BinaryFormatError):
+        sas_binary.read_task(io.BytesIO(b"begin_version\n3\n"))
+    with pytest.raises(sas_binary.BinaryFormatError):
+        sas_binary.read_task(io.BytesIO(data[:-2]))
+    with pytest.raises(sas_binary.BinaryFormatError):
+        sas_binary.read_task(io.BytesIO(data + b"\0\0\0\0"))
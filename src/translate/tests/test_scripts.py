@@ -11,6 +11,7 @@ SCRIPTS = [
     "build_model.py",
     "graph.py",
     "instantiate.py",
+    "interned_model.py",
     "invariant_finder.py",
     "normalize.py",
     "pddl_to_prolog.py",
@@ -7,6 +7,8 @@ import os
 import sys
 import time
 
+import profiling
+
 
 class Timer(object):
     def __init__(self):
@@ -26,12 +28,22 @@ class Timer(object):
 @contextlib.contextmanager
 def timing(text, block=False):
     timer = Timer()
+    profiler = profiling.get_profiler()
+    if profiler is not None:
+        profiler.start_phase(text)
     if block:
         print("%s..." % text)
     else:
         print("%s..." % text, end=' ')
     sys.stdout.flush()
-    yield
+    try:
+        yield
+    except:
+        if profiler is not None:
+            profiler.end_phase(finished=False)
+        raise
+    if profiler is not None:
+        profiler.end_phase()
     if block:
         print("%s: %s" % (text, timer))
     else:
@@ -1,3 +1,6 @@
+from collections import OrderedDict
+
+
 def cartesian_product(sequences):
     # TODO: Rename this. It's not good that we have two functions
     # called "product" and "cartesian_product", of which "product"
@@ -17,6 +20,35 @@ def cartesian_product(sequences):
                 yield item + sequence
 
 
+class LRUCache(object):
+    """Mapping with at most max_size entries (none if max_size is 0) that
+    removes the least recently used entry when it is full. get counts the
+    hits and misses."""
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the value for key, or None if there is no entry."""
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self.entries[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        self.entries[key] = value
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
 def get_peak_memory_in_kb():
     try:
         # This will only work on Linux systems.
@@ -15,17 +15,20 @@ if not python_version_supported():
 
 
 from collections import defaultdict
-from copy import deepcopy
 from itertools import product
 
-from abstract_structure_module import AbstractStructureGraph
+from abstract_structure_module import create_abstract_structure_graph, write_graph_file
 import axiom_rules
+import checkpoints
 import fact_groups
 import instantiate
+import invariant_finder
 import normalize
 import options
 import pddl
 import pddl_parser
+import profiling
+import sas_binary
 import sas_tasks
 import simplify
 import timers
@@ -61,7 +64,21 @@ def strips_to_sas_dictionary(groups, assert_partial):
     return [len(group) + 1 for group in groups], dictionary
 
 
+def get_mask_values(mask):
+    """Return the sorted list of the values in the bitmask."""
+    vals = []
+    val = 0
+    while mask:
+        if mask & 1:
+            vals.append(val)
+        mask >>= 1
+        val += 1
+    return vals
+
+
 def translate_strips_conditions_aux(conditions, dictionary, ranges):
+    # The possible values of each variable are represented as a bitmask
+    # where bit i is set iff the variable may have value i.
     condition = {}
     for fact in conditions:
         if fact.negated:
@@ -79,15 +96,16 @@ def translate_strips_conditions_aux(conditions, dictionary, ranges):
             # in the same way we deal with operator preconditions etc.,
             # where static facts disappear during grounding. So change
             # this when the goal code is refactored (also below). (**)
-            if (condition.get(var) is not None and
-                    val not in condition.get(var)):
+            val_mask = 1 << val
+            prev_mask = condition.get(var)
+            if prev_mask is not None and not prev_mask & val_mask:
                 # Conflicting conditions on this variable: Operator invalid.
                 return None
-            condition[var] = set([val])
+            condition[var] = val_mask
 
-    def number_of_values(var_vals_pair):
-        var, vals = var_vals_pair
-        return len(vals)
+    def number_of_values(var_mask_pair):
+        var, mask = var_mask_pair
+        return bin(mask).count("1")
 
     for fact in conditions:
         if fact.negated:
@@ -109,21 +127,21 @@ def translate_strips_conditions_aux(conditions, dictionary, ranges):
             atom = pddl.Atom(fact.predicate, fact.args)  # force positive
             for var, val in dictionary.get(atom, ()):
                 # see comment (**) above
-                poss_vals = set(range(ranges[var]))
-                poss_vals.remove(val)
+                poss_mask = ((1 << ranges[var]) - 1) & ~(1 << val)
 
-                if condition.get(var) is None:
+                prev_mask = condition.get(var)
+                if prev_mask is None:
                     assert new_condition.get(var) is None
-                    new_condition[var] = poss_vals
+                    new_condition[var] = poss_mask
                 else:
                     # constrain existing condition on var
-                    prev_possible_vals = condition.get(var)
                     done = True
-                    prev_possible_vals.intersection_update(poss_vals)
-                    if len(prev_possible_vals) == 0:
+                    prev_mask &= poss_mask
+                    if not prev_mask:
                         # Conflicting conditions on this variable:
                         # Operator invalid.
                         return None
+                    condition[var] = prev_mask
 
             if not done and len(new_condition) != 0:
                 # we did not enforce the negative condition by constraining
@@ -132,25 +150,29 @@ def translate_strips_conditions_aux(conditions, dictionary, ranges):
                 # We can select any from new_condition and currently prefer the
                 # smallest one.
                 candidates = sorted(new_condition.items(), key=number_of_values)
-                var, vals = candidates[0]
-                condition[var] = vals
-
-        def multiply_out(condition):  # destroys the input
-            sorted_conds = sorted(condition.items(), key=number_of_values)
-            flat_conds = [{}]
-            for var, vals in sorted_conds:
-                if len(vals) == 1:
-                    for cond in flat_conds:
-                        cond[var] = vals.pop()  # destroys the input here
-                else:
-                    new_conds = []
-                    for cond in flat_conds:
-                        for val in vals:
-                            new_cond = deepcopy(cond)
-                            new_cond[var] = val
-                            new_conds.append(new_cond)
-                    flat_conds = new_conds
-            return flat_conds
+                var, mask = candidates[0]
+                condition[var] = mask
+
+    def multiply_out(condition):
+        sorted_conds = sorted(condition.items(), key=number_of_values)
+        fixed_cond = {}
+        choice_vars = []
+        choice_vals = []
+        for var, mask in sorted_conds:
+            vals = get_mask_values(mask)
+            if len(vals) == 1:
+                fixed_cond[var] = vals[0]
+            else:
+                choice_vars.append(var)
+                choice_vals.append(vals)
+        if not choice_vars:
+            return [fixed_cond]
+        flat_conds = []
+        for vals in product(*choice_vals):
+            new_cond = fixed_cond.copy()
+            new_cond.update(zip(choice_vars, vals))
+            flat_conds.append(new_cond)
+        return flat_conds
 
     return multiply_out(condition)
 
@@ -397,6 +419,8 @@ def translate_strips_axiom(axiom, dictionary, ranges, mutex_dict, mutex_ranges):
 
 def translate_strips_operators(actions, strips_to_sas, ranges, mutex_dict,
                                mutex_ranges, implied_facts):
+    # actions may be an instantiate.InstantiatedActions object, which
+    # instantiates the actions one by one while we iterate over it.
     result = []
     for action in actions:
         sas_ops = translate_strips_operator(action, strips_to_sas, ranges,
@@ -534,7 +558,15 @@ def unsolvable_sas_task(msg):
     print("%s! Generating unsolvable task..." % msg)
     return trivial_task(solvable=False)
 
-def pddl_to_sas(task):
+def save_checkpoint(task_checkpoints, stage, results):
+    if task_checkpoints is not None:
+        task_checkpoints.save(stage, results)
+
+def pddl_to_sas(task, task_checkpoints=None, results=None):
+    # results contains the results of the stages that are already done
+    # (see checkpoints.py).
+    if results is None:
+        results = {"task": task}
     compute_abstract_structure_graph = options.compute_abstract_structure_graph
     if compute_abstract_structure_graph:
         only_object_symmetries = options.only_object_symmetries
@@ -543,41 +575,24 @@ def pddl_to_sas(task):
 
         hide_equal_predicates = True
         with timers.timing("Creating abstract structure graph..", block=True):
-            graph = AbstractStructureGraph(task, only_object_symmetries, stabilize_initial_state, stabilize_goal)
+            graph = create_abstract_structure_graph(
+                task, only_object_symmetries, stabilize_initial_state,
+                stabilize_goal, options.abstract_structure_graph_template_dir)
             if options.dump_dot_graph:
                 f = open('out.dot', 'w')
                 graph.write_dot_graph(f, hide_equal_predicates=True)
                 f.close()
 
-            # print("Turning graph into adjacency list representation")
-            adjacency_graph = []
-            node_counter = 0
-            vertex_indices = {}
-            for vertex in graph.graph.get_vertices():
-                if hide_equal_predicates and vertex in graph.graph.excluded_vertices:
-                    continue
-                vertex_indices[vertex] = node_counter
-                adjacency_graph.append([])
-                node_counter += 1
-            for edge in graph.graph.edges:
-                assert type(edge) is tuple
-                assert len(edge) == 2
-                if edge[0] in vertex_indices and edge[1] in vertex_indices:
-                    i = vertex_indices[edge[0]]
-                    j = vertex_indices[edge[1]]
-                    adjacency_graph[i].append(j)
-
-            def get_string(some_list):
-                return ','.join(str(elem) for elem in some_list)
-
-            f = open('abstract-structure-graph.txt', 'w')
-            lines = '\n'.join(get_string(successors) for successors in adjacency_graph)
-            f.write(lines)
-            f.close()
+            write_graph_file(graph, hide_equal_predicates)
 
     with timers.timing("Instantiating", block=True):
+        model = results.get("model")
+        if model is None:
+            model = instantiate.compute_model(task)
+            results["model"] = model
+            save_checkpoint(task_checkpoints, "model", results)
         (relaxed_reachable, atoms, actions, axioms,
-         reachable_action_params) = instantiate.explore(task)
+         reachable_action_params) = instantiate.explore(task, model)
 
     if not relaxed_reachable:
         return unsolvable_sas_task("No relaxed solution")
@@ -591,8 +606,25 @@ def pddl_to_sas(task):
         assert isinstance(item, pddl.Literal)
 
     with timers.timing("Computing fact groups", block=True):
-        groups, mutex_groups, translation_key = fact_groups.compute_groups(
-            task, atoms, reachable_action_params)
+        if "groups" in results:
+            groups, mutex_groups, translation_key = results["groups"]
+        else:
+            invariants = results.get("invariants")
+            if invariants is None:
+                invariants = invariant_finder.get_invariants(
+                    task, reachable_action_params)
+                results["invariants"] = invariants
+                if invariant_finder.time_limit_reached:
+                    # A run without the time limit would find more
+                    # invariants, but would use the same checkpoint keys.
+                    print("Not saving invariants and groups checkpoints "
+                          "because invariant generation was aborted.")
+                    task_checkpoints = None
+                save_checkpoint(task_checkpoints, "invariants", results)
+            groups, mutex_groups, translation_key = fact_groups.compute_groups(
+                task, atoms, reachable_action_params, invariants)
+            results["groups"] = (groups, mutex_groups, translation_key)
+            save_checkpoint(task_checkpoints, "groups", results)
 
     with timers.timing("Building STRIPS to SAS dictionary"):
         ranges, strips_to_sas = strips_to_sas_dictionary(
@@ -623,11 +655,24 @@ def pddl_to_sas(task):
           simplified_effect_condition_counter)
     print("%d implied preconditions added" %
           added_implied_precondition_counter)
+    profiling.set_counter("effect conditions simplified",
+                          simplified_effect_condition_counter)
+    profiling.set_counter("implied preconditions added",
+                          added_implied_precondition_counter)
+
+    operator_arrays = None
+    if options.columnar_operators and (
+            options.filter_unreachable_facts or options.reorder_variables or
+            options.filter_unimportant_vars):
+        import sas_arrays
+        with timers.timing("Building operator arrays"):
+            operator_arrays = sas_arrays.OperatorArrays(sas_task.operators)
 
     if options.filter_unreachable_facts:
         with timers.timing("Detecting unreachable propositions", block=True):
             try:
-                simplify.filter_unreachable_propositions(sas_task)
+                simplify.filter_unreachable_propositions(
+                    sas_task, operator_arrays)
             except simplify.Impossible:
                 return unsolvable_sas_task("Simplified to trivially false goal")
             except simplify.TriviallySolvable:
@@ -637,7 +682,11 @@ def pddl_to_sas(task):
         with timers.timing("Reordering and filtering variables", block=True):
             variable_order.find_and_apply_variable_order(
                 sas_task, options.reorder_variables,
-                options.filter_unimportant_vars)
+                options.filter_unimportant_vars, operator_arrays)
+
+    if operator_arrays is not None:
+        with timers.timing("Writing back operator arrays"):
+            sas_task.operators = operator_arrays.get_operators()
 
     return sas_task
 
@@ -703,18 +752,23 @@ def build_implied_facts(strips_to_sas, groups, mutex_groups):
 
 
 def dump_statistics(sas_task):
-    print("Translator variables: %d" % len(sas_task.variables.ranges))
-    print(("Translator derived variables: %d" %
-           len([layer for layer in sas_task.variables.axiom_layers
-                if layer >= 0])))
-    print("Translator facts: %d" % sum(sas_task.variables.ranges))
-    print("Translator goal facts: %d" % len(sas_task.goal.pairs))
-    print("Translator mutex groups: %d" % len(sas_task.mutexes))
-    print(("Translator total mutex groups size: %d" %
-           sum(mutex.get_encoding_size() for mutex in sas_task.mutexes)))
-    print("Translator operators: %d" % len(sas_task.operators))
-    print("Translator axioms: %d" % len(sas_task.axioms))
-    print("Translator task size: %d" % sas_task.get_encoding_size())
+    statistics = [
+        ("variables", len(sas_task.variables.ranges)),
+        ("derived variables",
+         len([layer for layer in sas_task.variables.axiom_layers
+              if layer >= 0])),
+        ("facts", sum(sas_task.variables.ranges)),
+        ("goal facts", len(sas_task.goal.pairs)),
+        ("mutex groups", len(sas_task.mutexes)),
+        ("total mutex groups size",
+         sum(mutex.get_encoding_size() for mutex in sas_task.mutexes)),
+        ("operators", len(sas_task.operators)),
+        ("axioms", len(sas_task.axioms)),
+        ("task size", sas_task.get_encoding_size()),
+    ]
+    for name, value in statistics:
+        print("Translator %s: %d" % (name, value))
+        profiling.set_counter(name, value)
     try:
         peak_memory = tools.get_peak_memory_in_kb()
     except Warning as warning:
@@ -725,35 +779,61 @@ def dump_statistics(sas_task):
 
 def main():
     timer = timers.Timer()
-    with timers.timing("Parsing", True):
-        task = pddl_parser.open(
-            domain_filename=options.domain, task_filename=options.task)
+    task_checkpoints = None
+    results = {}
+    if options.checkpoint_dir:
+        task_checkpoints = checkpoints.Checkpoints(
+            options.checkpoint_dir,
+            checkpoints.get_stage_keys(options.domain, options.task, options))
+        stage, results = task_checkpoints.load()
+        if stage is not None:
+            print("Restarting after stage %s" % stage)
+
+    if "task" in results:
+        task = results["task"]
+    else:
+        with timers.timing("Parsing", True):
+            task = pddl_parser.open(
+                domain_filename=options.domain, task_filename=options.task)
 
-    with timers.timing("Normalizing task"):
-        normalize.normalize(task)
+        with timers.timing("Normalizing task"):
+            normalize.normalize(task)
+        results["task"] = task
+        save_checkpoint(task_checkpoints, "task", results)
 
-    if options.generate_relaxed_task:
+    if options.generate_relaxed_task and "model" not in results:
         # Remove delete effects.
         for action in task.actions:
             for index, effect in reversed(list(enumerate(action.effects))):
                 if effect.literal.negated:
                     del action.effects[index]
 
-    sas_task = pddl_to_sas(task)
+    sas_task = pddl_to_sas(task, task_checkpoints, results)
     dump_statistics(sas_task)
 
     with timers.timing("Writing output"):
-        with open("output.sas", "w") as output_file:
-            sas_task.output(output_file)
+        if options.binary_sas_output:
+            with open("output.sasb", "wb") as output_file:
+                sas_binary.write_task(sas_task, output_file)
+        else:
+            with open("output.sas", "w") as output_file:
+                sas_task.output(output_file)
     print("Done! %s" % timer)
 
 
 if __name__ == "__main__":
+    if options.profile_report:
+        profiling.enable(options.profile_sample_interval)
+    status = "error"
     try:
         main()
+        status = "done"
     except MemoryError:
         print("Translator ran out of memory, traceback:")
         print("=" * 79)
         traceback.print_exc(file=sys.stdout)
         print("=" * 79)
+        status = "out of memory"
         sys.exit(EXIT_MEMORY_ERROR)
+    finally:
+        profiling.write_report(options.profile_report, status)
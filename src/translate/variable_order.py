@@ -23,16 +23,19 @@ class CausalGraph(object):
     planner.
     """
 
-    def __init__(self, sas_task):
+    def __init__(self, sas_task, operator_arrays=None):
         self.weighted_graph = defaultdict(lambda: defaultdict(int))
         ## var_no -> (var_no -> number)
         self.predecessor_graph = defaultdict(set)
         self.ordering = []
 
-        self.weight_graph_from_ops(sas_task.operators)
+        self.num_variables = len(sas_task.variables.ranges)
+        if operator_arrays is not None:
+            self.weight_graph_from_operator_arrays(operator_arrays)
+        else:
+            self.weight_graph_from_ops(sas_task.operators)
         self.weight_graph_from_axioms(sas_task.axioms)
 
-        self.num_variables = len(sas_task.variables.ranges)
         self.goal_map = dict(sas_task.goal.pairs)
 
     def get_ordering(self):
@@ -59,6 +62,14 @@ class CausalGraph(object):
                         self.weighted_graph[source][target] += 1
                         self.predecessor_graph[target].add(source)
 
+    def weight_graph_from_operator_arrays(self, operator_arrays):
+        sources, targets, weights = operator_arrays.get_causal_graph_arcs(
+            self.num_variables)
+        for source, target, weight in zip(
+                sources.tolist(), targets.tolist(), weights.tolist()):
+            self.weighted_graph[source][target] += weight
+            self.predecessor_graph[target].add(source)
+
     def weight_graph_from_axioms(self, axioms):
         for ax in axioms:
             target = ax.effect[0]
@@ -260,14 +271,19 @@ class VariableOrder(object):
         self.ordering = ordering
         self.new_var = dict((v, i) for i, v in enumerate(ordering))
 
-    def apply_to_task(self, sas_task):
+    def apply_to_task(self, sas_task, operator_arrays=None):
         self._apply_to_variables(sas_task.variables)
         self._apply_to_init(sas_task.init)
         self._apply_to_goal(sas_task.goal)
         self._apply_to_mutexes(sas_task.mutexes)
-        self._apply_to_operators(sas_task.operators)
+        if operator_arrays is not None:
+            self._apply_to_operator_arrays(operator_arrays)
+        else:
+            self._apply_to_operators(sas_task.operators)
         self._apply_to_axioms(sas_task.axioms)
         if DEBUG:
+            if operator_arrays is not None:
+                sas_task.operators = operator_arrays.get_operators()
             sas_task.validate()
 
     def _apply_to_variables(self, variables):
@@ -323,6 +339,12 @@ class VariableOrder(object):
                                                  len(operators)))
         operators[:] = new_ops
 
+    def _apply_to_operator_arrays(self, operator_arrays):
+        num_operators = len(operator_arrays)
+        operator_arrays.apply_variable_order(self.new_var)
+        print("%s of %s operators necessary." % (len(operator_arrays),
+                                                 num_operators))
+
     def _apply_to_axioms(self, axioms):
         new_axioms = []
         for ax in axioms:
@@ -339,9 +361,13 @@ class VariableOrder(object):
 
 
 def find_and_apply_variable_order(sas_task, reorder_vars=True,
-                                  filter_unimportant_vars=True):
+                                  filter_unimportant_vars=True,
+                                  operator_arrays=None):
+    """If operator_arrays (sas_arrays.OperatorArrays) is given, the order
+    is computed from and applied to the operators in it instead of
+    sas_task.operators."""
     if reorder_vars or filter_unimportant_vars:
-        cg = CausalGraph(sas_task)
+        cg = CausalGraph(sas_task, operator_arrays)
         if reorder_vars:
             order = cg.get_ordering()
         else:
@@ -351,4 +377,4 @@ def find_and_apply_variable_order(sas_task, reorder_vars=True,
             print("%s of %s variables necessary." % (len(necessary),
                                                      len(order)))
             order = [var for var in order if necessary[var]]
-        VariableOrder(order).apply_to_task(sas_task)
+        VariableOrder(order).apply_to_task(sas_task, operator_arrays)